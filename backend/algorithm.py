@@ -11,7 +11,16 @@ This file contains the algorithms that find the best routes between locations in
 import heapq          # For priority queues
 import time as timer  # For measuring algorithm execution time
 import math
+import os
 from collections import defaultdict, deque
+from datetime import timedelta
+from road_graph import RoadGraph, ROAD_TYPE_CODES
+from contraction_hierarchy import get_contraction_hierarchy, uses_highways
+from road_types import load_road_type_table
+from heuristics import HaversineHeuristic
+from landmarks import get_landmark_heuristic
+from distance_matrix import ROAD_SPEEDS
+from traffic_profiles import load_traffic_profiles, week_minute
 
 class RouteAlgorithms:
     """
@@ -20,18 +29,49 @@ class RouteAlgorithms:
     optimal routes between locations.
     """
     
-    def __init__(self, locations_data, distance_matrix):
+    def __init__(self, locations_data, distance_matrix, graph=None, memo=None,
+                 hierarchy_dir=os.path.join("cache", "ch"), landmark_dir=os.path.join("cache", "alt"),
+                 traffic_profiles=None):
         """
         Sets up the route algorithms with location data and distance information.
         
         locations_data: Contains all the locations and their coordinates
         distance_matrix: Pre-calculated distances and travel times
+        graph: Optional RoadGraph to search on (built from the matrix if not given)
+        memo: Optional RouteMemo so repeated searches are only run once
+        hierarchy_dir: Folder for saved contraction hierarchies (None keeps them in memory only)
+        landmark_dir: Folder for saved ALT landmark tables (None keeps them in memory only)
+        traffic_profiles: Optional TrafficProfiles for departure times (loaded from traffic_profiles.json if not given)
         """
         # Store the locations and distances for later use
         self.locations = locations_data
         self.matrix = distance_matrix
         self.distances = distance_matrix["distances"]
         self.times = distance_matrix["times"]
+
+        # Road classifications, loaded from road_types.json once
+        self.road_types = load_road_type_table("routing")
+
+        # Map location IDs to integers once and keep the roads in flat arrays,
+        # so each search only allocates for the nodes it actually visits
+        self.graph = graph or RoadGraph.from_distance_matrix(
+            distance_matrix, locations_data, self.classify_road_type, self.road_types)
+
+        # Straight-line lower bounds for A*, worked out with NumPy for all nodes at once.
+        # The time bound uses our fastest road speed so it never overestimates.
+        self.heuristic_table = HaversineHeuristic(self.graph, max(ROAD_SPEEDS.values()))
+
+        # Results of find_shortest_route / find_fastest_route, shared within a request
+        self.memo = memo
+
+        # Contraction hierarchies are built (or loaded) the first time they're used
+        self.hierarchy_dir = hierarchy_dir
+
+        # So are the landmark distances for A* with heuristic_mode="alt"
+        self.landmark_dir = landmark_dir
+
+        # Road speeds through the week, for routes with a departure time
+        self.traffic = traffic_profiles or load_traffic_profiles()
     
     def get_adjacent_locations(self, location_id):
         """
@@ -42,264 +82,559 @@ class RouteAlgorithms:
         
         Returns a list of connected location IDs
         """
-        # Simply return all the locations that have a distance from this one
-        return list(self.distances[location_id].keys())
+        # Simply return all the locations that have a road from this one
+        return self.graph.neighbors(location_id)
+
+    def get_avoided_road_types(self, avoid_options, avoid_highways=True):
+        """
+        Turns the user's avoid options into a list of road types to skip.
+
+        avoid_options: Dictionary of options to avoid (like highways or tolls)
+        avoid_highways: Set to False to allow highways even if the user asked to avoid them
+        """
+        avoided_types = []
+        if avoid_options:
+            if avoid_options.get("tolls", False):
+                avoided_types.append("toll")
+            if avoid_options.get("highways", False) and avoid_highways:
+                avoided_types.append("highway")
+        return avoided_types
+
+    def get_road_type_tables(self, avoid_options):
+        """
+        Turns the user's avoid options into (blocked, penalized) lookup tables indexed by road type code.
+
+        Blocked road types are never used. Avoided highways are penalized instead of
+        blocked: searches look for the route with the fewest kilometres on them first,
+        and only then the cheapest one. When there is a route without highways that is
+        the one found, and when there isn't the same search falls back to the route that
+        needs the least highway, so it never has to be run twice.
+
+        avoid_options: Dictionary of options to avoid (like highways or tolls)
+        """
+        blocked = self.graph.blocked_road_types(self.get_avoided_road_types(avoid_options, avoid_highways=False))
+        penalized_types = ["highway"] if avoid_options and avoid_options.get("highways", False) else []
+        return blocked, self.graph.blocked_road_types(penalized_types)
+
+    def no_route_found(self, algorithm):
+        """Returns the result dictionary for a search that found no route."""
+        return {
+            "error": "No valid path found",
+            "algorithm": algorithm,
+            "execution_time_ms": 0,
+            "nodes_visited": 0,
+            "edge_relaxations": 0
+        }
+
+    def build_route_result(self, source, path_edges, execution_time, nodes_visited, edge_relaxations, highways_used):
+        """
+        Builds the result dictionary shared by all of our search algorithms.
+
+        source: Node number the route starts at
+        path_edges: Edge numbers along the route, in order
+        execution_time: Time the search took in milliseconds
+        nodes_visited, edge_relaxations: Search statistics
+        highways_used: Whether the search used any highway
+
+        Returns the route details (the caller adds the algorithm information)
+        """
+        graph = self.graph
+        node_path = [source] + [graph.targets[edge] for edge in path_edges]
+
+        # On a real road network most nodes are street corners, so the path only
+        # lists our named locations and the full road geometry is returned separately
+        path = [graph.node_ids[node] for node in node_path if graph.node_ids[node] in self.locations]
+
+        # Calculate metrics straight from the edge arrays
+        total_distance = sum(graph.distance_weights[edge] for edge in path_edges)
+        total_time = sum(graph.time_weights[edge] for edge in path_edges)
+
+        result = {
+            "path": path,
+            "path_names": [self.locations[loc]["display_name"] for loc in path],
+            "distance": round(total_distance, 2),
+            "time": round(total_time, 2),
+            "execution_time_ms": execution_time,
+            "nodes_visited": nodes_visited,
+            "edge_relaxations": edge_relaxations,
+            "operations": len(path_edges),
+            "highways_used": highways_used  # Add flag to indicate highway usage
+        }
+
+        if len(path) != len(node_path):
+            result["road_coordinates"] = [[graph.lats[node], graph.lngs[node]] for node in node_path]
+
+        return result
+
+    def reconstruct_edges(self, previous_edge, node):
+        """
+        Follows the previous-edge links back from a node to the start of the search.
+
+        Returns the edge numbers along the path, in order from the start
+        """
+        path_edges = []
+        while node in previous_edge:
+            edge = previous_edge[node]
+            path_edges.append(edge)
+            node = self.graph.edge_source(edge)
+        path_edges.reverse()
+        return path_edges
     
     def dijkstra_algorithm(self, source, destination, optimize_for="distance", avoid_options=None):
-        def run_dijkstra(avoid_highways=True):
-            # Initialization
-            start_time = timer.time()
-            nodes_visited = 0
-            edge_relaxations = 0
-
-            # Choose weight matrix based on optimization preference
-            weight_matrix = self.distances if optimize_for == "distance" else self.times
-            # Initialize distances to infinity for all locations
-            distances = {loc: float('infinity') for loc in self.locations}
-            distances[source] = 0
-            # Priority queue with start node
-            priority_queue = [(0, source)]
-            # Track previous node for path reconstruction
-            previous = {loc: None for loc in self.locations}
-
-            # Handle avoidance options
-            avoided_types = []
-            if avoid_options:
-                if avoid_options.get("tolls", False):
-                    avoided_types.append("toll")
-                if avoid_options.get("highways", False) and avoid_highways:
-                    avoided_types.append("highway")
-
-            highways_used = False  # Track if highways are used
-
-            #Main Dijkstra loop
-            while priority_queue:
-                current_distance, current_node = heapq.heappop(priority_queue)
-                nodes_visited += 1
-                
-                # If reached destination, break the loop
-                if current_node == destination:
-                    break
-                
-                # Skip if we've found a better path already
-                if current_distance > distances[current_node]:
+        """
+        Finds a route with Dijkstra's algorithm.
+
+        The search stops as soon as the destination is settled. It is the same search
+        as shortest_path_tree, just asked about a single target.
+        """
+        tree = self.shortest_path_tree(source, optimize_for, avoid_options, targets=[destination])
+        return tree.route_to(destination)
+
+    def shortest_path_tree(self, source, optimize_for="distance", avoid_options=None, targets=None):
+        """
+        Runs one Dijkstra search from a source and returns the shortest-path tree.
+
+        Routes to any destination can then be read from the tree with route_to,
+        which only follows the path back to the source. If the search was stopped
+        early (because only some targets were asked for), route_to picks it back up
+        for other destinations.
+
+        source: Starting location ID
+        optimize_for: Whether to find shortest distance or fastest time
+        avoid_options: Options to avoid certain road types
+        targets: Location IDs to settle straight away (None searches the whole graph)
+
+        Returns a ShortestPathTree
+        """
+        tree = ShortestPathTree(self, source, optimize_for, avoid_options)
+        tree.settle(targets)
+        return tree
+
+    def a_star_algorithm(self, source, destination, optimize_for="time", avoid_options=None, heuristic_mode="haversine"):
+        """
+        Finds a route with A* search.
+
+        heuristic_mode: "haversine" looks up precomputed NumPy lower bounds for the
+        destination, "alt" uses landmark (ALT) bounds that follow the roads, and
+        "geodesic" calls the heuristic method for every node it reaches
+        """
+        graph = self.graph
+        source_index = graph.index[source]
+        destination_index = graph.index[destination]
+
+        description = "Uses A* search with geographic heuristic to find optimal routes"
+        if heuristic_mode == "alt":
+            # Load or build the landmarks before the clock starts, like the hierarchies
+            landmarks = self.landmark_heuristic()
+            description = "Uses A* search with landmark (ALT) lower bounds that follow the road network"
+
+        # Start timing
+        start_time = timer.time()
+
+        nodes_visited = 0
+        edge_relaxations = 0
+
+        # Choose weight array
+        weights = graph.weights(optimize_for)
+        distance_weights = graph.distance_weights
+        offsets = graph.offsets
+        targets = graph.targets
+        road_type_codes = graph.road_type_codes
+        highway_code = ROAD_TYPE_CODES["highway"]
+
+        # Handle avoidance options
+        blocked, penalized = self.get_road_type_tables(avoid_options)
+
+        if heuristic_mode == "haversine":
+            # One vectorized haversine call (or a cached row) covers every node
+            estimate = self.heuristic_table.row(destination_index, optimize_for).__getitem__
+        elif heuristic_mode == "alt":
+            # Landmark bounds stay valid when roads are avoided: blocking roads
+            # can only make the real costs higher than the ones they were built from
+            estimate = landmarks.row(destination_index, optimize_for, source_index).__getitem__
+        else:
+            # Get destination coordinates for heuristic
+            dest_coords = (graph.lats[destination_index], graph.lngs[destination_index])
+
+            # Heuristic values are only worked out for nodes we reach
+            h_score = {}
+
+            def estimate(node):
+                if node not in h_score:
+                    node_coords = (graph.lats[node], graph.lngs[node])
+                    h_score[node] = self.heuristic(node_coords, dest_coords, optimize_for)
+                return h_score[node]
+
+        # An infinite bound at the start means the destination can't be reached
+        if estimate(source_index) == float('infinity'):
+            return self.no_route_found("A* Search Algorithm")
+
+        # Intialize open set for A*. Entries are (avoided km, f_score, node): the heuristic
+        # only bounds the cost, so routes with fewer avoided kilometres still come first.
+        open_set = []
+        heapq.heappush(open_set, (0.0, estimate(source_index), source_index))
+        previous_edge = {}
+
+        # g_score tracks actual distance from start, avoided_km the kilometres on avoided roads
+        g_score = {source_index: 0}
+        avoided_km = {source_index: 0.0}
+
+        closed_set = set()  # Nodes whose best path is final
+
+        highways_used = False  # Track if highways are used
+
+        # Main A* loop
+        while open_set:
+            # Get node with the fewest avoided kilometres, then the lowest f_score
+            current_avoided, current_f, current = heapq.heappop(open_set)
+            if current in closed_set:
+                continue  # Stale queue entry, we already expanded this node
+            closed_set.add(current)
+            nodes_visited += 1
+
+            # If reached destination, reconstruct path
+            if current == destination_index:
+                path_edges = self.reconstruct_edges(previous_edge, current)
+                execution_time = (timer.time() - start_time) * 1000
+                # Any avoided kilometres mean there was no route without highways
+                used_highway_despite_avoidance = current_avoided > 0
+                result = self.build_route_result(source_index, path_edges, execution_time, nodes_visited,
+                                                 edge_relaxations, highways_used or used_highway_despite_avoidance)
+                result.update({
+                    "algorithm": "A* Search Algorithm",
+                    "algorithm_description": description,
+                    "time_complexity": "O(E) with a good heuristic",
+                    "space_complexity": "O(V)",
+                })
+                # Add flag indicating highways were used despite the request to avoid them
+                if used_highway_despite_avoidance:
+                    result["used_highway_despite_avoidance"] = True
+                return result
+
+            # Check neighbors
+            for edge in range(offsets[current], offsets[current + 1]):
+                # Check if road type should be avoided
+                road_type_code = road_type_codes[edge]
+                if blocked[road_type_code]:
                     continue
 
-                # Check all neighboring locations
-                for neighbor in self.get_adjacent_locations(current_node):
-                    # Check if raod type should be avoided
-                    road_type = self.classify_road_type(current_node, neighbor)
-                    if road_type in avoided_types:
-                        continue
-
-                    if road_type == "highway":
-                        highways_used = True  # Mark if a highway is used
-
-                    # Calculate new distance
-                    weight = weight_matrix[current_node][neighbor]
-                    distance = current_distance + weight
-                    edge_relaxations += 1
-
-                    # If found shorter path, update
-                    if distance < distances[neighbor]:
-                        distances[neighbor] = distance
-                        previous[neighbor] = current_node
-                        heapq.heappush(priority_queue, (distance, neighbor))
-
-            # Reconstruct path
-            path = []
-            current = destination
-            while current:
-                path.append(current)
-                current = previous[current]
-            path.reverse()
-
-            # Validate path (must include source and destination)
-            if len(path) < 2 or path[0] != source or path[-1] != destination:
-                return None
-
-            # Cakcukate metrics
-            total_distance = sum(self.distances[path[i]][path[i+1]] for i in range(len(path) - 1))
-            total_time = sum(self.times[path[i]][path[i+1]] for i in range(len(path) - 1))
-            execution_time = (timer.time() - start_time) * 1000
-
-            # Return detailed result
-            return {
-                "path": path,
-                "path_names": [self.locations[loc]["display_name"] for loc in path],
-                "distance": round(total_distance, 2),
-                "time": round(total_time, 2),
-                "algorithm": "Dijkstra's Algorithm",
-                "algorithm_description": "Uses Dijkstra's shortest path algorithm with pre-calculated distances/times",
-                "time_complexity": "O((V+E)log V)",
-                "space_complexity": "O(V)",
-                "execution_time_ms": execution_time,
-                "nodes_visited": nodes_visited,
-                "edge_relaxations": edge_relaxations,
-                "operations": len(path) - 1,
-                "highways_used": highways_used  # Add flag to indicate highway usage
-            }
-
-        # First attempt: try to avoid highways
-        result = run_dijkstra(avoid_highways=True)
-
-        # Flag to indicate if highways were used despite avoidance
-        used_highway_despite_avoidance = False
-
-        # Fallback: allow highways if no path found and user asked to avoid them
-        if result is None and avoid_options and avoid_options.get("highways", False):
-            result = run_dijkstra(avoid_highways=False)
-            if result and result.get("highways_used", False):
-                used_highway_despite_avoidance = True
-
-        # If no valid path found
-        if result is None:
-            return {
-                "error": "No valid path found",
-                "algorithm": "Dijkstra's Algorithm",
-                "execution_time_ms": 0,
-                "nodes_visited": 0,
-                "edge_relaxations": 0
-            }
+                # Avoided roads can still be used, but every kilometre on them counts first
+                new_avoided = current_avoided
+                if penalized[road_type_code]:
+                    new_avoided += distance_weights[edge]
+                elif road_type_code == highway_code:
+                    highways_used = True  # Mark if a highway is used
+
+                # Calculate tentative g_score
+                neighbor = targets[edge]
+                tentative_g = g_score[current] + weights[edge]
+                edge_relaxations += 1
+
+                # If better path found: fewer avoided kilometres, or as many and a lower cost
+                old_avoided = avoided_km.get(neighbor, float('infinity'))
+                if new_avoided < old_avoided or (new_avoided == old_avoided and tentative_g < g_score[neighbor]):
+                    # Update path
+                    previous_edge[neighbor] = edge
+                    g_score[neighbor] = tentative_g
+                    avoided_km[neighbor] = new_avoided
+
+                    # f_score is g_score + heuristic estimate
+                    heapq.heappush(open_set, (new_avoided, tentative_g + estimate(neighbor), neighbor))
+
+        # No valid path found
+        return self.no_route_found("A* Search Algorithm")
+
+    def time_dependent_algorithm(self, source, destination, departure_time, avoid_options=None, use_heuristic=True):
+        """
+        Finds the fastest route for a given departure time, using the weekly traffic profiles.
 
-        # Add flag indicating highways were used despite the request to avoid them
-        if used_highway_despite_avoidance:
-            result["used_highway_despite_avoidance"] = True
+        Instead of adding up fixed travel times, each node is labelled with the time we
+        arrive there, and every road is timed from that arrival. The profiles never let
+        a later start finish a road earlier (FIFO), so settling nodes in order of arrival
+        is still exact. Traffic only slows roads down, so the free-flow straight-line
+        bounds still work as the A* heuristic.
 
-        return result
+        source: Starting location ID
+        destination: Ending location ID
+        departure_time: datetime we leave at (local time)
+        avoid_options: Options to avoid certain road types
+        use_heuristic: A* with straight-line bounds, or plain Dijkstra when False
+        """
+        graph = self.graph
+        source_index = graph.index[source]
+        destination_index = graph.index[destination]
+        algorithm = "Time-Dependent A* Search" if use_heuristic else "Time-Dependent Dijkstra"
+
+        # Start timing
+        start_time = timer.time()
+
+        nodes_visited = 0
+        edge_relaxations = 0
+
+        free_flow_weights = graph.time_weights
+        distance_weights = graph.distance_weights
+        offsets = graph.offsets
+        targets = graph.targets
+        road_type_codes = graph.road_type_codes
+        highway_code = ROAD_TYPE_CODES["highway"]
+        arrival_after = self.traffic.arrival
+
+        # Handle avoidance options
+        blocked, penalized = self.get_road_type_tables(avoid_options)
+
+        if use_heuristic:
+            estimate = self.heuristic_table.row(destination_index, "time").__getitem__
+            # An infinite bound at the start means the destination can't be reached
+            if estimate(source_index) == float('infinity'):
+                return self.no_route_found(algorithm)
+        else:
+            def estimate(node):
+                return 0.0
+
+        # Labels are minutes since Monday 00:00, so the profiles can be looked up directly
+        departure = week_minute(departure_time)
+
+        # Entries are (avoided km, arrival + estimate, node), like in a_star_algorithm
+        open_set = [(0.0, departure + estimate(source_index), source_index)]
+        previous_edge = {}
+        arrival = {source_index: departure}
+        avoided_km = {source_index: 0.0}
+        closed_set = set()
+        highways_used = False
+
+        while open_set:
+            current_avoided, _, current = heapq.heappop(open_set)
+            if current in closed_set:
+                continue  # Stale queue entry, we already expanded this node
+            closed_set.add(current)
+            nodes_visited += 1
+
+            if current == destination_index:
+                path_edges = self.reconstruct_edges(previous_edge, current)
+                execution_time = (timer.time() - start_time) * 1000
+                used_highway_despite_avoidance = current_avoided > 0
+                result = self.build_route_result(source_index, path_edges, execution_time, nodes_visited,
+                                                 edge_relaxations, highways_used or used_highway_despite_avoidance)
+
+                # build_route_result adds up free-flow times; the real time depends on when we left
+                travel_time = arrival[current] - departure
+                free_flow_time = result["time"]
+                result.update({
+                    "time": round(travel_time, 2),
+                    "free_flow_time": free_flow_time,
+                    "traffic_delay": round(travel_time / free_flow_time - 1, 4) if free_flow_time > 0 else 0.0,
+                    "departure_time": departure_time.isoformat(timespec="minutes"),
+                    "arrival_time": (departure_time + timedelta(minutes=travel_time)).isoformat(timespec="minutes"),
+                    "algorithm": algorithm,
+                    "algorithm_description": "Finds the fastest route for the departure time, "
+                                             "with road speeds from weekly traffic profiles",
+                    "time_complexity": "O((V + E) log V)",
+                    "space_complexity": "O(V)",
+                })
+                if used_highway_despite_avoidance:
+                    result["used_highway_despite_avoidance"] = True
+                return result
+
+            current_arrival = arrival[current]
+            for edge in range(offsets[current], offsets[current + 1]):
+                road_type_code = road_type_codes[edge]
+                if blocked[road_type_code]:
+                    continue
+
+                new_avoided = current_avoided
+                if penalized[road_type_code]:
+                    new_avoided += distance_weights[edge]
+                elif road_type_code == highway_code:
+                    highways_used = True
+
+                # How long this road takes depends on when we get to it
+                neighbor = targets[edge]
+                new_arrival = arrival_after(road_type_code, current_arrival, free_flow_weights[edge])
+                edge_relaxations += 1
 
-    def a_star_algorithm(self, source, destination, optimize_for="time", avoid_options=None):
-        def run_a_star(avoid_highways=True):
-            # Start timing
-            start_time = timer.time()
-
-            nodes_visited = 0
-            edge_relaxations = 0
-            
-            # Choose weight matrix
-            weight_matrix = self.distances if optimize_for == "distance" else self.times
-            
-            # Handle avoidance options
-            avoided_types = []
-            if avoid_options:
-                if avoid_options.get("tolls", False):
-                    avoided_types.append("toll")
-                if avoid_options.get("highways", False) and avoid_highways:
-                    avoided_types.append("highway")
-                    
-            # Get destination coordinates for heuristic         
-            dest_coords = (self.locations[destination]["lat"], self.locations[destination]["lng"])
-            
-            #Intialize open set for A*
-            open_set = []
-            heapq.heappush(open_set, (0, source))
-            came_from = {}
-
-            # g_score tracks actual distance from start
-            g_score = {loc: float('infinity') for loc in self.locations}
-            g_score[source] = 0
-
-            # f_score is g_score + heuristic estimate
-            f_score = {loc: float('infinity') for loc in self.locations}
-            source_coords = (self.locations[source]["lat"], self.locations[source]["lng"])
-            f_score[source] = self.heuristic(source_coords, dest_coords, optimize_for)
-
-            open_set_hash = {source} # For O(1) lookups
-
-            highways_used = False  # Track if highways are used
-
-            # Main A* loop
-            while open_set:
-                # Get node with lowest f_score
-                current_f, current = heapq.heappop(open_set)
-                open_set_hash.remove(current)
-                nodes_visited += 1
-
-                # If reached destination, reconstruct pat
-                if current == destination:
-                    # Reconstruct path
-                    path = []
-                    while current in came_from:
-                        path.append(current)
-                        current = came_from[current]
-                    path.append(source)
-                    path.reverse()
-
-                    # Calculate metrics
-                    total_distance = sum(self.distances[path[i]][path[i+1]] for i in range(len(path)-1))
-                    total_time = sum(self.times[path[i]][path[i+1]] for i in range(len(path)-1))
-                    execution_time = (timer.time() - start_time) * 1000
-
-                    return {
-                        "path": path,
-                        "path_names": [self.locations[loc]["display_name"] for loc in path],
-                        "distance": round(total_distance, 2),
-                        "time": round(total_time, 2),
-                        "algorithm": "A* Search Algorithm",
-                        "algorithm_description": "Uses A* search with geographic heuristic to find optimal routes",
-                        "time_complexity": "O(E) with a good heuristic",
-                        "space_complexity": "O(V)",
-                        "execution_time_ms": execution_time,
-                        "nodes_visited": nodes_visited,
-                        "edge_relaxations": edge_relaxations,
-                        "operations": len(path) - 1,
-                        "highways_used": highways_used  # Track if highways are used
-                    }
-                
-                # Check neighbors
-                for neighbor in self.get_adjacent_locations(current):
-                    # Check if road type should be avoided
-                    road_type = self.classify_road_type(current, neighbor)
-                    if road_type in avoided_types:
-                        continue
-
-                    if road_type == "highway":
-                        highways_used = True  # Mark if a highway is used
-
-                    # Calculate tentative g_score
-                    weight = weight_matrix[current][neighbor]
-                    tentative_g = g_score[current] + weight
-                    edge_relaxations += 1
-
-                    # If better path found
-                    if tentative_g < g_score[neighbor]:
-                        # Update path
-                        came_from[neighbor] = current
-                        g_score[neighbor] = tentative_g
-
-                        # Calculate f_score with heuristic
-                        neighbor_coords = (self.locations[neighbor]["lat"], self.locations[neighbor]["lng"])
-                        h = self.heuristic(neighbor_coords, dest_coords, optimize_for)
-                        f_score[neighbor] = tentative_g + h
-
-                        # Add to open set if not already there
-                        if neighbor not in open_set_hash:
-                            heapq.heappush(open_set, (f_score[neighbor], neighbor))
-                            open_set_hash.add(neighbor)
-
-            return None  # No valid path found
-
-        # First attempt: try to respect highway avoidance
-        result = run_a_star(avoid_highways=True)
-
-        # Flag to indicate if a highway was used despite avoidance
-        used_highway_despite_avoidance = False
-
-        # If that fails and user selected avoid highways, fallback and warn via summary later
-        if result is None and avoid_options and avoid_options.get("highways", False):
-            result = run_a_star(avoid_highways=False)
-            if result and result.get("highways_used", False):
-                used_highway_despite_avoidance = True
+                old_avoided = avoided_km.get(neighbor, float('infinity'))
+                if new_avoided < old_avoided or (new_avoided == old_avoided and new_arrival < arrival[neighbor]):
+                    previous_edge[neighbor] = edge
+                    arrival[neighbor] = new_arrival
+                    avoided_km[neighbor] = new_avoided
+                    heapq.heappush(open_set, (new_avoided, new_arrival + estimate(neighbor), neighbor))
+
+        return self.no_route_found(algorithm)
+
+    def bidirectional_search(self, source_index, destination_index, optimize_for="distance", avoid_options=None,
+                             bounds=None):
+        """
+        Searches forward from the source and backward from the destination at the same time.
+
+        Each step extends whichever side has the smaller queue, so both frontiers do about
+        the same amount of work and meet in the middle. Every road that joins the two
+        searches gives a candidate route, and the search stops once the two smallest keys
+        add up to at least the best candidate, since no route through unsettled nodes can
+        be cheaper.
+
+        With bounds, the keys use average potentials: p(v) = (h_t(v) - h_s(v)) / 2 going
+        forward and -p(v) going backward. Both sides then search the same reduced graph
+        with non-negative weights, so the same stopping rule stays correct.
+
+        Avoided highways are penalized like in the other searches: every label and key is
+        (avoided km, cost), compared kilometres first, and the stopping rule adds both parts.
+
+        source_index, destination_index: Node numbers of the two ends
+        optimize_for: Whether to find shortest distance or fastest time
+        avoid_options: Options to avoid certain road types
+        bounds: Optional (h_t, h_s) lists of lower bounds from every node to the destination
+        and from the source to every node (None runs plain bidirectional Dijkstra)
+
+        Returns (path edges, nodes visited, edge relaxations, highways used, avoided km),
+        or None if there is no route
+        """
+        graph = self.graph
+        weights = graph.weights(optimize_for)
+        distance_weights = graph.distance_weights
+        offsets = graph.offsets
+        targets = graph.targets
+        incoming_offsets, incoming_edges, incoming_sources = graph.incoming()
+        road_type_codes = graph.road_type_codes
+        highway_code = ROAD_TYPE_CODES["highway"]
+        blocked, penalized = self.get_road_type_tables(avoid_options)
+        infinity = float('infinity')
+
+        if bounds is None:
+            def potential(node):
+                return 0.0
+        else:
+            to_destination, from_source = bounds
+
+            def potential(node):
+                return (to_destination[node] - from_source[node]) / 2
+
+        if source_index == destination_index:
+            return [], 1, 0, False, 0.0
+
+        # Index 0 is the forward search from the source, index 1 the backward search from the destination
+        costs = ({source_index: 0.0}, {destination_index: 0.0})
+        avoided_km = ({source_index: 0.0}, {destination_index: 0.0})
+        # Forward: the edge we arrived by. Backward: the edge we leave by towards the destination.
+        parents = ({}, {})
+        settled = (set(), set())
+        queues = ([(0.0, potential(source_index), source_index)],
+                  [(0.0, -potential(destination_index), destination_index)])
+        signs = (1, -1)
+
+        best_avoided = infinity
+        best_cost = infinity
+        best_edge = None  # (edge, node it starts from, node it ends at) joining the two searches
+        nodes_visited = 0
+        edge_relaxations = 0
+        highways_used = False
+
+        # If either side runs out, every node it can reach is settled and the best candidate is final
+        while queues[0] and queues[1]:
+            forward_top, backward_top = queues[0][0], queues[1][0]
+            if (forward_top[0] + backward_top[0], forward_top[1] + backward_top[1]) >= (best_avoided, best_cost):
+                break
+            side = 0 if len(queues[0]) <= len(queues[1]) else 1
+
+            _, _, node = heapq.heappop(queues[side])
+            if node in settled[side]:
+                continue  # Stale queue entry
+            settled[side].add(node)
+            nodes_visited += 1
+
+            side_costs = costs[side]
+            other_costs = costs[1 - side]
+            side_avoided = avoided_km[side]
+            other_avoided = avoided_km[1 - side]
+            side_parents = parents[side]
+            queue = queues[side]
+            sign = signs[side]
+            cost = side_costs[node]
+            node_avoided = side_avoided[node]
+
+            if side == 0:
+                positions = range(offsets[node], offsets[node + 1])
+            else:
+                positions = range(incoming_offsets[node], incoming_offsets[node + 1])
+
+            for position in positions:
+                if side == 0:
+                    edge = position
+                    neighbor = targets[edge]
+                else:
+                    edge = incoming_edges[position]
+                    neighbor = incoming_sources[position]
+
+                # Check if road type should be avoided
+                road_type_code = road_type_codes[edge]
+                if blocked[road_type_code]:
+                    continue
+
+                # Avoided roads can still be used, but every kilometre on them counts first
+                new_avoided = node_avoided
+                if penalized[road_type_code]:
+                    new_avoided += distance_weights[edge]
+                elif road_type_code == highway_code:
+                    highways_used = True  # Mark if a highway is used
+
+                new_cost = cost + weights[edge]
+                edge_relaxations += 1
+
+                old_avoided = side_avoided.get(neighbor, infinity)
+                if new_avoided < old_avoided or (new_avoided == old_avoided and new_cost < side_costs[neighbor]):
+                    side_costs[neighbor] = new_cost
+                    side_avoided[neighbor] = new_avoided
+                    side_parents[neighbor] = edge
+                    heapq.heappush(queue, (new_avoided, new_cost + sign * potential(neighbor), neighbor))
+
+                # The other search has reached the far end of this road, so it joins a route
+                other_cost = other_costs.get(neighbor)
+                if other_cost is not None:
+                    route = (new_avoided + other_avoided[neighbor], new_cost + other_cost)
+                    if route < (best_avoided, best_cost):
+                        best_avoided, best_cost = route
+                        best_edge = (edge, node, neighbor) if side == 0 else (edge, neighbor, node)
+
+        if best_edge is None:
+            return None
+
+        # Forward links back to the source, the joining road, then backward links on to the destination
+        edge, tail, head = best_edge
+        path_edges = self.reconstruct_edges(parents[0], tail)
+        path_edges.append(edge)
+        node = head
+        while node in parents[1]:
+            edge = parents[1][node]
+            path_edges.append(edge)
+            node = targets[edge]
+
+        return path_edges, nodes_visited, edge_relaxations, highways_used, best_avoided
+
+    def run_bidirectional(self, source, destination, optimize_for, avoid_options, algorithm_info, bounds=None):
+        """
+        Runs bidirectional_search between two location IDs and builds the usual result dictionary.
+
+        If highways were avoided and there is no route without them, the route uses as
+        little highway as possible and is flagged, like the other algorithms.
+
+        algorithm_info: The "algorithm", "algorithm_description" and complexity fields to add
+        """
+        source_index = self.graph.index[source]
+
+        start_time = timer.time()
+        found = self.bidirectional_search(source_index, self.graph.index[destination], optimize_for,
+                                          avoid_options, bounds)
 
         # If no route at all
-        if result is None:
-            return {
-                "error": "No valid path found",
-                "algorithm": "A* Search Algorithm",
-                "execution_time_ms": 0,
-                "nodes_visited": 0,
-                "edge_relaxations": 0
-            }
+        if found is None:
+            return self.no_route_found(algorithm_info["algorithm"])
+
+        path_edges, nodes_visited, edge_relaxations, highways_used, avoided = found
+        execution_time = (timer.time() - start_time) * 1000
+        # Any avoided kilometres mean there was no route without highways
+        used_highway_despite_avoidance = avoided > 0
+        result = self.build_route_result(source_index, path_edges, execution_time, nodes_visited,
+                                         edge_relaxations, highways_used or used_highway_despite_avoidance)
+        result.update(algorithm_info)
 
         # Add flag indicating highways were used despite the request to avoid them
         if used_highway_despite_avoidance:
@@ -307,7 +642,78 @@ class RouteAlgorithms:
 
         return result
 
+    def bidirectional_dijkstra_algorithm(self, source, destination, optimize_for="distance", avoid_options=None):
+        """
+        Finds a route with Dijkstra's algorithm run from both ends at once.
+        """
+        return self.run_bidirectional(source, destination, optimize_for, avoid_options, {
+            "algorithm": "Bidirectional Dijkstra",
+            "algorithm_description": "Runs Dijkstra's algorithm from the source and the destination until the searches meet",
+            "time_complexity": "O((V+E)log V), about half the nodes of one-way Dijkstra",
+            "space_complexity": "O(V)",
+        })
+
+    def bidirectional_a_star_algorithm(self, source, destination, optimize_for="time", avoid_options=None):
+        """
+        Finds a route with A* search run from both ends at once.
+
+        The forward search is guided by the straight-line bounds to the destination and
+        the backward search by the bounds to the source. A straight line is the same
+        length both ways, so the cached rows for the source work for the backward side.
+        """
+        graph = self.graph
+        bounds = (self.heuristic_table.row(graph.index[destination], optimize_for),
+                  self.heuristic_table.row(graph.index[source], optimize_for))
+        return self.run_bidirectional(source, destination, optimize_for, avoid_options, {
+            "algorithm": "Bidirectional A* Search",
+            "algorithm_description": "Runs A* search from both ends with averaged straight-line potentials until the searches meet",
+            "time_complexity": "O(E) with a good heuristic",
+            "space_complexity": "O(V)",
+        }, bounds)
+
+    def landmark_heuristic(self):
+        """
+        Returns the ALT landmark table for the road graph (both metrics).
+        """
+        return get_landmark_heuristic(self.graph, self.landmark_dir, self.heuristic_table)
+
+    def contraction_hierarchy(self, optimize_for="distance"):
+        """
+        Returns the contraction hierarchy for the distance or time metric.
+        """
+        return get_contraction_hierarchy(self.graph, optimize_for, self.hierarchy_dir)
 
+    def contraction_hierarchy_algorithm(self, source, destination, optimize_for="distance", avoid_options=None):
+        """
+        Finds a route with a Contraction Hierarchies query.
+
+        The hierarchies are built for the whole road network, so when the user asks
+        to avoid road types we have in the graph the search falls back to Dijkstra.
+        """
+        blocked = self.graph.blocked_road_types(self.get_avoided_road_types(avoid_options))
+        if any(blocked):
+            return self.dijkstra_algorithm(source, destination, optimize_for, avoid_options)
+
+        hierarchy = self.contraction_hierarchy(optimize_for)
+        source_index = self.graph.index[source]
+
+        # Start timing once the hierarchy is ready, so only the query is measured
+        start_time = timer.time()
+        found = hierarchy.query(source_index, self.graph.index[destination])
+        if found is None:
+            return self.no_route_found("Contraction Hierarchies")
+
+        _, path_edges, nodes_visited, edge_relaxations = found
+        execution_time = (timer.time() - start_time) * 1000
+        result = self.build_route_result(source_index, path_edges, execution_time, nodes_visited,
+                                         edge_relaxations, uses_highways(self.graph, path_edges))
+        result.update({
+            "algorithm": "Contraction Hierarchies",
+            "algorithm_description": "Searches up a precomputed node hierarchy from both ends and unpacks the shortcuts",
+            "time_complexity": "O(k log k) for the k nodes above the source and destination",
+            "space_complexity": "O(V + E + shortcuts)",
+        })
+        return result
     
     def heuristic(self, current_coords, dest_coords, optimize_for="time"):
         """
@@ -330,9 +736,9 @@ class RouteAlgorithms:
             # (This works because no path can be shorter than a straight line)
             return distance
         else:  # optimize_for == "time"
-            # For time, convert distance to time using an average speed
-            # Assume 60 km/h average speed (1 km per minute)
-            return (distance / 60) * 60  # Convert to minutes
+            # For time, convert distance to time using our fastest road speed,
+            # so the estimate can never be more than the real travel time
+            return (distance / max(ROAD_SPEEDS.values())) * 60  # Convert to minutes
     
     def classify_road_type(self, source, destination):
         """
@@ -344,70 +750,9 @@ class RouteAlgorithms:
         
         Returns the road type (highway, primary, secondary, tertiary)
         """
-        # Known highways in Jamaica
-        highways = [
-            ("new_kingston", "spanish_town"),
-            ("halfway_tree", "spanish_town"),
-            ("cross_roads", "spanish_town"),
-            ("spanish_town", "port_royal"),
-            ("liguanea", "spanish_town"),
-            ("papine", "spanish_town"),
-            ("university_hospital", "spanish_town"),
-            ("mona", "spanish_town"),
-            ("mona_heights", "spanish_town"),
-            ("hope_zoo", "spanish_town"),
-            ("barbican", "spanish_town"),
-            ("constant_spring", "spanish_town"),
-            ("manor_park", "spanish_town"), 
-            ("new_kingston", "old_harbour"),
-            ("halfway_tree", "old_harbour"),
-            ("cross_roads", "old_harbour"),
-            ("old_harbour", "port_royal"),
-            ("liguanea", "old_harbour"),
-            ("papine", "old_harbour"),
-            ("university_hospital", "old_harbour"),
-            ("mona", "old_harbour"),
-            ("mona_heights", "old_harbour"),
-            ("hope_zoo", "old_harbour"),
-            ("barbican", "old_harbour"),
-            ("constant_spring", "old_harbour"),
-            ("manor_park", "old_harbour"),  
-        ]
-        
-        # Known primary roads
-        primary_roads = [
-            ("new_kingston", "halfway_tree"),
-            ("new_kingston", "cross_roads"),
-            ("new_kingston", "liguanea"),
-            ("constant_spring", "halfway_tree"),
-            ("manor_park", "constant_spring"),
-            ("halfway_tree", "cross_roads"),
-            ("liguanea", "hope_zoo"),
-            ("liguanea", "papine"),
-            ("liguanea", "mona"),
-            ("hope_zoo", "papine"),
-            ("mona", "papine"),
-            ("papine", "university_hospital"),
-            
-        ]
-        
-        # Check if this is a known highway
-        for start, end in highways:
-            if (source == start and destination == end) or (source == end and destination == start):
-                return "highway"
-        
-        # Check if this is a known primary road
-        for start, end in primary_roads:
-            if (source == start and destination == end) or (source == end and destination == start):
-                return "primary"
-        
-        # University areas have smaller roads
-        university_areas = ["mona", "papine", "university_hospital", "mona_heights", "hope_zoo"]
-        if source in university_areas and destination in university_areas:
-            return "tertiary"
-        
-        # Default to secondary roads for other connections
-        return "primary"
+        # Known highways, primary roads and university areas live in road_types.json,
+        # compiled once into a lookup table keyed by the (unordered) pair of locations
+        return self.road_types.classify(source, destination)
         
         
     def find_shortest_route(self, source, destination, optimize_for="distance", avoid_options=None):
@@ -421,16 +766,219 @@ class RouteAlgorithms:
         
         Returns the route details
         """
-        return self.dijkstra_algorithm(source, destination, optimize_for, avoid_options)
+        if self.memo is None:
+            return self.dijkstra_algorithm(source, destination, optimize_for, avoid_options)
+        key = self.memo.key("dijkstra", source, destination, optimize_for, avoid_options)
+        return self.memo.lookup(key, lambda: self.dijkstra_algorithm(source, destination, optimize_for, avoid_options))
     
-    def find_fastest_route(self, source, destination, avoid_options=None):
+    def find_fastest_route(self, source, destination, avoid_options=None, departure_time=None):
         """
         Convenience method to find the fastest route by time.
         
         source: Starting point
         destination: Ending point
         avoid_options: Options to avoid certain road types
+        departure_time: Optional datetime to leave at, so traffic is taken into account
         
         Returns the route details
         """
-        return self.a_star_algorithm(source, destination, "time", avoid_options)
\ No newline at end of file
+        if departure_time is not None:
+            if self.memo is None:
+                return self.time_dependent_algorithm(source, destination, departure_time, avoid_options)
+            key = self.memo.key("td_a_star", source, destination, "time", avoid_options,
+                                departure_time.isoformat(timespec="minutes"))
+            return self.memo.lookup(key, lambda: self.time_dependent_algorithm(
+                source, destination, departure_time, avoid_options))
+        if self.memo is None:
+            return self.a_star_algorithm(source, destination, "time", avoid_options)
+        key = self.memo.key("a_star", source, destination, "time", avoid_options)
+        return self.memo.lookup(key, lambda: self.a_star_algorithm(source, destination, "time", avoid_options))
+
+
+class ShortestPathTree:
+    """
+    The result of one Dijkstra search from a single source.
+
+    The tree keeps the search's queue, so it can be asked about any destination:
+    destinations that are already settled are answered by following previous-edge
+    links back to the source (O(path length)), and the search is only continued
+    when a destination hasn't been reached yet.
+
+    Trees are made for one request and used from one thread, so they aren't locked.
+    """
+
+    def __init__(self, algorithms, source, optimize_for="distance", avoid_options=None):
+        """
+        Sets up an empty search from the source.
+
+        algorithms: RouteAlgorithms instance that owns the graph
+        source: Starting location ID
+        optimize_for: Whether to find shortest distance or fastest time
+        avoid_options: Options to avoid certain road types
+        """
+        self.algorithms = algorithms
+        self.graph = algorithms.graph
+        self.source = source
+        self.source_index = self.graph.index[source]
+        self.optimize_for = optimize_for
+        self.avoid_options = avoid_options
+
+        # Choose weight array based on optimization preference
+        self.weights = self.graph.weights(optimize_for)
+        # Handle avoidance options (avoided highways are penalized rather than blocked)
+        self.blocked, self.penalized = algorithms.get_road_type_tables(avoid_options)
+
+        # Only nodes we reach get an entry, everything else is treated as infinity
+        self.distances = {self.source_index: 0}
+        # Kilometres on avoided roads along the best path to every node we reach
+        self.avoided_km = {self.source_index: 0.0}
+        # Track the edge we arrived by for path reconstruction
+        self.previous_edge = {}
+        # Nodes whose shortest distance is final
+        self.settled = set()
+        # Priority queue with start node, ordered by avoided kilometres and then distance
+        self.priority_queue = [(0.0, 0, self.source_index)]
+
+        # Search statistics for the whole tree, and how much of them route_to has reported
+        self.nodes_visited = 0
+        self.edge_relaxations = 0
+        self.highways_used = False  # Track if highways are used
+        self.search_time_ms = 0.0
+        self.reported = (0, 0, 0.0)
+
+    def settle(self, targets=None):
+        """
+        Continues the search until all targets are settled (or everything, if targets is None).
+
+        targets: Location IDs to settle
+        """
+        graph = self.graph
+        remaining = None
+        if targets is not None:
+            remaining = {graph.index[target] for target in targets} - self.settled
+            if not remaining:
+                return
+
+        start_time = timer.time()
+
+        weights = self.weights
+        distance_weights = graph.distance_weights
+        blocked = self.blocked
+        penalized = self.penalized
+        offsets = graph.offsets
+        edge_targets = graph.targets
+        road_type_codes = graph.road_type_codes
+        highway_code = ROAD_TYPE_CODES["highway"]
+        distances = self.distances
+        avoided_km = self.avoided_km
+        previous_edge = self.previous_edge
+        settled = self.settled
+        priority_queue = self.priority_queue
+
+        #Main Dijkstra loop
+        while priority_queue:
+            current_avoided, current_distance, current_node = heapq.heappop(priority_queue)
+            self.nodes_visited += 1
+
+            # Skip if we've found a better path already
+            if current_node in settled:
+                continue
+            settled.add(current_node)
+
+            # Check all neighboring locations
+            for edge in range(offsets[current_node], offsets[current_node + 1]):
+                # Check if road type should be avoided
+                road_type_code = road_type_codes[edge]
+                if blocked[road_type_code]:
+                    continue
+
+                # Avoided roads can still be used, but every kilometre on them counts first
+                avoided = current_avoided
+                if penalized[road_type_code]:
+                    avoided += distance_weights[edge]
+                elif road_type_code == highway_code:
+                    self.highways_used = True  # Mark if a highway is used
+
+                # Calculate new distance
+                neighbor = edge_targets[edge]
+                distance = current_distance + weights[edge]
+                self.edge_relaxations += 1
+
+                # If found a better path (fewer avoided kilometres, or as many and shorter), update
+                old_avoided = avoided_km.get(neighbor, float('infinity'))
+                if avoided < old_avoided or (avoided == old_avoided and distance < distances[neighbor]):
+                    distances[neighbor] = distance
+                    avoided_km[neighbor] = avoided
+                    previous_edge[neighbor] = edge
+                    heapq.heappush(priority_queue, (avoided, distance, neighbor))
+
+            # Stop once every target we were asked about is settled
+            if remaining is not None:
+                remaining.discard(current_node)
+                if not remaining:
+                    break
+
+        self.search_time_ms += (timer.time() - start_time) * 1000
+
+    def take_search_stats(self):
+        """
+        Returns (search time in ms, nodes visited, edge relaxations) since the last call.
+
+        Each route read from the tree reports only the search work done for it: the
+        first one gets the search up to its destination, later ones only the extra
+        work needed to reach theirs (nothing if they were already settled).
+        """
+        reported_nodes, reported_relaxations, reported_time = self.reported
+        self.reported = (self.nodes_visited, self.edge_relaxations, self.search_time_ms)
+        return (self.search_time_ms - reported_time, self.nodes_visited - reported_nodes,
+                self.edge_relaxations - reported_relaxations)
+
+    def reaches(self, destination):
+        """Returns True if there is a route from the source to the destination."""
+        self.settle([destination])
+        return self.graph.index[destination] in self.previous_edge
+
+    def cost_to(self, destination):
+        """Returns the total distance or time to the destination (infinity if unreachable)."""
+        self.settle([destination])
+        return self.distances.get(self.graph.index[destination], float('infinity'))
+
+    def path_to(self, destination):
+        """Returns the location IDs along the route to the destination ([] if unreachable)."""
+        if not self.reaches(destination):
+            return []
+        destination_index = self.graph.index[destination]
+        path_edges = self.algorithms.reconstruct_edges(self.previous_edge, destination_index)
+        return [self.source] + [self.graph.node_ids[self.graph.targets[edge]] for edge in path_edges]
+
+    def route_to(self, destination):
+        """
+        Returns the route to a destination in the same format as dijkstra_algorithm.
+
+        If highways were avoided and the destination can only be reached on a highway,
+        the route uses as little highway as possible and is flagged with
+        used_highway_despite_avoidance.
+        """
+        reachable = self.reaches(destination)
+        search_time_ms, nodes_visited, edge_relaxations = self.take_search_stats()
+        if not reachable:
+            # If no valid path found
+            return self.algorithms.no_route_found("Dijkstra's Algorithm")
+
+        destination_index = self.graph.index[destination]
+        path_edges = self.algorithms.reconstruct_edges(self.previous_edge, destination_index)
+        # Any avoided kilometres mean there was no route without highways
+        used_highway_despite_avoidance = self.avoided_km[destination_index] > 0
+        result = self.algorithms.build_route_result(
+            self.source_index, path_edges, search_time_ms, nodes_visited,
+            edge_relaxations, self.highways_used or used_highway_despite_avoidance)
+        result.update({
+            "algorithm": "Dijkstra's Algorithm",
+            "algorithm_description": "Uses Dijkstra's shortest path algorithm with pre-calculated distances/times",
+            "time_complexity": "O((V+E)log V)",
+            "space_complexity": "O(V)",
+        })
+        # Add flag indicating highways were used despite the request to avoid them
+        if used_highway_despite_avoidance:
+            result["used_highway_despite_avoidance"] = True
+        return result
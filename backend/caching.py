@@ -0,0 +1,260 @@
+"""
+Names: Shanaldo Carty,
+Completion Date: 08/7/2025
+"""
+
+"""
+Caching helpers for the Jamaica Route Finder project.
+This file holds a small thread-safe LRU cache, the route memo (which makes sure the
+same route search is only run once per request, and optionally once for the whole
+server process) and the response cache for outside routing services.
+"""
+
+import copy
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+
+class LRUCache:
+    """
+    A size-bounded dictionary that throws away the least recently used entry first.
+
+    Entries can also be given a time to live, after which they count as missing.
+    Safe to share between request threads. Hits and misses are counted so we can
+    see how well the cache is doing.
+    """
+
+    def __init__(self, max_size=256, ttl=None):
+        """
+        Sets up an empty cache.
+
+        max_size: Most entries to keep
+        ttl: Seconds an entry stays valid (None keeps entries until they are evicted)
+        """
+        self.max_size = max_size
+        self.ttl = ttl
+        self.entries = OrderedDict()  # key -> (expiry time or None, value)
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+
+    def get(self, key, default=None):
+        """
+        Returns the cached value for a key, or default if it isn't cached (or has expired).
+        """
+        with self.lock:
+            if key in self.entries:
+                expires_at, value = self.entries[key]
+                if expires_at is None or time.time() < expires_at:
+                    self.entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self.entries[key]
+                self.expired += 1
+            self.misses += 1
+            return default
+
+    def put(self, key, value):
+        """
+        Stores a value, evicting the oldest entries if the cache is full.
+        """
+        expires_at = time.time() + self.ttl if self.ttl else None
+        with self.lock:
+            self.entries[key] = (expires_at, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_size:
+                self.entries.popitem(last=False)
+
+    def clear(self):
+        """Removes every entry (the counters are kept)."""
+        with self.lock:
+            self.entries.clear()
+
+    def stats(self):
+        """
+        Returns a dictionary with the size and hit/miss counts of the cache.
+        """
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self.entries),
+                "max_size": self.max_size,
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "expired": self.expired,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+    def __len__(self):
+        return len(self.entries)
+
+
+def normalize_avoid_options(avoid_options):
+    """
+    Turns an avoid options dictionary into a hashable key.
+
+    Only the options that are switched on matter, so {} and {"tolls": False}
+    give the same key.
+    """
+    if not avoid_options:
+        return ()
+    return tuple(sorted(option for option, enabled in avoid_options.items() if enabled))
+
+
+class RouteMemo:
+    """
+    Remembers route search results so identical searches are only run once.
+
+    Every request gets its own memo (begin_request / end_request), so one request
+    never runs the same search twice. If max_size is above zero the results are
+    also kept in a process-wide LRU cache and shared between requests.
+
+    Results are copied on the way in and out, because the endpoints add extra keys
+    to the route dictionaries they get back.
+    """
+
+    def __init__(self, max_size=0):
+        """
+        Sets up the memo.
+
+        max_size: Number of routes to keep between requests (0 keeps them for one request only)
+        """
+        self.shared = LRUCache(max_size) if max_size > 0 else None
+        self.local = threading.local()
+
+    def begin_request(self):
+        """Starts an empty memo for the current request thread."""
+        self.local.routes = {}
+
+    def end_request(self):
+        """Throws away the memo of the current request thread."""
+        self.local.routes = None
+
+    def key(self, algorithm, source, destination, optimize_for, avoid_options, *extra):
+        """
+        Builds the memo key for a search.
+
+        Anything other than "distance" is searched on travel times, so all of those
+        share one key.
+        """
+        metric = "distance" if optimize_for == "distance" else "time"
+        return (algorithm, source, destination, metric, normalize_avoid_options(avoid_options)) + extra
+
+    def lookup(self, key, search):
+        """
+        Returns the result for a key, running search() only if nobody has yet.
+
+        key: Key from RouteMemo.key
+        search: Function that runs the search and returns the route dictionary
+        """
+        routes = getattr(self.local, "routes", None)
+
+        result = routes.get(key) if routes is not None else None
+        if result is None and self.shared is not None:
+            result = self.shared.get(key)
+        if result is None:
+            result = copy.deepcopy(search())
+            if self.shared is not None:
+                self.shared.put(key, result)
+
+        if routes is not None:
+            routes[key] = result
+        return copy.deepcopy(result)
+
+
+class ResponseCache:
+    """
+    Cache for responses from outside APIs (like OpenRouteService directions).
+
+    Responses are keyed by a canonical form of the request body, so the same
+    coordinates, preference and avoid features always give the same key no matter
+    how the dictionary was built. An in-memory LRU cache sits in front of an
+    optional folder of JSON files, so cached responses also survive a restart.
+    """
+
+    def __init__(self, max_size=512, ttl=24 * 60 * 60, directory=None):
+        """
+        Sets up the cache.
+
+        max_size: Most responses to keep in memory
+        ttl: Seconds a response stays valid, in memory and on disk
+        directory: Folder for the on-disk copies (None keeps responses in memory only)
+        """
+        self.memory = LRUCache(max_size, ttl)
+        self.ttl = ttl
+        self.directory = directory
+        self.disk_hits = 0
+        self.disk_writes = 0
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    @staticmethod
+    def make_key(url, body):
+        """
+        Builds the cache key for a request: the URL plus the body as sorted, compact JSON.
+        """
+        return url + " " + json.dumps(body, sort_keys=True, separators=(",", ":"))
+
+    def disk_path(self, key):
+        """Returns the file a response is saved in, named by the SHA-1 of its key."""
+        return os.path.join(self.directory, hashlib.sha1(key.encode("utf-8")).hexdigest() + ".json")
+
+    def get(self, url, body):
+        """
+        Returns the cached response for a request, or None.
+        """
+        key = self.make_key(url, body)
+        response = self.memory.get(key)
+        if response is not None or not self.directory:
+            return response
+
+        # Fall back to the copy on disk, and bring it back into memory
+        try:
+            with open(self.disk_path(key), 'r') as f:
+                saved = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if saved.get("key") != key:
+            return None
+        if self.ttl and time.time() - saved.get("saved_at", 0) > self.ttl:
+            return None
+
+        self.disk_hits += 1
+        self.memory.put(key, saved["response"])
+        return saved["response"]
+
+    def put(self, url, body, response):
+        """
+        Stores a response in memory and (if enabled) on disk.
+        """
+        key = self.make_key(url, body)
+        self.memory.put(key, response)
+        if not self.directory:
+            return
+
+        # Write to a temporary file first so readers never see half a file
+        path = self.disk_path(key)
+        temp_path = f"{path}.{threading.get_ident()}.tmp"
+        try:
+            with open(temp_path, 'w') as f:
+                json.dump({"key": key, "saved_at": time.time(), "response": response}, f)
+            os.replace(temp_path, path)
+            self.disk_writes += 1
+        except OSError as e:
+            print(f"Could not save cached response: {e}")
+
+    def stats(self):
+        """
+        Returns the hit/miss counts of the memory cache plus the disk counters.
+        """
+        stats = self.memory.stats()
+        stats["disk_directory"] = self.directory
+        stats["disk_hits"] = self.disk_hits
+        stats["disk_writes"] = self.disk_writes
+        return stats
@@ -0,0 +1,441 @@
+"""
+Names: Shanaldo Carty,
+Completion Date: 08/7/2025
+"""
+
+"""
+Contraction Hierarchies for the Jamaica Route Finder project.
+Preprocessing ranks every node by importance and "contracts" them from least to
+most important, adding shortcut edges so that shortest paths never need the nodes
+already removed. A query is then a small Dijkstra search from each end that only
+ever goes up the ranking, and the shortcuts on the route are unpacked back into
+real roads.
+
+The hierarchy is built once per road graph and metric (distance or time) and saved
+to disk. Run "python contraction_hierarchy.py [matrix|osm]" to build both hierarchies
+ahead of time and print how much faster they are than plain Dijkstra.
+"""
+
+import heapq
+import os
+import time as timer
+from array import array
+
+import numpy as np
+
+from graph_preprocessing import (METRICS, GraphFileCache, compare_searches, graph_fingerprint, load_arrays,
+                                 run_reports, save_arrays, search_metric)
+from road_graph import ROAD_TYPE_CODES
+
+# Saved hierarchies start with this tag, so old files are rebuilt if the format changes
+HIERARCHY_FORMAT = "JRFCH01"
+
+# Witness searches give up after settling this many nodes and just add the shortcut.
+# Extra shortcuts never give wrong answers, they only make queries a little slower.
+DEFAULT_WITNESS_SETTLE_LIMIT = 60
+
+
+def hierarchy_fingerprint(graph, metric):
+    """Returns the fingerprint a saved hierarchy for this graph and metric must match."""
+    return graph_fingerprint(graph, (metric,), HIERARCHY_FORMAT)
+
+
+class ContractionHierarchy:
+    """
+    A contracted road graph for one metric.
+
+    Every edge of the hierarchy is numbered. An edge is either a real road (original
+    holds its edge number in the RoadGraph) or a shortcut standing for two hierarchy
+    edges in a row (first and second). The roads going up the ranking from node v are
+    up_edges[up_offsets[v]:up_offsets[v + 1]], and the roads coming into v from
+    higher-ranked nodes are down_edges[down_offsets[v]:down_offsets[v + 1]].
+    """
+
+    ARRAY_NAMES = ("rank", "edge_sources", "edge_targets", "edge_weights", "edge_first", "edge_second",
+                   "edge_original", "up_offsets", "up_edges", "down_offsets", "down_edges")
+
+    def __init__(self, metric, fingerprint, rank, edge_sources, edge_targets, edge_weights, edge_first,
+                 edge_second, edge_original, up_offsets, up_edges, down_offsets, down_edges):
+        self.metric = metric
+        self.fingerprint = fingerprint
+        self.rank = rank
+        self.edge_sources = edge_sources
+        self.edge_targets = edge_targets
+        self.edge_weights = edge_weights
+        self.edge_first = edge_first
+        self.edge_second = edge_second
+        self.edge_original = edge_original
+        self.up_offsets = up_offsets
+        self.up_edges = up_edges
+        self.down_offsets = down_offsets
+        self.down_edges = down_edges
+
+    @property
+    def node_count(self):
+        """Number of nodes in the hierarchy."""
+        return len(self.rank)
+
+    @property
+    def shortcut_count(self):
+        """Number of shortcut edges preprocessing added."""
+        return sum(1 for original in self.edge_original if original < 0)
+
+    @classmethod
+    def build(cls, graph, optimize_for="distance", settle_limit=DEFAULT_WITNESS_SETTLE_LIMIT, verbose=False):
+        """
+        Orders and contracts every node of a RoadGraph.
+
+        Nodes are contracted in order of edge difference (shortcuts added minus edges
+        removed) plus the number of neighbours already contracted, which spreads the
+        contraction evenly over the map. Priorities are updated lazily: a node is only
+        contracted if its recomputed priority is still the smallest.
+
+        graph: RoadGraph to contract
+        optimize_for: "distance" for kilometers, anything else for minutes
+        settle_limit: Most nodes a witness search may settle
+        verbose: Print progress while contracting
+        """
+        metric = search_metric(optimize_for)
+        weights = graph.weights(metric)
+        node_count = graph.node_count
+        infinity = float('infinity')
+
+        edge_sources = array("l")
+        edge_targets = array("l")
+        edge_weights = array("d")
+        edge_first = array("l")
+        edge_second = array("l")
+        edge_original = array("l")
+
+        # The graph still to be contracted: out_edges[u][w] / in_edges[w][u] = hierarchy edge number
+        out_edges = [{} for _ in range(node_count)]
+        in_edges = [{} for _ in range(node_count)]
+
+        def add_edge(source, target, weight, first, second, original):
+            # Only the cheapest edge between two nodes is worth keeping
+            existing = out_edges[source].get(target)
+            if existing is not None and edge_weights[existing] <= weight:
+                return
+            number = len(edge_sources)
+            edge_sources.append(source)
+            edge_targets.append(target)
+            edge_weights.append(weight)
+            edge_first.append(first)
+            edge_second.append(second)
+            edge_original.append(original)
+            out_edges[source][target] = number
+            in_edges[target][source] = number
+
+        for node in range(node_count):
+            for edge in graph.edges(node):
+                target = graph.targets[edge]
+                if target != node:
+                    add_edge(node, target, weights[edge], -1, -1, edge)
+
+        def witness_costs(start, skipped, max_cost, wanted):
+            # Dijkstra from start that avoids the node being contracted, stopping once
+            # every wanted node is settled, the costs pass max_cost, or the limit is hit
+            costs = {start: 0.0}
+            queue = [(0.0, start)]
+            remaining = set(wanted)
+            settled = 0
+            while queue:
+                cost, node = heapq.heappop(queue)
+                if cost > costs[node]:
+                    continue
+                if cost > max_cost:
+                    break
+                remaining.discard(node)
+                settled += 1
+                if not remaining or settled > settle_limit:
+                    break
+                for neighbor, edge in out_edges[node].items():
+                    if neighbor == skipped:
+                        continue
+                    new_cost = cost + edge_weights[edge]
+                    if new_cost < costs.get(neighbor, infinity):
+                        costs[neighbor] = new_cost
+                        heapq.heappush(queue, (new_cost, neighbor))
+            return costs
+
+        def needed_shortcuts(node):
+            # Shortcuts u -> w through node, for every u -> node -> w with no path
+            # at least as cheap that avoids node
+            shortcuts = []
+            outgoing = list(out_edges[node].items())
+            if not outgoing:
+                return shortcuts
+            for source, edge_in in in_edges[node].items():
+                weight_in = edge_weights[edge_in]
+                wanted = [target for target, _ in outgoing if target != source]
+                if not wanted:
+                    continue
+                max_cost = weight_in + max(edge_weights[edge] for target, edge in outgoing if target != source)
+                costs = witness_costs(source, node, max_cost, wanted)
+                for target, edge_out in outgoing:
+                    if target == source:
+                        continue
+                    via = weight_in + edge_weights[edge_out]
+                    if costs.get(target, infinity) > via:
+                        shortcuts.append((source, target, via, edge_in, edge_out))
+            return shortcuts
+
+        contracted_neighbors = [0] * node_count
+
+        def priority(node):
+            edge_difference = len(needed_shortcuts(node)) - len(in_edges[node]) - len(out_edges[node])
+            return edge_difference + contracted_neighbors[node]
+
+        queue = [(priority(node), node) for node in range(node_count)]
+        heapq.heapify(queue)
+
+        rank = array("l", [0] * node_count)
+        up_lists = [None] * node_count
+        down_lists = [None] * node_count
+        next_rank = 0
+        start_time = timer.time()
+
+        while queue:
+            _, node = heapq.heappop(queue)
+
+            # Lazy update: if the node's priority went up, put it back and try the next one
+            current = priority(node)
+            if queue and current > queue[0][0]:
+                heapq.heappush(queue, (current, node))
+                continue
+
+            for source, target, via, edge_in, edge_out in needed_shortcuts(node):
+                add_edge(source, target, via, edge_in, edge_out, -1)
+
+            # Every remaining neighbour ranks higher, so these edges are final
+            up_lists[node] = list(out_edges[node].values())
+            down_lists[node] = list(in_edges[node].values())
+            for target in out_edges[node]:
+                del in_edges[target][node]
+                contracted_neighbors[target] += 1
+            for source in in_edges[node]:
+                del out_edges[source][node]
+                contracted_neighbors[source] += 1
+            out_edges[node] = {}
+            in_edges[node] = {}
+
+            rank[node] = next_rank
+            next_rank += 1
+            if verbose and next_rank % 10000 == 0:
+                print(f"  contracted {next_rank}/{node_count} nodes, "
+                      f"{len(edge_sources)} edges, {timer.time() - start_time:.1f}s")
+
+        up_offsets, up_edges = _flatten(up_lists)
+        down_offsets, down_edges = _flatten(down_lists)
+
+        return cls(metric, hierarchy_fingerprint(graph, metric), rank, edge_sources, edge_targets, edge_weights,
+                   edge_first, edge_second, edge_original, up_offsets, up_edges, down_offsets, down_edges)
+
+    def save(self, filename):
+        """
+        Writes the hierarchy to a NumPy .npz file.
+        """
+        # Integers are saved as 64 bits whatever size a C long is on this platform
+        arrays = {}
+        for name in self.ARRAY_NAMES:
+            values = getattr(self, name)
+            arrays[name] = np.asarray(values, dtype=np.float64 if values.typecode == "d" else np.int64)
+        save_arrays(filename, HIERARCHY_FORMAT, metric=np.array(self.metric),
+                    fingerprint=np.array(self.fingerprint), **arrays)
+
+    @classmethod
+    def load(cls, filename):
+        """
+        Reads a hierarchy written by save(). Returns None if the file is missing or from an older format.
+        """
+        data = load_arrays(filename, HIERARCHY_FORMAT)
+        if data is None or any(name not in data for name in cls.ARRAY_NAMES + ("metric", "fingerprint")):
+            return None
+        arrays = {}
+        for name in cls.ARRAY_NAMES:
+            values = data[name]
+            if values.dtype == np.float64:
+                arrays[name] = array("d", values.tobytes())
+            elif values.dtype == np.int64:
+                arrays[name] = array("q", values.tobytes())
+            else:
+                return None
+        return cls(str(data["metric"]), str(data["fingerprint"]), **arrays)
+
+    def query(self, source, target):
+        """
+        Finds the cheapest route between two node numbers.
+
+        Runs a Dijkstra search up the hierarchy from each end, always extending the
+        side whose next node is closer. A side stops once its next node costs at
+        least the best route found so far, since going further can't improve it.
+
+        Returns (cost, RoadGraph edge numbers along the route, nodes visited,
+        edge relaxations), or None if the target can't be reached
+        """
+        if source == target:
+            return 0.0, [], 1, 0
+
+        infinity = float('infinity')
+        edge_sources = self.edge_sources
+        edge_targets = self.edge_targets
+        edge_weights = self.edge_weights
+        up_offsets, up_edges = self.up_offsets, self.up_edges
+        down_offsets, down_edges = self.down_offsets, self.down_edges
+
+        # Forward search goes up from the source, backward search goes up from the target
+        costs = ({source: 0.0}, {target: 0.0})
+        parents = ({}, {})
+        queues = ([(0.0, source)], [(0.0, target)])
+        best_cost = infinity
+        meeting_node = None
+        nodes_visited = 0
+        edge_relaxations = 0
+
+        while True:
+            forward_open = queues[0] and queues[0][0][0] < best_cost
+            backward_open = queues[1] and queues[1][0][0] < best_cost
+            if not forward_open and not backward_open:
+                break
+            side = 0 if forward_open and (not backward_open or queues[0][0][0] <= queues[1][0][0]) else 1
+
+            cost, node = heapq.heappop(queues[side])
+            side_costs = costs[side]
+            if cost > side_costs[node]:
+                continue
+            nodes_visited += 1
+
+            # Both searches have reached this node, so it joins a route
+            other_cost = costs[1 - side].get(node)
+            if other_cost is not None and cost + other_cost < best_cost:
+                best_cost = cost + other_cost
+                meeting_node = node
+
+            if side == 0:
+                edges = up_edges[up_offsets[node]:up_offsets[node + 1]]
+                ends = edge_targets
+            else:
+                edges = down_edges[down_offsets[node]:down_offsets[node + 1]]
+                ends = edge_sources
+            side_parents = parents[side]
+            for edge in edges:
+                neighbor = ends[edge]
+                new_cost = cost + edge_weights[edge]
+                edge_relaxations += 1
+                if new_cost < side_costs.get(neighbor, infinity):
+                    side_costs[neighbor] = new_cost
+                    side_parents[neighbor] = edge
+                    heapq.heappush(queues[side], (new_cost, neighbor))
+
+        if meeting_node is None:
+            return None
+
+        # Hierarchy edges from the source up to the meeting node, then down to the target
+        route = []
+        node = meeting_node
+        while node != source:
+            edge = parents[0][node]
+            route.append(edge)
+            node = edge_sources[edge]
+        route.reverse()
+        node = meeting_node
+        while node != target:
+            edge = parents[1][node]
+            route.append(edge)
+            node = edge_targets[edge]
+
+        return best_cost, self.unpack(route), nodes_visited, edge_relaxations
+
+    def unpack(self, route):
+        """
+        Replaces every shortcut in a list of hierarchy edges with the real roads it stands for.
+
+        Returns the RoadGraph edge numbers, in order
+        """
+        path_edges = []
+        stack = list(reversed(route))
+        while stack:
+            edge = stack.pop()
+            original = self.edge_original[edge]
+            if original >= 0:
+                path_edges.append(original)
+            else:
+                stack.append(self.edge_second[edge])
+                stack.append(self.edge_first[edge])
+        return path_edges
+
+
+def _flatten(lists):
+    """Turns a list of per-node edge lists into CSR offsets and a flat edge array."""
+    offsets = array("l", [0])
+    flat = array("l")
+    for edges in lists:
+        flat.extend(edges or ())
+        offsets.append(len(flat))
+    return offsets, flat
+
+
+# Hierarchies we have already loaded or built, keyed by (graph, metric)
+_hierarchies = GraphFileCache("ch", ContractionHierarchy.load)
+
+
+def get_contraction_hierarchy(graph, optimize_for="distance", directory=None, verbose=False):
+    """
+    Returns the hierarchy for a graph and metric.
+
+    It is loaded from directory if a matching one was saved there, otherwise it is
+    built (and saved, if a directory is given). Each one is then kept in memory.
+
+    graph: RoadGraph to route on
+    optimize_for: "distance" for kilometers, anything else for minutes
+    directory: Folder for saved hierarchies (None builds them in memory only)
+    """
+    metric = search_metric(optimize_for)
+
+    def build():
+        start_time = timer.time()
+        hierarchy = ContractionHierarchy.build(graph, metric, verbose=verbose)
+        print(f"Built {metric} contraction hierarchy for {graph.node_count} nodes "
+              f"({hierarchy.shortcut_count} shortcuts) in {timer.time() - start_time:.1f}s")
+        return hierarchy
+
+    return _hierarchies.get(graph, metric, directory, lambda: hierarchy_fingerprint(graph, metric), build)
+
+
+def uses_highways(graph, path_edges):
+    """Returns True if any edge of a route is a highway."""
+    highway_code = ROAD_TYPE_CODES["highway"]
+    return any(graph.road_type_codes[edge] == highway_code for edge in path_edges)
+
+
+def speedup_report(algorithms, optimize_for="distance", pairs=None, sample_size=200, seed=0):
+    """
+    Times Contraction Hierarchies against plain Dijkstra on the same routes.
+
+    algorithms: RouteAlgorithms to run both searches with
+    optimize_for: Metric to compare on
+    pairs, sample_size, seed: Routes to compare, as for compare_searches
+    """
+    # Build or load the hierarchy first, so it isn't counted in the query times
+    algorithms.contraction_hierarchy(optimize_for)
+    return compare_searches(
+        algorithms.graph,
+        ("dijkstra", lambda source, destination: algorithms.dijkstra_algorithm(source, destination, optimize_for)),
+        ("ch", lambda source, destination: algorithms.contraction_hierarchy_algorithm(source, destination,
+                                                                                     optimize_for)),
+        optimize_for, pairs, sample_size, seed)
+
+
+def prepare_hierarchies(locations, matrix, road_graph, directory):
+    """Builds (or loads) both hierarchies for the command-line report."""
+    from algorithm import RouteAlgorithms
+
+    algorithms = RouteAlgorithms(locations, matrix, road_graph, hierarchy_dir=directory)
+    for metric in METRICS:
+        get_contraction_hierarchy(algorithms.graph, metric, directory, verbose=True)
+    return algorithms
+
+
+if __name__ == "__main__":
+    # Usage: python contraction_hierarchy.py [matrix|osm] [directory]
+    run_reports(os.path.join("cache", "ch"), prepare_hierarchies, speedup_report)
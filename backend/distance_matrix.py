@@ -13,7 +13,11 @@ import json      # Used for saving and loading data in a readable format
 import time      # Provides functions for working with time
 import os        # Helps interact with the operating system (like checking if files exist)
 import math      # Provides mathematical functions
+import numpy as np  # Fast calculations on whole arrays of numbers
 from geopy.distance import geodesic  # A special function that calculates distances on Earth
+from road_types import load_road_type_table  # Known roads, loaded from road_types.json
+from matrix_store import BinaryDistanceMatrix, save_binary_matrix, arrays_to_matrix  # Binary matrix format
+from road_graph import ROAD_TYPES  # Road type codes used in the road type matrix
 
 # Average speeds for different road types in Jamaica (kilometers per hour)
 # We use these to estimate travel times based on the type of road
@@ -65,93 +69,158 @@ def classify_road_type(source, destination, locations):
     """
     Determine what kind of road connects two locations.
     Includes proper handling for avoid_highway logic for Spanish Town and Old Harbour.
+
+    The known roads are kept in the "matrix" table of road_types.json, which is
+    loaded once and looked up by the (unordered) pair of locations.
+    """
+    return load_road_type_table("matrix").classify(source, destination)
+
+
+# WGS-84 ellipsoid, the same one geopy's geodesic uses
+WGS84_A = 6378137.0               # Equatorial radius in meters
+WGS84_F = 1 / 298.257223563       # Flattening
+WGS84_B = (1 - WGS84_F) * WGS84_A  # Polar radius in meters
+
+def vincenty_distances(lat1, lon1, lat2, lon2, max_iterations=200, tolerance=1e-12):
+    """
+    Calculate ellipsoidal distances between many pairs of points at once.
+    This is Vincenty's inverse formula written with NumPy arrays, so every pair
+    is solved together instead of one geodesic call at a time.
+    
+    lat1, lon1, lat2, lon2: Arrays of coordinates in degrees (all the same shape)
+    
+    Returns: Array of distances in kilometers
     """
+    f = WGS84_F
+    L = np.radians(lon2 - lon1)
+    U1 = np.arctan((1 - f) * np.tan(np.radians(lat1)))
+    U2 = np.arctan((1 - f) * np.tan(np.radians(lat2)))
+    sin_U1, cos_U1 = np.sin(U1), np.cos(U1)
+    sin_U2, cos_U2 = np.sin(U2), np.cos(U2)
 
-    # Bi-directional helper
-    def is_match(pair_list):
-        return any((source == a and destination == b) or (source == b and destination == a) for a, b in pair_list)
+    lam = L.copy()
+    for _ in range(max_iterations):
+        sin_lam, cos_lam = np.sin(lam), np.cos(lam)
+        sin_sigma = np.hypot(cos_U2 * sin_lam, cos_U1 * sin_U2 - sin_U1 * cos_U2 * cos_lam)
+        cos_sigma = sin_U1 * sin_U2 + cos_U1 * cos_U2 * cos_lam
+        sigma = np.arctan2(sin_sigma, cos_sigma)
 
-    # Highways (to be avoided when user chooses avoid_highways=True)
-    highway_routes = [
-      
-    ]
+        # Points that are the same have sin_sigma = 0, so guard the divisions
+        safe_sin_sigma = np.where(sin_sigma == 0, 1.0, sin_sigma)
+        sin_alpha = np.where(sin_sigma == 0, 0.0, cos_U1 * cos_U2 * sin_lam / safe_sin_sigma)
+        cos_sq_alpha = 1 - sin_alpha ** 2
+        safe_cos_sq_alpha = np.where(cos_sq_alpha == 0, 1.0, cos_sq_alpha)
+        cos_2sigma_m = np.where(cos_sq_alpha == 0, 0.0,
+                                cos_sigma - 2 * sin_U1 * sin_U2 / safe_cos_sq_alpha)
 
-    # Primary roads (main roads, non-highways)
-    primary_routes = [
-        ("new_kingston", "halfway_tree"),
-        ("new_kingston", "cross_roads"),
-        ("new_kingston", "liguanea"),
-        ("constant_spring", "halfway_tree"),
-        ("manor_park", "constant_spring"),
+        C = f / 16 * cos_sq_alpha * (4 + f * (4 - 3 * cos_sq_alpha))
+        previous_lam = lam
+        lam = L + (1 - C) * f * sin_alpha * (
+            sigma + C * sin_sigma * (cos_2sigma_m + C * cos_sigma * (-1 + 2 * cos_2sigma_m ** 2)))
+        if np.all(np.abs(lam - previous_lam) < tolerance):
+            break
 
-        # Non-highway connections for Spanish Town & Old Harbour
-        ("spanish_town", "cross_roads"),
-        ("old_harbour", "cross_roads"),
-        ("spanish_town", "halfway_tree"),
-        ("old_harbour", "halfway_tree"),
-        ("old_harbour", "liguanea"),
-        ("spanish_town", "liguanea"),
-    ]
+    u_sq = cos_sq_alpha * (WGS84_A ** 2 - WGS84_B ** 2) / WGS84_B ** 2
+    A = 1 + u_sq / 16384 * (4096 + u_sq * (-768 + u_sq * (320 - 175 * u_sq)))
+    B = u_sq / 1024 * (256 + u_sq * (-128 + u_sq * (74 - 47 * u_sq)))
+    delta_sigma = B * sin_sigma * (cos_2sigma_m + B / 4 * (
+        cos_sigma * (-1 + 2 * cos_2sigma_m ** 2) -
+        B / 6 * cos_2sigma_m * (-3 + 4 * sin_sigma ** 2) * (-3 + 4 * cos_2sigma_m ** 2)))
 
-    # Tertiary roads for university areas
-    university_areas = {"mona", "papine", "university_hospital", "mona_heights", "hope_zoo"}
+    return WGS84_B * A * (sigma - delta_sigma) / 1000
 
-    # Classification logic
-    if is_match(highway_routes):
-        return "highway"
-    if is_match(primary_routes):
-        return "primary"
-    if source in university_areas and destination in university_areas:
-        return "tertiary"
+def vincenty_distance_matrix(lats, lngs, block_size=512):
+    """
+    Calculate the full symmetric distance matrix for a list of coordinates.
+    Only the upper triangle is solved (in blocks of rows to keep memory bounded)
+    and then mirrored, so each pair is worked out once.
     
-    # Default fallback
-    return "primary"
+    lats, lngs: Arrays of coordinates in degrees
+    
+    Returns: N x N array of distances in kilometers (0 on the diagonal)
+    """
+    lats = np.asarray(lats, dtype=np.float64)
+    lngs = np.asarray(lngs, dtype=np.float64)
+    count = len(lats)
+    distances = np.zeros((count, count))
 
+    for start in range(0, count, block_size):
+        end = min(start + block_size, count)
+        # Rows start..end against columns start..count (the upper triangle of this block)
+        block = vincenty_distances(lats[start:end, None], lngs[start:end, None],
+                                   lats[None, start:], lngs[None, start:])
+        distances[start:end, start:] = block
+        distances[start:, start:end] = block.T
+
+    np.fill_diagonal(distances, 0.0)
+    return distances
+
+def geodesic_max_error(lats, lngs, distances, sample_size=200, seed=0):
+    """
+    Check the vectorized distances against geopy's geodesic for a sample of pairs.
+    
+    Returns: Largest difference found, in meters
+    """
+    count = len(lats)
+    if count < 2:
+        return 0.0
+    rng = np.random.default_rng(seed)
+    sources = rng.integers(0, count, sample_size)
+    destinations = rng.integers(0, count, sample_size)
+    worst = 0.0
+    for i, j in zip(sources.tolist(), destinations.tolist()):
+        reference = geodesic((lats[i], lngs[i]), (lats[j], lngs[j])).kilometers
+        worst = max(worst, abs(distances[i, j] - reference) * 1000)
+    return worst
 
 def generate_distance_matrix(locations_data, output_file="distance_matrix.json"):
     """
     Generate and save a matrix (table) of distances and travel times between all locations.
     This creates a lookup table we can use later instead of recalculating each time.
     
+    All pairs are calculated together with NumPy: distances with a vectorized
+    Vincenty formula, and travel times by looking up the speed for each pair's
+    road type in one step.
+    
     locations_data: Dictionary of locations with coordinates
-    output_file: File to save the matrix to
+    output_file: File to save the matrix to (.json or .bin)
     
     Returns: Dictionary with distance and time matrices
     """
-    # Initialize empty dictionaries to store our results
-    matrix = {"distances": {}, "times": {}}
-    
-    # Calculate distances and times between all pairs of locations
-    # This is a nested loop that checks every possible pair
-    for source_id, source in locations_data.items():
-        # Create empty dictionaries for this source location
-        matrix["distances"][source_id] = {}
-        matrix["times"][source_id] = {}
-        
-        # For each destination location
-        for dest_id, dest in locations_data.items():
-            # Skip calculating distance to itself
-            if source_id != dest_id:
-                # Calculate distance between the two locations
-                distance = calculate_distance(
-                    source["lat"], source["lng"], 
-                    dest["lat"], dest["lng"]
-                )
-                # Round to 2 decimal places and store in the matrix
-                matrix["distances"][source_id][dest_id] = round(distance, 2)
-                
-                # Determine road type and estimate travel time
-                road_type = classify_road_type(source_id, dest_id, locations_data)
-                travel_time = estimate_travel_time(distance, road_type)
-                # Round to 2 decimal places and store in the matrix
-                matrix["times"][source_id][dest_id] = round(travel_time, 2)
-    
+    start_time = time.time()
+    ids = list(locations_data)
+    lats = np.array([locations_data[loc_id]["lat"] for loc_id in ids])
+    lngs = np.array([locations_data[loc_id]["lng"] for loc_id in ids])
+
+    # Distances between every pair of locations, worked out once per pair
+    distances = vincenty_distance_matrix(lats, lngs)
+
+    # Road type for every pair, then the matching speed for each one
+    road_type_codes = load_road_type_table("matrix").code_matrix(ids)
+    speeds = np.array([ROAD_SPEEDS.get(road_type, ROAD_SPEEDS["secondary"]) for road_type in ROAD_TYPES])
+    # time = distance / speed * 60 (we divide by speed to get hours, then multiply by 60 to get minutes)
+    times = distances / speeds[road_type_codes] * 60
+
+    # Round to 2 decimal places and leave out each location's distance to itself
+    distance_array = np.round(distances, 2)
+    time_array = np.round(times, 2)
+    np.fill_diagonal(distance_array, np.nan)
+    np.fill_diagonal(time_array, np.nan)
+
     # Save to file for later use
-    with open(output_file, 'w') as f:
-        json.dump(matrix, f, indent=2)  # indent=2 makes the file human-readable
+    if output_file.endswith(".bin"):
+        # Compact binary format (see matrix_store.py)
+        save_binary_matrix(ids, distance_array, time_array, output_file)
+        matrix = BinaryDistanceMatrix(output_file)
+    else:
+        matrix = arrays_to_matrix(ids, distance_array, time_array)
+        with open(output_file, 'w') as f:
+            json.dump(matrix, f, indent=2)  # indent=2 makes the file human-readable
     
     # Print some information about what we did
-    print(f"Generated distance and time matrix for {len(locations_data)} locations")
+    print(f"Generated distance and time matrix for {len(locations_data)} locations "
+          f"in {time.time() - start_time:.2f} seconds")
+    print(f"Max error against geopy geodesic: {geodesic_max_error(lats, lngs, distances):.6f} m")
     print(f"Saved to {output_file}")
     
     return matrix
@@ -160,12 +229,20 @@ def load_distance_matrix(filename="distance_matrix.json", locations_data=None):
     """
     Load the distance and time matrix from a file, or generate it if the file doesn't exist.
     This saves time by using pre-calculated values when possible.
+    Files ending in .bin are opened as memory-mapped binary matrices.
     
     filename: File to load the matrix from
     locations_data: Dictionary of locations with coordinates (needed if generating a new matrix)
     
     Returns: Dictionary with distance and time matrices
     """
+    # Binary matrices are memory-mapped instead of parsed, so loading them is quick
+    # and every server process shares the same copy in memory
+    if filename.endswith(".bin") and os.path.exists(filename):
+        matrix = BinaryDistanceMatrix(filename)
+        print(f"Memory-mapped distance and time matrix from {filename}")
+        return matrix
+
     # Check if the matrix file already exists
     if os.path.exists(filename):
         # If it exists, load it from the file
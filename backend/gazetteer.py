@@ -0,0 +1,228 @@
+"""
+Names: Shanaldo Carty,
+Completion Date: 08/7/2025
+"""
+
+"""
+Offline gazetteer for the Jamaica Route Finder project.
+This file collects every named place we already have on disk (our locations plus
+the named nodes and streets in the saved OpenStreetMap extracts) so place names can
+be turned into coordinates, and coordinates into street and place names, without
+asking Nominatim.
+"""
+
+import glob
+import os
+import threading
+
+import numpy as np
+
+from location_index import get_location_index, normalize_name
+from location_search import LocationSearch
+from overpass_stream import read_overpass_arrays
+from spatial_index import GridIndex
+
+# Gazetteers we have already built, keyed by (locations file, cache folder)
+_gazetteers = {}
+_gazetteers_lock = threading.Lock()
+
+# Forward lookups only consider names scoring at least this much (exact names score over 1)
+MIN_MATCH_SCORE = 0.5
+
+# Names looked at for a forward lookup, best scoring first
+MAX_GEOCODE_CANDIDATES = 5
+
+# How far (km) a reverse lookup looks for the closest street, and for the closest place
+STREET_RADIUS_KM = 0.5
+PLACE_RADIUS_KM = 5.0
+
+# When several entries share a name, which one a forward lookup returns
+KIND_PRIORITY = {"location": 0, "place": 1, "street": 2}
+
+# Rough prominence of each kind of entry, reported like Nominatim's "importance"
+KIND_IMPORTANCE = {"location": 0.6, "place": 0.4, "street": 0.2}
+
+
+class Gazetteer:
+    """
+    Name and spatial indexes over named places.
+
+    Each entry is a dictionary with "name", "lat", "lng", "kind" ("location", "place"
+    or "street") and "ref" (our location ID, or the OSM node/way ID). Forward lookups
+    go through a trigram LocationSearch over the distinct names; reverse lookups use
+    one GridIndex over places and another over the points along named streets.
+    """
+
+    def __init__(self, entries, street_points=()):
+        """
+        Builds the indexes.
+
+        entries: List of entry dictionaries (see above)
+        street_points: List of (lat, lng, entry number) for every node along a named
+        street, so a reverse lookup finds the street wherever the point is along it
+        """
+        self.entries = entries
+
+        # One searchable "location" per distinct name, pointing at the best entry with it
+        self.by_name = {}
+        for number, entry in enumerate(entries):
+            name = normalize_name(entry["name"])
+            best = self.by_name.get(name)
+            if best is None or KIND_PRIORITY[entry["kind"]] < KIND_PRIORITY[entries[best]["kind"]]:
+                self.by_name[name] = number
+        self.search = LocationSearch({
+            name: {"display_name": entries[number]["name"]} for name, number in self.by_name.items()
+        })
+
+        places = [number for number, entry in enumerate(entries) if entry["kind"] != "street"]
+        self.place_entries = np.array(places, dtype=np.int64)
+        self.places = GridIndex([entries[n]["lat"] for n in places], [entries[n]["lng"] for n in places])
+
+        self.street_entries = np.array([point[2] for point in street_points], dtype=np.int64)
+        self.streets = GridIndex([point[0] for point in street_points], [point[1] for point in street_points])
+
+    def __len__(self):
+        return len(self.entries)
+
+    def geocode(self, place_name, min_score=MIN_MATCH_SCORE):
+        """
+        Finds the coordinates of a place name, or returns None.
+
+        Only a name that is the query itself, or starts with all of the query's words
+        ("mona" finds "Mona Heights"), counts as found. A fuzzy match can be a different
+        place altogether ("Spanish Town Road" is in Kingston, not Spanish Town), so
+        those return None and GeocodingService asks Nominatim instead.
+
+        Returns the same dictionary as GeocodingService.geocode, so callers can't tell
+        whether the answer came from here or from Nominatim.
+        """
+        words = normalize_name(place_name).split()
+        matches = self.search.search(place_name, limit=MAX_GEOCODE_CANDIDATES, min_score=min_score)
+        match = next((match for match in matches if match["matched"].split()[:len(words)] == words), None)
+        if match is None:
+            return None
+
+        entry = self.entries[self.by_name[match["id"]]]
+        address = {"road": entry["name"]} if entry["kind"] == "street" else {"place": entry["name"]}
+        address["country"] = "Jamaica"
+        return {
+            "lat": entry["lat"],
+            "lng": entry["lng"],
+            "display_name": f"{entry['name']}, Jamaica",
+            "place_id": f"{entry['kind']}:{entry['ref']}",
+            "address": address,
+            "importance": KIND_IMPORTANCE[entry["kind"]]
+        }
+
+    def reverse_geocode(self, lat, lng, street_radius_km=STREET_RADIUS_KM, place_radius_km=PLACE_RADIUS_KM):
+        """
+        Finds the closest street and place to a coordinate, or returns None if neither is close.
+
+        Returns the same dictionary as GeocodingService.reverse_geocode.
+        """
+        street_point, _ = self.streets.nearest(lat, lng, max_km=street_radius_km)
+        place_point, _ = self.places.nearest(lat, lng, max_km=place_radius_km)
+        if street_point is None and place_point is None:
+            return None
+
+        address = {}
+        parts = []
+        closest = None
+        if street_point is not None:
+            closest = self.entries[int(self.street_entries[street_point])]
+            address["road"] = closest["name"]
+            parts.append(closest["name"])
+        if place_point is not None:
+            place = self.entries[int(self.place_entries[place_point])]
+            closest = closest or place
+            address["place"] = place["name"]
+            parts.append(place["name"])
+        address["country"] = "Jamaica"
+        parts.append("Jamaica")
+
+        return {
+            "display_name": ", ".join(parts),
+            "address": address,
+            "place_id": f"{closest['kind']}:{closest['ref']}"
+        }
+
+
+def build_gazetteer(locations_data, cache_dir="cache"):
+    """
+    Collects the named places from our locations and the saved Overpass responses.
+
+    locations_data: Dictionary of location ID -> location data
+    cache_dir: Folder containing the saved Overpass API responses
+    """
+    entries = []
+    street_points = []
+
+    for loc_id, loc_data in locations_data.items():
+        entries.append({
+            "name": loc_data.get("display_name", loc_id.capitalize()),
+            "lat": loc_data["lat"],
+            "lng": loc_data["lng"],
+            "kind": "location",
+            "ref": loc_id
+        })
+
+    seen_nodes = set()
+    seen_ways = set()
+    for filename in sorted(glob.glob(os.path.join(cache_dir, "*.json"))):
+        extract = read_overpass_arrays(filename, way_tags=("highway", "name"))
+
+        # Named nodes: towns, shops, toll plazas and so on
+        for position, tags in extract.node_tags.items():
+            osm_id = extract.node_ids[position]
+            if "name" not in tags or osm_id in seen_nodes:
+                continue
+            seen_nodes.add(osm_id)
+            entries.append({
+                "name": tags["name"],
+                "lat": extract.lats[position],
+                "lng": extract.lngs[position],
+                "kind": "place",
+                "ref": f"node/{osm_id}"
+            })
+
+        # Named streets: the entry sits at the middle node, and every node is a reverse lookup point
+        positions = None
+        for way in range(extract.way_count):
+            tags = extract.way_tags[way]
+            osm_id = extract.way_ids[way]
+            if "name" not in tags or "highway" not in tags or osm_id in seen_ways:
+                continue
+            if positions is None:
+                positions = {node_id: position for position, node_id in enumerate(extract.node_ids)}
+            points = [positions[ref] for ref in extract.way_nodes(way) if ref in positions]
+            if not points:
+                continue
+            seen_ways.add(osm_id)
+
+            middle = points[len(points) // 2]
+            number = len(entries)
+            entries.append({
+                "name": tags["name"],
+                "lat": extract.lats[middle],
+                "lng": extract.lngs[middle],
+                "kind": "street",
+                "ref": f"way/{osm_id}"
+            })
+            street_points.extend((extract.lats[p], extract.lngs[p], number) for p in points)
+
+    return Gazetteer(entries, street_points)
+
+
+def get_gazetteer(locations_file="jamaica_locations.json", cache_dir="cache"):
+    """
+    Returns the gazetteer for a locations file and cache folder, building it the first
+    time and again whenever the locations file changes.
+    """
+    index = get_location_index(locations_file)
+    with _gazetteers_lock:
+        key = (locations_file, cache_dir)
+        entry = _gazetteers.get(key)
+        if entry is None or entry[0] is not index:
+            entry = (index, build_gazetteer(index.locations, cache_dir))
+            _gazetteers[key] = entry
+        return entry[1]
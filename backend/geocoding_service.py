@@ -6,32 +6,88 @@ Completion Date: 08/7/2025
 """
 Geocoding service for Jamaica Route Finder project.
 This file handles converting place names to map coordinates and vice versa.
+Lookups are answered from the offline gazetteer first; Nominatim is only asked about
+places the gazetteer doesn't know, and its answers are kept on disk.
 """
 
-import requests  # For making HTTP requests
-from time import sleep  # For adding delays between API calls
+import os
+import threading
+import time
+from caching import ResponseCache  # Keeps Nominatim answers across restarts
+from gazetteer import get_gazetteer  # Named places from our own data
+from http_client import get_http_client  # Pooled HTTP session with timeouts and retries
+
+# Nominatim's usage policy allows at most one request per second
+NOMINATIM_MIN_INTERVAL = 1.0
+
+# Nominatim answers are kept for 30 days
+NOMINATIM_CACHE_TTL = 30 * 24 * 60 * 60
 
 class GeocodingService:
     """
     This class handles converting between place names and map coordinates.
     
-    It uses OpenStreetMap's Nominatim service to look up locations by name
-    and find addresses for coordinates. This is basically the same service
-    that powers the search function on many maps.
+    It looks names and coordinates up in the offline gazetteer (our locations
+    plus the named places and streets in the saved OpenStreetMap extracts).
+    Anything the gazetteer can't answer can fall back to OpenStreetMap's Nominatim
+    service, which is basically the same service that powers the search function
+    on many maps.
     """
     
-    def __init__(self):
+    def __init__(self, http_client=None, gazetteer=None, use_nominatim=True,
+                 cache_dir=os.path.join("cache", "nominatim")):
         """
         Sets up the geocoding service with the necessary configuration.
+        
+        http_client: HttpClient to send requests with (defaults to the shared pooled client)
+        gazetteer: Gazetteer to answer from (defaults to the one built from our data)
+        use_nominatim: Ask Nominatim when the gazetteer has no answer
+        cache_dir: Folder for saved Nominatim answers (None keeps them in memory only)
         """
-        # Base URL for the Nominatim service
-        self.base_url = "https://nominatim.openstreetmap.org"
+        self.gazetteer = gazetteer if gazetteer is not None else get_gazetteer()
+        self.use_nominatim = use_nominatim
+        self.cache = ResponseCache(max_size=256, ttl=NOMINATIM_CACHE_TTL, directory=cache_dir)
+
+        # Base URL for the Nominatim service (NOMINATIM_URL can point at a local server)
+        self.base_url = os.getenv("NOMINATIM_URL", "https://nominatim.openstreetmap.org")
+        self.http = http_client or get_http_client()
         # Headers to send with our requests
         # Nominatim requires a user agent, so we identify our application
         self.headers = {
             "User-Agent": "JamaicaRouteFinder/1.0",  # Required by Nominatim's terms of service
             "Accept-Language": "en-US,en;q=0.9"      # Prefer English results
         }
+        # Time of our last Nominatim request, so we only wait as long as we have to
+        self.rate_lock = threading.Lock()
+        self.last_request_at = 0.0
+
+    def nominatim_get(self, path, params):
+        """
+        Sends a request to Nominatim, or answers it from the cache.
+
+        Requests are spaced at least NOMINATIM_MIN_INTERVAL seconds apart (Nominatim
+        asks users to wait between requests), but cached answers never wait.
+
+        Returns the decoded JSON response
+        """
+        url = f"{self.base_url}/{path}"
+        cached = self.cache.get(url, params)
+        if cached is not None:
+            return cached
+
+        with self.rate_lock:
+            wait = NOMINATIM_MIN_INTERVAL - (time.monotonic() - self.last_request_at)
+            if wait > 0:
+                time.sleep(wait)
+            try:
+                response = self.http.get(url, params=params, headers=self.headers)
+            finally:
+                self.last_request_at = time.monotonic()
+        response.raise_for_status()  # This will raise an exception if the request fails
+
+        result = response.json()
+        self.cache.put(url, params, result)
+        return result
     
     def geocode(self, place_name, country_filter="Jamaica"):
         """
@@ -40,12 +96,15 @@ class GeocodingService:
         This is used when a user enters a location name and we need to
         figure out where on the map it is.
         """
-        # Add a delay to avoid hitting rate limits
-        # Nominatim asks users to wait between requests
-        sleep(1)
+        # The gazetteer only covers Jamaica
+        if country_filter and country_filter.lower() == "jamaica":
+            result = self.gazetteer.geocode(place_name)
+            if result is not None:
+                return result
+        if not self.use_nominatim:
+            return None
         
         # Set up the search request
-        search_url = f"{self.base_url}/search"
         params = {
             "q": place_name,                # The place we're looking for
             "format": "json",               # Get results in JSON format
@@ -56,10 +115,7 @@ class GeocodingService:
         
         try:
             # Make the request to the Nominatim API
-            response = requests.get(search_url, params=params, headers=self.headers)
-            response.raise_for_status()  # This will raise an exception if the request fails
-            
-            results = response.json()
+            results = self.nominatim_get("search", params)
             
             # If we got results, extract and return the location info
             if results and len(results) > 0:
@@ -86,11 +142,11 @@ class GeocodingService:
         This is used when we have a point on the map and need to figure
         out what address or location it corresponds to.
         """
-        # Add a delay to avoid hitting rate limits
-        sleep(1)
+        result = self.gazetteer.reverse_geocode(lat, lng)
+        if result is not None or not self.use_nominatim:
+            return result
         
         # Set up the reverse geocoding request
-        reverse_url = f"{self.base_url}/reverse"
         params = {
             "lat": lat,              # Latitude
             "lon": lng,              # Longitude
@@ -100,10 +156,7 @@ class GeocodingService:
         
         try:
             # Make the request to the Nominatim API
-            response = requests.get(reverse_url, params=params, headers=self.headers)
-            response.raise_for_status()
-            
-            result = response.json()
+            result = self.nominatim_get("reverse", params)
             
             # If we didn't get an error, return the address info
             if "error" not in result:
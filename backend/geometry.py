@@ -0,0 +1,168 @@
+"""
+Names: Shanaldo Carty,
+Completion Date: 08/7/2025
+"""
+
+"""
+Point and segment geometry for the Jamaica Route Finder project.
+This file measures how far points are from line segments (like pieces of a route)
+for many points and many segments at once with NumPy. Coordinates are first laid out
+on a flat map in kilometres, which is accurate to a fraction of a percent across an
+area the size of Jamaica.
+
+Run "python geometry.py" to benchmark it against measuring one pair at a time.
+"""
+
+import math
+import time
+
+import numpy as np
+
+from spatial_index import EARTH_RADIUS_KM
+
+# Kilometres in one degree of latitude
+KM_PER_DEGREE = math.radians(1) * EARTH_RADIUS_KM
+
+
+def as_coordinates(coordinates):
+    """Turns one [lat, lng] pair or a list of them into an (n, 2) array."""
+    return np.asarray(coordinates, dtype=np.float64).reshape(-1, 2)
+
+
+def local_xy(coordinates, origin_lat):
+    """
+    Projects [lat, lng] coordinates onto a flat map in kilometres.
+
+    Longitudes are scaled by the cosine of origin_lat (an equirectangular projection),
+    so distances are close to the real ones near that latitude.
+
+    Returns (x, y) arrays
+    """
+    x = coordinates[:, 1] * (KM_PER_DEGREE * math.cos(math.radians(origin_lat)))
+    y = coordinates[:, 0] * KM_PER_DEGREE
+    return x, y
+
+
+def point_segment_distances(points, starts, ends, origin_lat=None):
+    """
+    Measures every point against every segment.
+
+    points: [lat, lng] of N points
+    starts, ends: [lat, lng] of the two ends of M segments
+    origin_lat: Latitude the flat map is centred on (defaults to the middle of the inputs)
+
+    Returns (distances, t), two N x M arrays:
+    - distances[i, j] is the distance in km from point i to the closest point on segment j
+    - t[i, j] is where that closest point is along segment j (0 = start, 1 = end)
+    """
+    points = as_coordinates(points)
+    starts = as_coordinates(starts)
+    ends = as_coordinates(ends)
+    if origin_lat is None:
+        origin_lat = float(np.mean(np.concatenate((points[:, 0], starts[:, 0], ends[:, 0]))))
+
+    point_x, point_y = local_xy(points, origin_lat)
+    start_x, start_y = local_xy(starts, origin_lat)
+    end_x, end_y = local_xy(ends, origin_lat)
+
+    segment_x = end_x - start_x
+    segment_y = end_y - start_y
+    length_squared = segment_x * segment_x + segment_y * segment_y
+    zero_length = length_squared == 0
+
+    # Offsets from each segment's start to each point (N x M)
+    offset_x = point_x[:, None] - start_x
+    offset_y = point_y[:, None] - start_y
+
+    # Project onto each segment and clip to its ends. A segment that is really a
+    # point keeps t = 0, so we measure to its start.
+    t = (offset_x * segment_x + offset_y * segment_y) / np.where(zero_length, 1.0, length_squared)
+    np.clip(t, 0.0, 1.0, out=t)
+    t[:, zero_length] = 0.0
+
+    distances = np.hypot(offset_x - t * segment_x, offset_y - t * segment_y)
+    return distances, t
+
+
+def segment_lengths(starts, ends, origin_lat=None):
+    """
+    Returns the length in km of each segment, on the same flat map as point_segment_distances.
+    """
+    starts = as_coordinates(starts)
+    ends = as_coordinates(ends)
+    if origin_lat is None:
+        origin_lat = float(np.mean(np.concatenate((starts[:, 0], ends[:, 0]))))
+    start_x, start_y = local_xy(starts, origin_lat)
+    end_x, end_y = local_xy(ends, origin_lat)
+    return np.hypot(end_x - start_x, end_y - start_y)
+
+
+def point_to_segment_distance(point, segment_start, segment_end):
+    """
+    Returns the distance in km from one (lat, lng) point to one segment.
+    """
+    distances, _ = point_segment_distances(point, segment_start, segment_end)
+    return float(distances[0, 0])
+
+
+def closest_point_fraction(point, segment_start, segment_end):
+    """
+    Returns how far along a segment (0 to 1) the closest point to a given point is.
+    """
+    _, t = point_segment_distances(point, segment_start, segment_end)
+    return float(t[0, 0])
+
+
+def _per_pair_distance(point, line_start, line_end):
+    """
+    The way distances used to be measured: a projection in degrees, then a geodesic
+    to the projected point. Only used by the benchmark below.
+    """
+    import geopy.distance
+
+    p = np.array([point[0], point[1]])
+    v = np.array([line_start[0], line_start[1]])
+    w = np.array([line_end[0], line_end[1]])
+    segment = w - v
+    segment_length_squared = np.sum(segment * segment)
+    if segment_length_squared == 0:
+        return geopy.distance.geodesic(point, line_start).kilometers
+    t = max(0, min(1, np.sum((p - v) * segment) / segment_length_squared))
+    projection = v + t * segment
+    return geopy.distance.geodesic(point, (projection[0], projection[1])).kilometers
+
+
+def benchmark(point_count=100, segment_count=100, seed=0):
+    """
+    Times the batch kernel against the per-pair path on random points and segments
+    across Jamaica, and checks how closely their distances agree.
+    """
+    rng = np.random.default_rng(seed)
+
+    def random_coordinates(count):
+        return np.column_stack((rng.uniform(17.7, 18.5, count), rng.uniform(-78.3, -76.2, count)))
+
+    points = random_coordinates(point_count)
+    starts = random_coordinates(segment_count)
+    # Route-sized segments of up to a few kilometres
+    ends = starts + rng.uniform(-0.03, 0.03, (segment_count, 2))
+
+    start_time = time.perf_counter()
+    slow = np.array([[_per_pair_distance(tuple(point), tuple(start), tuple(end))
+                      for start, end in zip(starts, ends)] for point in points])
+    slow_seconds = time.perf_counter() - start_time
+
+    start_time = time.perf_counter()
+    fast, _ = point_segment_distances(points, starts, ends)
+    fast_seconds = time.perf_counter() - start_time
+
+    relative_error = np.abs(fast - slow) / np.maximum(slow, 1e-9)
+    print(f"{point_count} points x {segment_count} segments ({point_count * segment_count} pairs)")
+    print(f"  per pair: {slow_seconds * 1000:.1f} ms")
+    print(f"  batch:    {fast_seconds * 1000:.2f} ms ({slow_seconds / fast_seconds:.0f}x faster)")
+    print(f"  largest difference: {np.max(np.abs(fast - slow)):.4f} km "
+          f"({np.max(relative_error) * 100:.2f}% of the distance)")
+
+
+if __name__ == "__main__":
+    benchmark()
@@ -0,0 +1,214 @@
+"""
+Names: Shanaldo Carty,
+Completion Date: 08/7/2025
+"""
+
+"""
+Shared helpers for the preprocessed route speedups (contraction hierarchies and
+ALT landmarks) in the Jamaica Route Finder project.
+Both work something out once per road graph, keep it in memory, and save it to
+disk under a fingerprint of the graph so it is only reused with the same roads.
+Both can also be run from the command line to compare their searches against
+the plain ones on the same routes.
+"""
+
+import hashlib
+import os
+import random
+import sys
+import threading
+import time as timer
+
+import numpy as np
+
+# The weights a search can use
+METRICS = ("distance", "time")
+
+
+def search_metric(optimize_for):
+    """Returns the weight a search uses: "distance" for distance, "time" for anything else."""
+    return "distance" if optimize_for == "distance" else "time"
+
+
+def graph_fingerprint(graph, metrics, tag):
+    """
+    Returns a SHA-1 of the graph's structure and weights, so saved preprocessing is
+    only used with the graph it was built from.
+
+    graph: RoadGraph to fingerprint
+    metrics: Metrics whose weights are included
+    tag: File format (and any settings) of what is being saved
+    """
+    digest = hashlib.sha1(tag.encode("ascii"))
+    digest.update(repr(graph.node_count).encode("ascii"))
+    # Fixed widths, so the same graph hashes the same on every platform
+    digest.update(np.asarray(graph.offsets, dtype=np.int64).tobytes())
+    digest.update(np.asarray(graph.targets, dtype=np.int64).tobytes())
+    for metric in metrics:
+        digest.update(metric.encode("ascii"))
+        digest.update(np.asarray(graph.weights(metric), dtype=np.float64).tobytes())
+    return digest.hexdigest()
+
+
+def save_arrays(filename, file_format, **arrays):
+    """
+    Writes arrays to a NumPy .npz file tagged with its format. The file is written
+    under a temporary name first, so other threads never read half of it.
+    """
+    temp_filename = f"{filename}.{threading.get_ident()}.tmp.npz"
+    np.savez(temp_filename, format=np.array(file_format), **arrays)
+    os.replace(temp_filename, filename)
+
+
+def load_arrays(filename, file_format):
+    """
+    Reads every array of a file written by save_arrays().
+    Returns None if the file is missing, unreadable or from another format.
+    """
+    try:
+        with np.load(filename, allow_pickle=False) as data:
+            if str(data["format"]) != file_format:
+                return None
+            return {name: data[name] for name in data.files}
+    except (OSError, KeyError, ValueError):
+        return None
+
+
+class GraphFileCache:
+    """
+    Preprocessing results kept in memory per road graph and saved to a folder.
+
+    Results are objects with a fingerprint attribute and a save(filename) method,
+    read back by the load function the cache was made with.
+    """
+
+    def __init__(self, prefix, load):
+        """
+        prefix: Start of the saved file names
+        load: Function reading a saved file (returns None if it can't)
+        """
+        self.prefix = prefix
+        self.load = load
+        self.entries = {}
+        self.lock = threading.Lock()
+
+    def get(self, graph, key, directory, fingerprint, build):
+        """
+        Returns the result for a graph, loading or building it the first time only.
+
+        graph: RoadGraph the result belongs to
+        key: What else the result depends on, like the metric (None if nothing)
+        directory: Folder for saved results (None builds them in memory only)
+        fingerprint: Function returning the graph's fingerprint (only called on a miss)
+        build: Function building the result when no saved one matches
+        """
+        with self.lock:
+            entry = self.entries.get((id(graph), key))
+            # Keeping the graph in the entry stops its id() being reused by another one
+            if entry is not None and entry[0] is graph:
+                return entry[1]
+
+            expected = fingerprint()
+            filename = None
+            result = None
+            if directory:
+                name = "_".join(part for part in (self.prefix, key, expected[:16]) if part)
+                filename = os.path.join(directory, f"{name}.npz")
+                result = self.load(filename)
+                if result is not None and result.fingerprint != expected:
+                    result = None
+
+            if result is None:
+                result = build()
+                if filename:
+                    os.makedirs(directory, exist_ok=True)
+                    result.save(filename)
+
+            self.entries[(id(graph), key)] = (graph, result)
+            return result
+
+
+def compare_searches(graph, baseline, candidate, optimize_for="distance", pairs=None, sample_size=200, seed=0):
+    """
+    Times two route searches against each other on the same routes.
+
+    graph: RoadGraph being routed on
+    baseline, candidate: (name, function(source ID, destination ID)) of each search
+    optimize_for: Metric the searches use
+    pairs: List of (source ID, destination ID) to route (defaults to a random sample)
+    sample_size: Number of random pairs when pairs isn't given
+
+    Returns a dictionary of averages, the speedup, the reduction in nodes visited,
+    and how many routes had a different cost
+    """
+    if pairs is None:
+        generator = random.Random(seed)
+        pairs = [(generator.choice(graph.node_ids), generator.choice(graph.node_ids)) for _ in range(sample_size)]
+
+    metric = search_metric(optimize_for)
+    names = (baseline[0], candidate[0])
+    milliseconds = [0.0, 0.0]
+    visited = [0, 0]
+    mismatches = 0
+    routed = 0
+    for source, destination in pairs:
+        results = []
+        for number, (_, search) in enumerate((baseline, candidate)):
+            start_time = timer.perf_counter()
+            results.append(search(source, destination))
+            milliseconds[number] += (timer.perf_counter() - start_time) * 1000
+
+        if ("error" in results[0]) != ("error" in results[1]):
+            mismatches += 1
+            continue
+        if "error" in results[0]:
+            continue
+        routed += 1
+        visited[0] += results[0]["nodes_visited"]
+        visited[1] += results[1]["nodes_visited"]
+        if abs(results[0][metric] - results[1][metric]) > 0.011:
+            mismatches += 1
+
+    count = max(len(pairs), 1)
+    return {
+        "metric": metric,
+        "pairs": len(pairs),
+        "routed": routed,
+        f"{names[0]}_ms": round(milliseconds[0] / count, 3),
+        f"{names[1]}_ms": round(milliseconds[1] / count, 3),
+        "speedup": round(milliseconds[0] / milliseconds[1], 1) if milliseconds[1] else None,
+        f"{names[0]}_nodes_visited": round(visited[0] / max(routed, 1), 1),
+        f"{names[1]}_nodes_visited": round(visited[1] / max(routed, 1), 1),
+        "nodes_visited_reduction": round(1 - visited[1] / visited[0], 3) if visited[0] else None,
+        "cost_mismatches": mismatches
+    }
+
+
+def run_reports(default_directory, prepare, report):
+    """
+    Runs a comparison from the command line: "python <file>.py [matrix|osm] [directory]".
+
+    default_directory: Folder for saved preprocessing when none is given
+    prepare: Function(locations, matrix, road_graph, directory) returning the
+             RouteAlgorithms to compare with, after building what they need
+    report: Function(algorithms, metric, pairs) returning the comparison to print
+    """
+    # Imported here because the route algorithms import the modules that use this one
+    from distance_matrix import load_distance_matrix
+    from jamaica_locations import load_locations_from_file
+    from osm_graph import build_road_network
+
+    network = sys.argv[1] if len(sys.argv) > 1 else "matrix"
+    directory = sys.argv[2] if len(sys.argv) > 2 else default_directory
+
+    locations = load_locations_from_file()
+    matrix = load_distance_matrix("distance_matrix.json", locations)
+    road_graph = build_road_network(locations, "cache")[0] if network == "osm" else None
+    algorithms = prepare(locations, matrix, road_graph, directory)
+
+    # The OSM graph is too big for every pair, so it gets a random sample
+    pairs = None
+    if network != "osm":
+        pairs = [(source, destination) for source in locations for destination in locations if source != destination]
+    for metric in METRICS:
+        print(report(algorithms, metric, pairs=pairs))
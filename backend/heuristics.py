@@ -0,0 +1,121 @@
+"""
+Names: Shanaldo Carty,
+Completion Date: 08/7/2025
+"""
+
+"""
+Heuristic tables for A* search.
+This file works out lower bounds on the remaining distance or travel time for every
+node in the graph at once, using NumPy instead of one geodesic call per node.
+"""
+
+import threading
+from collections import OrderedDict
+
+import numpy as np
+
+# Smallest radius of curvature anywhere on the WGS-84 ellipsoid (a * (1 - e^2)).
+# A haversine distance on a sphere this size never exceeds the real geodesic distance.
+EARTH_MIN_RADIUS_KM = 6335.439
+
+
+def haversine_km(lats, lngs, lat, lng):
+    """
+    Calculates haversine distances from many points to one point.
+
+    lats, lngs: Arrays of coordinates in radians
+    lat, lng: Coordinates of the target point in radians
+
+    Returns an array of distances in kilometers
+    """
+    half_dlat = (lats - lat) / 2
+    half_dlng = (lngs - lng) / 2
+    a = np.sin(half_dlat) ** 2 + np.cos(lats) * np.cos(lat) * np.sin(half_dlng) ** 2
+    return 2 * EARTH_MIN_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+class HaversineHeuristic:
+    """
+    Straight-line lower bounds from every node to a destination.
+
+    For distance the bound is the haversine distance. For time it is that distance
+    driven at the fastest speed we know of. Each bound is also scaled down so it
+    never exceeds the weight of any single edge, which keeps it consistent for A*.
+    """
+
+    def __init__(self, graph, max_speed_kmh, cache_size=64):
+        """
+        Sets up the coordinate arrays for a graph.
+
+        graph: RoadGraph to build bounds for
+        max_speed_kmh: Highest speed on any road (used for the time bound)
+        cache_size: Number of per-destination rows to keep
+        """
+        self.lats = np.radians(np.asarray(graph.lats, dtype=np.float64))
+        self.lngs = np.radians(np.asarray(graph.lngs, dtype=np.float64))
+        self.minutes_per_km = 60.0 / max_speed_kmh
+        self.cache_size = cache_size
+        self.rows = OrderedDict()
+        self.lock = threading.Lock()  # Rows are shared between request threads
+
+        # Straight-line length of every edge, used to make sure the bounds never
+        # overestimate an edge (hand-edited matrices can be shorter than a straight line)
+        offsets = np.asarray(graph.offsets, dtype=np.int64)
+        sources = np.repeat(np.arange(graph.node_count), np.diff(offsets))
+        targets = np.asarray(graph.targets, dtype=np.int64)
+        edge_km = haversine_km(self.lats[sources], self.lngs[sources],
+                               self.lats[targets], self.lngs[targets])
+
+        self.scales = {
+            "distance": self.safe_scale(np.asarray(graph.distance_weights), edge_km),
+            "time": self.safe_scale(np.asarray(graph.time_weights), edge_km * self.minutes_per_km),
+        }
+
+    @staticmethod
+    def safe_scale(weights, bounds):
+        """
+        Returns the largest factor (at most 1) that keeps every bound below its edge weight.
+        """
+        positive = bounds > 0
+        if not positive.any():
+            return 1.0
+        return float(min(1.0, np.min(weights[positive] / bounds[positive])))
+
+    def distances_to(self, destination):
+        """
+        Returns the haversine distance (km) from every node to the destination node.
+        One vectorized call covers the whole graph.
+        """
+        return haversine_km(self.lats, self.lngs, self.lats[destination], self.lngs[destination])
+
+    def bounds(self, destination, optimize_for="time"):
+        """
+        Returns a NumPy array of lower bounds from every node to the destination node (not cached).
+        """
+        metric = "distance" if optimize_for == "distance" else "time"
+        bounds = self.distances_to(destination)
+        if metric == "time":
+            bounds = bounds * self.minutes_per_km
+        return bounds * self.scales[metric]
+
+    def row(self, destination, optimize_for="time"):
+        """
+        Returns a list of lower bounds from every node to the destination node.
+
+        Rows are cached per (destination, metric), so repeated queries to popular
+        destinations don't recompute them.
+        """
+        metric = "distance" if optimize_for == "distance" else "time"
+        key = (destination, metric)
+        with self.lock:
+            if key in self.rows:
+                self.rows.move_to_end(key)
+                return self.rows[key]
+
+        row = self.bounds(destination, metric).tolist()
+
+        with self.lock:
+            self.rows[key] = row
+            if len(self.rows) > self.cache_size:
+                self.rows.popitem(last=False)
+        return row
@@ -0,0 +1,171 @@
+"""
+Names: Shanaldo Carty,
+Completion Date: 08/7/2025
+"""
+
+"""
+Shared HTTP client for the Jamaica Route Finder project.
+Every outside service we call (OpenRouteService, Nominatim and OpenWeatherMap) goes
+through one pooled requests.Session. Connections to each host are kept alive and
+reused, every request has a timeout, and busy (429) or failing (5xx) responses are
+retried with an increasing delay.
+"""
+
+import os
+import threading
+from urllib.parse import urlsplit
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+# Seconds to wait for a connection, then for the response
+DEFAULT_CONNECT_TIMEOUT = 3.05
+DEFAULT_READ_TIMEOUT = 15
+
+# Status codes that are worth trying again
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+_shared_client = None
+_shared_client_lock = threading.Lock()
+
+
+class HttpClient:
+    """
+    A pooled, retrying HTTP client.
+
+    Each host gets its own pool of up to pool_size keep-alive connections, so
+    requests after the first one skip the TCP and TLS handshakes. Safe to share
+    between request threads.
+    """
+
+    def __init__(self, pool_size=10, connect_timeout=DEFAULT_CONNECT_TIMEOUT,
+                 read_timeout=DEFAULT_READ_TIMEOUT, retries=3, backoff_factor=0.5):
+        """
+        Sets up the session and its connection pools.
+
+        pool_size: Most connections to keep open to each host
+        connect_timeout: Seconds to wait for a connection
+        read_timeout: Seconds to wait for the server to answer
+        retries: Times to retry a failed connection or a 429/5xx response
+        backoff_factor: Delay between retries grows as backoff_factor * 2^(retry - 1) seconds
+        """
+        self.pool_size = pool_size
+        self.timeout = (connect_timeout, read_timeout)
+
+        # Directions, geocoding and weather lookups are all safe to repeat, so POST is
+        # retried too. Retry-After headers on 429 responses are respected.
+        retry = Retry(
+            total=retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=RETRY_STATUSES,
+            allowed_methods=frozenset(["GET", "POST"]),
+            respect_retry_after_header=True,
+            raise_on_status=False
+        )
+        self.adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+
+        self.session = requests.Session()
+        self.session.mount("http://", self.adapter)
+        self.session.mount("https://", self.adapter)
+
+        # Counters for the stats endpoint
+        self.lock = threading.Lock()
+        self.request_count = 0
+        self.error_count = 0
+        self.retry_count = 0
+        self.requests_by_host = {}
+
+    def request(self, method, url, **kwargs):
+        """
+        Sends a request through the pool. A timeout is added if none is given.
+
+        Returns the requests.Response (after any retries)
+        """
+        kwargs.setdefault("timeout", self.timeout)
+        host = urlsplit(url).netloc
+
+        with self.lock:
+            self.request_count += 1
+            self.requests_by_host[host] = self.requests_by_host.get(host, 0) + 1
+
+        try:
+            response = self.session.request(method, url, **kwargs)
+        except requests.RequestException:
+            with self.lock:
+                self.error_count += 1
+            raise
+
+        # urllib3 records every retry it made on the response
+        retries = getattr(getattr(response.raw, "retries", None), "history", ())
+        if retries or response.status_code >= 400:
+            with self.lock:
+                self.retry_count += len(retries)
+                if response.status_code >= 400:
+                    self.error_count += 1
+        return response
+
+    def get(self, url, **kwargs):
+        """Sends a GET request."""
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        """Sends a POST request."""
+        return self.request("POST", url, **kwargs)
+
+    def pool_stats(self):
+        """
+        Returns the state of each host's connection pool.
+
+        For each host: connections opened so far, requests sent over them, and how
+        many connections are sitting idle ready to be reused.
+        """
+        pools = {}
+        pool_manager = self.adapter.poolmanager
+        for key in list(pool_manager.pools.keys()):
+            pool = pool_manager.pools.get(key)
+            if pool is None:
+                continue
+            pools[f"{pool.scheme}://{pool.host}:{pool.port}"] = {
+                "connections_opened": pool.num_connections,
+                "requests": pool.num_requests,
+                # Empty slots in the pool are None, open connections waiting for reuse aren't
+                "idle_connections": sum(1 for conn in list(pool.pool.queue) if conn is not None)
+                if pool.pool is not None else 0,
+                "max_size": self.pool_size
+            }
+        return pools
+
+    def stats(self):
+        """
+        Returns request/error/retry counts and the connection pool state.
+        """
+        with self.lock:
+            return {
+                "requests": self.request_count,
+                "errors": self.error_count,
+                "retries": self.retry_count,
+                "requests_by_host": dict(self.requests_by_host),
+                "timeout": list(self.timeout),
+                "pools": self.pool_stats()
+            }
+
+
+def get_http_client():
+    """
+    Returns the HTTP client shared by the whole process, creating it the first time.
+
+    Settings come from the environment: HTTP_POOL_SIZE, HTTP_CONNECT_TIMEOUT,
+    HTTP_READ_TIMEOUT, HTTP_RETRIES and HTTP_BACKOFF.
+    """
+    global _shared_client
+    with _shared_client_lock:
+        if _shared_client is None:
+            _shared_client = HttpClient(
+                pool_size=int(os.getenv("HTTP_POOL_SIZE", "10")),
+                connect_timeout=float(os.getenv("HTTP_CONNECT_TIMEOUT", str(DEFAULT_CONNECT_TIMEOUT))),
+                read_timeout=float(os.getenv("HTTP_READ_TIMEOUT", str(DEFAULT_READ_TIMEOUT))),
+                retries=int(os.getenv("HTTP_RETRIES", "3")),
+                backoff_factor=float(os.getenv("HTTP_BACKOFF", "0.5"))
+            )
+        return _shared_client
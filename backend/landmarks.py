@@ -0,0 +1,340 @@
+"""
+Names: Shanaldo Carty,
+Completion Date: 08/7/2025
+"""
+
+"""
+Landmark (ALT) heuristics for A* search.
+A handful of landmark nodes are picked far apart around the edge of the road network,
+and the cost from every landmark to every node (and back) is worked out once. By the
+triangle inequality, the cost from a node v to a destination t is at least
+d(L, t) - d(L, v) and at least d(v, L) - d(t, L) for every landmark L. Those bounds
+follow the roads, so they are much tighter than a straight line and A* visits far
+fewer nodes.
+
+The distances are worked out once per road graph and saved to disk. Run
+"python landmarks.py [matrix|osm]" to build them ahead of time and print how many
+fewer nodes A* visits with them.
+"""
+
+import heapq
+import os
+import threading
+import time as timer
+from collections import OrderedDict
+
+import numpy as np
+
+from graph_preprocessing import (METRICS, GraphFileCache, compare_searches, graph_fingerprint, load_arrays,
+                                 run_reports, save_arrays, search_metric)
+
+# Saved landmark tables start with this tag, so old files are rebuilt if the format changes
+LANDMARK_FORMAT = "JRFALT01"
+
+# More landmarks give tighter bounds, but each one is two searches per metric to
+# build and another row of arithmetic for every destination
+DEFAULT_LANDMARK_COUNT = 16
+
+# Each search only uses the landmarks that give the best bounds at its source
+ACTIVE_LANDMARK_COUNT = 4
+
+
+def landmark_fingerprint(graph, count):
+    """
+    Returns the fingerprint a saved table must match: the graph with both sets of
+    weights (they share the same landmarks), plus the number of landmarks.
+    """
+    return graph_fingerprint(graph, METRICS, f"{LANDMARK_FORMAT}:{count}")
+
+
+def reverse_arrays(graph, weights):
+    """
+    Returns (offsets, sources, weights) of the graph with every edge turned around,
+    so a search over them follows roads backwards.
+    """
+    offsets, edges, sources = graph.incoming()
+    return list(offsets), list(sources), [weights[edge] for edge in edges]
+
+
+def costs_from(offsets, targets, weights, source):
+    """
+    Runs Dijkstra from one node over the whole graph.
+
+    offsets, targets, weights: The graph in CSR form (plain lists are fastest here)
+    source: Node number to start from
+
+    Returns a NumPy array of the cost to every node (infinity where unreachable)
+    """
+    infinity = float('infinity')
+    costs = [infinity] * (len(offsets) - 1)
+    costs[source] = 0.0
+    queue = [(0.0, source)]
+    while queue:
+        cost, node = heapq.heappop(queue)
+        if cost > costs[node]:
+            continue
+        for edge in range(offsets[node], offsets[node + 1]):
+            neighbor = targets[edge]
+            new_cost = cost + weights[edge]
+            if new_cost < costs[neighbor]:
+                costs[neighbor] = new_cost
+                heapq.heappush(queue, (new_cost, neighbor))
+    return np.array(costs, dtype=np.float64)
+
+
+def largest_component_node(graph):
+    """
+    Returns a node in the biggest connected piece of the graph (ignoring road direction).
+
+    OpenStreetMap extracts often contain small islands of road that don't connect to
+    anything else, and landmarks placed on them would not help any real route.
+    """
+    parent = list(range(graph.node_count))
+
+    def find(node):
+        while parent[node] != node:
+            parent[node] = parent[parent[node]]
+            node = parent[node]
+        return node
+
+    offsets, targets = graph.offsets, graph.targets
+    for node in range(graph.node_count):
+        for edge in range(offsets[node], offsets[node + 1]):
+            a, b = find(node), find(targets[edge])
+            if a != b:
+                parent[a] = b
+
+    roots = np.array([find(node) for node in range(graph.node_count)], dtype=np.int64)
+    sizes = np.bincount(roots, minlength=graph.node_count)
+    return int(np.flatnonzero(roots == np.argmax(sizes))[0])
+
+
+class LandmarkHeuristic:
+    """
+    Precomputed landmark distances for the distance and time metrics.
+
+    from_landmarks[metric][i, v] is the cost from landmark i to node v, and
+    to_landmarks[metric][i, v] is the cost from node v to landmark i. Rows of
+    bounds are cached per (destination, metric) like HaversineHeuristic's, and
+    each bound is the larger of the landmark bound and the straight-line one.
+    """
+
+    def __init__(self, landmarks, from_landmarks, to_landmarks, fingerprint, cache_size=64):
+        """
+        landmarks: Node numbers of the landmarks
+        from_landmarks, to_landmarks: Dictionaries of metric -> (landmarks x nodes) array
+        fingerprint: landmark_fingerprint of the graph the table was built for
+        cache_size: Number of per-destination rows to keep
+        """
+        self.landmarks = landmarks
+        self.from_landmarks = from_landmarks
+        self.to_landmarks = to_landmarks
+        self.fingerprint = fingerprint
+        self.fallback = None  # Straight-line HaversineHeuristic, set by get_landmark_heuristic
+        self.cache_size = cache_size
+        self.rows = OrderedDict()
+        self.lock = threading.Lock()  # Rows are shared between request threads
+
+    @classmethod
+    def build(cls, graph, count=DEFAULT_LANDMARK_COUNT, verbose=False):
+        """
+        Picks landmarks and works out the costs to and from them.
+
+        Landmarks are picked "farthest first": the first is the node farthest from a
+        node in the main part of the network, and each next one is the node farthest
+        from every landmark picked so far. That spreads them around the edge of the
+        map, where their bounds are tightest.
+
+        graph: RoadGraph to build the table for
+        count: Number of landmarks (fewer if the graph is smaller)
+        verbose: Print progress while building
+        """
+        fingerprint = landmark_fingerprint(graph, count)
+        count = max(1, min(count, graph.node_count))
+        offsets = list(graph.offsets)
+        targets = list(graph.targets)
+        forward = {metric: list(graph.weights(metric)) for metric in METRICS}
+        backward = {metric: reverse_arrays(graph, graph.weights(metric)) for metric in METRICS}
+
+        # Distance from the nearest landmark so far to every node; unreachable nodes
+        # count as -1 so landmarks stay in the main part of the network
+        start = largest_component_node(graph)
+        closest = costs_from(offsets, targets, forward["distance"], start)
+
+        landmarks = []
+        from_landmarks = {metric: [] for metric in METRICS}
+        to_landmarks = {metric: [] for metric in METRICS}
+        start_time = timer.time()
+        for _ in range(count):
+            landmark = int(np.argmax(np.where(np.isfinite(closest), closest, -1.0)))
+            if landmarks and (landmark in landmarks or closest[landmark] <= 0):
+                break  # Every reachable node is already a landmark
+            landmarks.append(landmark)
+
+            for metric in METRICS:
+                from_landmarks[metric].append(costs_from(offsets, targets, forward[metric], landmark))
+                to_landmarks[metric].append(costs_from(*backward[metric], landmark))
+
+            if len(landmarks) == 1:
+                closest = from_landmarks["distance"][0].copy()
+            else:
+                np.minimum(closest, from_landmarks["distance"][-1], out=closest)
+            if verbose:
+                print(f"  landmark {len(landmarks)}/{count}: node {landmark}, {timer.time() - start_time:.1f}s")
+
+        return cls(landmarks, {metric: np.vstack(rows) for metric, rows in from_landmarks.items()},
+                   {metric: np.vstack(rows) for metric, rows in to_landmarks.items()},
+                   fingerprint)
+
+    def save(self, filename):
+        """
+        Writes the table to a NumPy .npz file.
+        """
+        arrays = {}
+        for metric in METRICS:
+            arrays[f"from_{metric}"] = self.from_landmarks[metric]
+            arrays[f"to_{metric}"] = self.to_landmarks[metric]
+        save_arrays(filename, LANDMARK_FORMAT, fingerprint=np.array(self.fingerprint),
+                    landmarks=np.array(self.landmarks, dtype=np.int64), **arrays)
+
+    @classmethod
+    def load(cls, filename):
+        """
+        Reads a table written by save(). Returns None if the file is missing or from an older format.
+        """
+        data = load_arrays(filename, LANDMARK_FORMAT)
+        if data is None:
+            return None
+        try:
+            return cls(data["landmarks"].tolist(),
+                       {metric: data[f"from_{metric}"] for metric in METRICS},
+                       {metric: data[f"to_{metric}"] for metric in METRICS},
+                       str(data["fingerprint"]))
+        except KeyError:
+            return None
+
+    def active_landmarks(self, source, destination, metric, count=ACTIVE_LANDMARK_COUNT):
+        """
+        Returns the landmarks (as row numbers) that give the best bounds for one trip.
+
+        A landmark only helps routes heading roughly away from or towards it, so the
+        ones with the biggest bound at the source do nearly all the work for that trip.
+        """
+        from_landmarks = self.from_landmarks[metric]
+        to_landmarks = self.to_landmarks[metric]
+        with np.errstate(invalid="ignore"):
+            at_source = np.fmax(from_landmarks[:, destination] - from_landmarks[:, source],
+                                to_landmarks[:, source] - to_landmarks[:, destination])
+        order = np.argsort(-np.nan_to_num(at_source, nan=-1.0), kind="stable")
+        return tuple(sorted(order[:count].tolist()))
+
+    def bounds_to(self, destination, metric, active=None):
+        """
+        Returns an array of the best landmark lower bound from every node to the destination.
+
+        Landmarks that can't reach (or be reached from) a node give no bound for it.
+        An infinite bound means the node can't reach the destination at all.
+
+        active: Row numbers of the landmarks to use (None uses all of them)
+        """
+        from_landmarks = self.from_landmarks[metric]
+        to_landmarks = self.to_landmarks[metric]
+        if active is not None:
+            from_landmarks = from_landmarks[list(active)]
+            to_landmarks = to_landmarks[list(active)]
+        with np.errstate(invalid="ignore"):
+            # d(L, t) - d(L, v) and d(v, L) - d(t, L) for every landmark L and node v.
+            # fmax skips the NaNs from infinity minus infinity.
+            bounds = from_landmarks[:, destination, None] - from_landmarks
+            np.fmax(bounds, to_landmarks - to_landmarks[:, destination, None], out=bounds)
+            bounds = np.fmax.reduce(bounds, axis=0)
+        return np.fmax(bounds, 0.0)
+
+    def row(self, destination, optimize_for="time", source=None):
+        """
+        Returns a list of lower bounds from every node to the destination node.
+
+        With a source, only the few landmarks that suit the trip are used, which makes
+        the row several times cheaper to work out for almost the same bounds. Rows are
+        cached per (destination, metric, landmarks used), so repeated queries to popular
+        destinations don't recompute them.
+        """
+        metric = search_metric(optimize_for)
+        active = None if source is None else self.active_landmarks(source, destination, metric)
+        key = (destination, metric, active)
+        with self.lock:
+            if key in self.rows:
+                self.rows.move_to_end(key)
+                return self.rows[key]
+
+        bounds = self.bounds_to(destination, metric, active)
+        if self.fallback is not None:
+            # Near the destination the straight line can still be the better bound
+            np.maximum(bounds, self.fallback.bounds(destination, metric), out=bounds)
+        row = bounds.tolist()
+
+        with self.lock:
+            self.rows[key] = row
+            if len(self.rows) > self.cache_size:
+                self.rows.popitem(last=False)
+        return row
+
+
+# Landmark tables we have already loaded or built, keyed by graph
+_tables = GraphFileCache("alt", LandmarkHeuristic.load)
+
+
+def get_landmark_heuristic(graph, directory=None, fallback=None, count=DEFAULT_LANDMARK_COUNT, verbose=False):
+    """
+    Returns the landmark table for a graph.
+
+    It is loaded from directory if a matching one was saved there, otherwise it is
+    built (and saved, if a directory is given). Each one is then kept in memory.
+
+    graph: RoadGraph to route on
+    directory: Folder for saved landmark tables (None builds them in memory only)
+    fallback: HaversineHeuristic whose bounds are used where they are tighter
+    count: Number of landmarks
+    """
+    def build():
+        start_time = timer.time()
+        table = LandmarkHeuristic.build(graph, count, verbose=verbose)
+        print(f"Built {len(table.landmarks)} landmarks for {graph.node_count} nodes "
+              f"in {timer.time() - start_time:.1f}s")
+        return table
+
+    table = _tables.get(graph, None, directory, lambda: landmark_fingerprint(graph, count), build)
+    table.fallback = fallback
+    return table
+
+
+def visited_report(algorithms, optimize_for="time", pairs=None, sample_size=200, seed=0):
+    """
+    Compares A* with landmark bounds against A* with straight-line bounds on the same routes.
+
+    algorithms: RouteAlgorithms to run both searches with
+    optimize_for: Metric to compare on
+    pairs, sample_size, seed: Routes to compare, as for compare_searches
+    """
+    # Build or load the landmarks first, so they aren't counted in the query times
+    algorithms.landmark_heuristic()
+    return compare_searches(
+        algorithms.graph,
+        ("haversine", lambda source, destination: algorithms.a_star_algorithm(source, destination, optimize_for)),
+        ("alt", lambda source, destination: algorithms.a_star_algorithm(source, destination, optimize_for,
+                                                                        heuristic_mode="alt")),
+        optimize_for, pairs, sample_size, seed)
+
+
+def prepare_landmarks(locations, matrix, road_graph, directory):
+    """Builds (or loads) the landmark table for the command-line report."""
+    from algorithm import RouteAlgorithms
+
+    algorithms = RouteAlgorithms(locations, matrix, road_graph, hierarchy_dir=None, landmark_dir=directory)
+    get_landmark_heuristic(algorithms.graph, directory, algorithms.heuristic_table, verbose=True)
+    return algorithms
+
+
+if __name__ == "__main__":
+    # Usage: python landmarks.py [matrix|osm] [directory]
+    run_reports(os.path.join("cache", "alt"), prepare_landmarks, visited_report)
@@ -8,9 +8,7 @@ Helper module to manage location constraints and available routes.
 This file handles providing information about what locations and routes are available to users.
 """
 
-import json
-import os
-from itertools import permutations
+from location_index import get_location_index, normalize_name
 
 def get_available_locations(locations_file="jamaica_locations.json"):
     """
@@ -18,26 +16,10 @@ def get_available_locations(locations_file="jamaica_locations.json"):
     
     This function reads our locations database and formats it in a way that's
     easy to display to users, like in a dropdown menu or suggestion list.
+    The list is built once per version of the file by the location index.
     """
-    if not os.path.exists(locations_file):
-        return []  # Return empty list if file doesn't exist
-        
-    # Load the locations data
-    with open(locations_file, 'r') as f:
-        locations = json.load(f)
-    
-    # Format locations for display
-    available_locations = []
-    
-    # Convert from dictionary to a list of location objects
-    for loc_id, loc_data in locations.items():
-        available_locations.append({
-            "id": loc_id,  # Internal ID used by the system
-            "name": loc_data.get("display_name", loc_id.capitalize())  # Human-readable name
-        })
-        
-    # Sort alphabetically by name for better user experience
-    return sorted(available_locations, key=lambda x: x["name"])
+    # Already sorted alphabetically by name for better user experience
+    return list(get_location_index(locations_file).available)
 
 def get_available_routes(locations_file="jamaica_locations.json"):
     """
@@ -46,25 +28,63 @@ def get_available_routes(locations_file="jamaica_locations.json"):
     This creates all possible combinations of source and destination,
     which can be used to populate route selection interfaces.
     """
-    # Get the list of available locations
-    available_locations = get_available_locations(locations_file)
+    return list(iter_available_routes(locations_file))
+
+def get_route_sources(locations_file="jamaica_locations.json", source=None, prefix=None):
+    """
+    Gets the locations that routes can start from, in route list order.
     
-    # Generate all possible pairs (source-destination combinations)
-    all_routes = []
-    for source in available_locations:
-        for dest in available_locations:
-            # Don't create routes from a location to itself
-            if source["id"] != dest["id"]:
-                all_routes.append({
-                    "source": source["id"],
-                    "source_name": source["name"],
-                    "destination": dest["id"],
-                    "destination_name": dest["name"],
-                    "display": f"{source['name']} to {dest['name']}"  # Human-readable label
-                })
+    source: Only include this location ID
+    prefix: Only include locations whose name starts with this text (case insensitive)
+    """
+    sources = get_location_index(locations_file).route_sources
+    if source is not None:
+        sources = [loc for loc in sources if loc["id"] == source]
+    if prefix:
+        prefix = normalize_name(prefix)
+        sources = [loc for loc in sources if normalize_name(loc["name"]).startswith(prefix)]
+    return sources
+
+def count_available_routes(locations_file="jamaica_locations.json", source=None, prefix=None):
+    """
+    Counts the routes iter_available_routes would give, without generating them.
+    """
+    destinations = len(get_location_index(locations_file).available) - 1
+    return len(get_route_sources(locations_file, source, prefix)) * max(destinations, 0)
+
+def iter_available_routes(locations_file="jamaica_locations.json", source=None, prefix=None, start=0):
+    """
+    Yields the possible routes one at a time, sorted by display name.
+    
+    Routes are made as they are needed from the sorted location index, so asking for
+    one page never builds the full list of N x (N - 1) routes.
     
-    # Sort by display name for easier browsing
-    return sorted(all_routes, key=lambda x: x["display"])
+    source: Only include routes from this location ID
+    prefix: Only include routes from locations whose name starts with this text
+    start: Number of routes to skip (the pagination cursor)
+    """
+    destinations = get_location_index(locations_file).available
+    per_source = len(destinations) - 1
+    if per_source <= 0:
+        return
+    
+    # Every source has the same number of routes, so we can jump straight to the page
+    first_source, skip = divmod(start, per_source)
+    for source_loc in get_route_sources(locations_file, source, prefix)[first_source:]:
+        for dest in destinations:
+            # Don't create routes from a location to itself
+            if dest["id"] == source_loc["id"]:
+                continue
+            if skip:
+                skip -= 1
+                continue
+            yield {
+                "source": source_loc["id"],
+                "source_name": source_loc["name"],
+                "destination": dest["id"],
+                "destination_name": dest["name"],
+                "display": f"{source_loc['name']} to {dest['name']}"  # Human-readable label
+            }
 
 def is_valid_location(location_name, locations_file="jamaica_locations.json"):
     """
@@ -73,12 +93,7 @@ def is_valid_location(location_name, locations_file="jamaica_locations.json"):
     This helps validate user input when they type in location names,
     and also maps partial or display names to our internal location IDs.
     """
-    if not os.path.exists(locations_file):
-        return False, None  # Can't validate if file doesn't exist
-        
-    # Load the locations data
-    with open(locations_file, 'r') as f:
-        locations = json.load(f)
+    index = get_location_index(locations_file)
     
     # Explicitly disallow "kingston" by itself
     # (We have "new_kingston" but not plain "kingston")
@@ -86,17 +101,18 @@ def is_valid_location(location_name, locations_file="jamaica_locations.json"):
         return False, None
     
     # Try direct match on location ID first (most efficient)
-    if location_name in locations:
+    if location_name in index:
         return True, location_name
     
-    # If no direct match, try to match by display name (case insensitive)
-    location_name_lower = location_name.lower()
-    for loc_id, loc_data in locations.items():
-        if location_name_lower in loc_data.get("display_name", "").lower():
-            # Special case: avoid matching "kingston" to "new_kingston"
-            if location_name_lower == "kingston" and loc_id == "new_kingston":
-                continue
-            return True, loc_id
+    # Then an exact display name, so "Mona" doesn't turn into "Mona Heights"
+    loc_id = index.find_by_name(location_name)
+    if loc_id is not None:
+        return True, loc_id
+    
+    # If no direct match, try to match part of a display name (case insensitive)
+    loc_id = index.find_containing(location_name)
+    if loc_id is not None:
+        return True, loc_id
     
     # If we get here, no match was found
-    return False, None
\ No newline at end of file
+    return False, None
@@ -0,0 +1,136 @@
+"""
+Names: Shanaldo Carty,
+Completion Date: 08/7/2025
+"""
+
+"""
+In-memory index of our locations for the Jamaica Route Finder project.
+The locations file is read once and kept in lookup tables, so checking a location
+name doesn't touch the disk. If the file changes (its modification time moves on),
+the index is rebuilt the next time it's used.
+"""
+
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+
+# Indexes we have already built, keyed by file name
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def normalize_name(name):
+    """
+    Lower-cases a name and collapses runs of spaces, so "Half Way  Tree" and
+    "half way tree" look the same.
+    """
+    return " ".join(name.lower().split())
+
+
+class LocationIndex:
+    """
+    Lookup tables over the locations file.
+
+    - ids: location ID -> position in the file (exact ID lookups in O(1))
+    - names: normalized display name -> location ID (exact name lookups in O(1))
+    - suffixes: every suffix of every display name, sorted, so a substring search is
+      a binary search for the part of the list that starts with the search text
+    """
+
+    def __init__(self, locations):
+        """
+        Builds the lookup tables.
+
+        locations: Dictionary of location ID -> location data (as in jamaica_locations.json)
+        """
+        self.locations = locations
+        self.ids = {loc_id: position for position, loc_id in enumerate(locations)}
+
+        self.names = {}
+        self.suffixes = []
+        for loc_id, loc_data in locations.items():
+            name = loc_data.get("display_name", "").lower()
+            # If two locations share a name, the first one in the file wins
+            self.names.setdefault(normalize_name(name), loc_id)
+            for start in range(len(name)):
+                self.suffixes.append((name[start:], self.ids[loc_id]))
+        self.suffixes.sort()
+        self.suffix_keys = [suffix for suffix, _ in self.suffixes]
+        self.order = list(locations)
+
+        # Display list, sorted alphabetically by name for better user experience
+        self.available = sorted(
+            ({"id": loc_id, "name": loc_data.get("display_name", loc_id.capitalize())}
+             for loc_id, loc_data in locations.items()),
+            key=lambda x: x["name"]
+        )
+        # Route lists are sorted by "<source> to <destination>", which puts every route
+        # from one source together when sources are sorted by "<source> to "
+        self.route_sources = sorted(self.available, key=lambda x: x["name"] + " to ")
+
+    @classmethod
+    def from_file(cls, locations_file="jamaica_locations.json"):
+        """
+        Reads the locations file and indexes it. A missing file gives an empty index.
+        """
+        if not os.path.exists(locations_file):
+            return cls({})
+        with open(locations_file, 'r') as f:
+            return cls(json.load(f))
+
+    def __contains__(self, location_id):
+        return location_id in self.ids
+
+    def __len__(self):
+        return len(self.ids)
+
+    def find_by_name(self, name):
+        """
+        Returns the ID of the location whose display name is exactly this name, or None.
+        """
+        return self.names.get(normalize_name(name))
+
+    def find_containing(self, text):
+        """
+        Returns the first location (in file order) whose display name contains the text, or None.
+
+        Every display name containing the text has a suffix starting with it, and those
+        suffixes sit next to each other in the sorted list, so we binary search for the
+        first one and only look at matches.
+        """
+        text = text.lower()
+        best = None
+        start = bisect_left(self.suffix_keys, text)
+        for position in range(start, len(self.suffix_keys)):
+            if not self.suffix_keys[position].startswith(text):
+                break
+            order = self.suffixes[position][1]
+            if best is None or order < best:
+                best = order
+        return self.order[best] if best is not None else None
+
+
+def get_location_index(locations_file="jamaica_locations.json", check_interval=1.0):
+    """
+    Returns the index for a locations file, rebuilding it if the file has changed.
+
+    The file's modification time is checked at most once every check_interval seconds.
+    """
+    now = time.time()
+    with _indexes_lock:
+        entry = _indexes.get(locations_file)
+        if entry is not None and now - entry["checked_at"] < check_interval:
+            return entry["index"]
+
+        try:
+            mtime = os.path.getmtime(locations_file)
+        except OSError:
+            mtime = None
+
+        if entry is None or entry["mtime"] != mtime:
+            entry = {"index": LocationIndex.from_file(locations_file), "mtime": mtime}
+            _indexes[locations_file] = entry
+        entry["checked_at"] = now
+        return entry["index"]
@@ -0,0 +1,192 @@
+"""
+Names: Shanaldo Carty,
+Completion Date: 08/7/2025
+"""
+
+"""
+Fuzzy location search for the Jamaica Route Finder project.
+This file builds a trigram index over location names, so the search box can
+suggest the best matching places as the user types, even with typos
+("halfway tre", "cross rd") and in any order of the words.
+"""
+
+import threading
+from bisect import bisect_left
+
+import numpy as np
+
+from location_index import get_location_index, normalize_name
+
+# Search indexes we have already built, keyed by file name
+_search_indexes = {}
+_search_indexes_lock = threading.Lock()
+
+# Bonuses added to the trigram similarity, so "mona" ranks Mona above Mona Heights
+# and Mona Heights above Ramona
+EXACT_BONUS = 1.0
+PREFIX_BONUS = 0.5
+CONTAINS_BONUS = 0.25
+
+# Most names starting with the query that get the prefix bonus
+MAX_PREFIX_MATCHES = 64
+
+
+def trigrams(text, partial=False):
+    """
+    Returns the set of 3-character pieces of a normalized name.
+
+    Each word is padded with two spaces in front and one behind, so short queries
+    like "mo" still share the "  m" and " mo" trigrams with "Mona".
+
+    partial: The last word is still being typed, so don't pad its end
+    """
+    grams = set()
+    words = text.split()
+    for position, word in enumerate(words):
+        padded = f"  {word}" if partial and position == len(words) - 1 else f"  {word} "
+        for start in range(len(padded) - 2):
+            grams.add(padded[start:start + 3])
+    return grams
+
+
+class LocationSearch:
+    """
+    A character-trigram inverted index over location names and aliases.
+
+    Each name is broken into trigrams, and each trigram points at the names it
+    appears in (a NumPy array of name numbers). A search adds up the posting lists
+    of the query's trigrams with one bincount, scores every name that shares a
+    trigram with the query, and returns the best few.
+    """
+
+    def __init__(self, locations):
+        """
+        Builds the index.
+
+        locations: Dictionary of location ID -> location data. Besides display_name,
+        the ID itself ("halfway_tree" -> "halfway tree") and any "aliases" list
+        are searchable too.
+        """
+        self.names = []           # Normalized searchable names
+        self.name_locations = []  # Location ID for each name
+        self.display_names = {}
+        self.exact = {}           # normalized name -> name numbers
+        postings = {}             # trigram -> list of name numbers
+        sizes = []
+        self.max_aliases = 1
+
+        for loc_id, loc_data in locations.items():
+            display_name = loc_data.get("display_name", loc_id.capitalize())
+            self.display_names[loc_id] = display_name
+
+            aliases = [display_name, loc_id.replace("_", " ")] + list(loc_data.get("aliases", []))
+            seen = set()
+            for alias in aliases:
+                name = normalize_name(alias)
+                if not name or name in seen:
+                    continue
+                seen.add(name)
+
+                number = len(self.names)
+                grams = trigrams(name)
+                self.names.append(name)
+                self.name_locations.append(loc_id)
+                self.exact.setdefault(name, []).append(number)
+                sizes.append(len(grams))
+                for gram in grams:
+                    postings.setdefault(gram, []).append(number)
+            self.max_aliases = max(self.max_aliases, len(seen))
+
+        self.name_sizes = np.array(sizes, dtype=np.float64)
+        self.postings = {gram: np.array(numbers, dtype=np.int32) for gram, numbers in postings.items()}
+
+        # Names in alphabetical order, so names starting with the query can be found with bisect
+        self.sorted_names = sorted(range(len(self.names)), key=self.names.__getitem__)
+        self.sorted_keys = [self.names[number] for number in self.sorted_names]
+
+    def prefix_matches(self, query):
+        """Returns the numbers of (up to MAX_PREFIX_MATCHES) names starting with the query."""
+        matches = []
+        position = bisect_left(self.sorted_keys, query)
+        while (position < len(self.sorted_keys) and len(matches) < MAX_PREFIX_MATCHES
+               and self.sorted_keys[position].startswith(query)):
+            matches.append(self.sorted_names[position])
+            position += 1
+        return matches
+
+    def search(self, text, limit=5, min_score=0.1):
+        """
+        Finds the locations whose names best match the text.
+
+        The score is the Jaccard similarity of the trigram sets (shared trigrams over
+        all trigrams), plus a bonus for names that are exactly the query, start with it,
+        or contain all of its trigrams.
+
+        text: What the user has typed so far
+        limit: Most results to return
+        min_score: Leave out matches scoring below this
+
+        Returns a list of {"id", "name", "score", "matched"} dictionaries, best first
+        """
+        query = normalize_name(text)
+        query_grams = trigrams(query, partial=True)
+        lists = [self.postings[gram] for gram in query_grams if gram in self.postings]
+        if not lists or limit <= 0:
+            return []
+
+        # Number of trigrams each name shares with the query
+        shared = np.bincount(np.concatenate(lists), minlength=len(self.names))
+        candidates = np.flatnonzero(shared)
+        common = shared[candidates]
+        query_size = len(query_grams)
+        scores = common / (query_size + self.name_sizes[candidates] - common)
+        scores[common == query_size] += CONTAINS_BONUS
+
+        # Exact and prefix matches always share a trigram, so they are among the candidates
+        bonuses = {number: PREFIX_BONUS for number in self.prefix_matches(query)}
+        for number in self.exact.get(query, ()):
+            bonuses[number] = EXACT_BONUS
+        if bonuses:
+            numbers = np.fromiter(bonuses, dtype=np.int64, count=len(bonuses))
+            positions = np.searchsorted(candidates, numbers)
+            extra = np.fromiter(bonuses.values(), dtype=np.float64, count=len(bonuses))
+            # A name that earned the contains bonus gets the bigger bonus instead
+            scores[positions] += extra - np.where(common[positions] == query_size, CONTAINS_BONUS, 0.0)
+
+        # Take enough of the best names to still have `limit` locations after
+        # collapsing each location's aliases into one result
+        keep = min(len(candidates), limit * self.max_aliases)
+        best = np.argpartition(-scores, keep - 1)[:keep]
+        best = best[np.lexsort((candidates[best], -scores[best]))]
+
+        results = []
+        seen = set()
+        for position in best:
+            score = float(scores[position])
+            if score < min_score or len(results) >= limit:
+                break
+            number = int(candidates[position])
+            loc_id = self.name_locations[number]
+            if loc_id in seen:
+                continue
+            seen.add(loc_id)
+            results.append({
+                "id": loc_id,
+                "name": self.display_names[loc_id],
+                "score": round(score, 4),
+                "matched": self.names[number]
+            })
+        return results
+
+
+def get_location_search(locations_file="jamaica_locations.json"):
+    """
+    Returns the search index for a locations file, rebuilt whenever the location index is.
+    """
+    index = get_location_index(locations_file)
+    with _search_indexes_lock:
+        entry = _search_indexes.get(locations_file)
+        if entry is None or entry[0] is not index:
+            entry = (index, LocationSearch(index.locations))
+            _search_indexes[locations_file] = entry
+        return entry[1]
@@ -7,25 +7,32 @@ Completion Date: 08/7/2025
 Main application entry point for the Jamaica Route Finder project.
 """
 
-from flask import Flask, request, jsonify
+from flask import Flask, Response, request, jsonify, stream_with_context
 from flask_cors import CORS
 import time
 import json
 import os
-import requests
 import polyline
 import random
 import math
 from dotenv import load_dotenv
 from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta, timezone
 
 # Import our enhanced modules
 from jamaica_locations import load_locations_from_file
 from distance_matrix import load_distance_matrix, get_distance, get_travel_time
 from algorithm import RouteAlgorithms
+from caching import RouteMemo, ResponseCache
+from http_client import get_http_client
+from weather_service import WeatherService
+from osm_graph import build_road_network
 from ors_adapter import ORSAdapter
 from route_comparison import RouteComparison
-from location_constraints import get_available_locations, get_available_routes, is_valid_location
+from itertools import islice
+from location_search import get_location_search
+from location_constraints import get_available_locations, iter_available_routes, count_available_routes, is_valid_location
+from traffic_profiles import week_minute, traffic_level as describe_traffic
 
 # Load environment variables
 load_dotenv()
@@ -38,48 +45,102 @@ print("Loading Jamaica locations data...")
 locations = load_locations_from_file()
 
 print("Loading distance matrix...")
-matrix = load_distance_matrix("distance_matrix.json", locations)
+# Set DISTANCE_MATRIX_FILE=distance_matrix.bin to use the memory-mapped binary format
+matrix = load_distance_matrix(os.getenv("DISTANCE_MATRIX_FILE", "distance_matrix.json"), locations)
+
+road_graph = None
+if os.getenv("ROAD_NETWORK", "matrix").lower() == "osm":
+    # Route on the real road network from the OpenStreetMap extracts in backend/cache
+    print("Building road network from cached OpenStreetMap data...")
+    road_graph, _ = build_road_network(locations, "cache")
 
 print("Initializing routing algorithms...")
-route_algorithms = RouteAlgorithms(locations, matrix)
+# Each request runs a given search at most once. ROUTE_CACHE_SIZE also keeps that many
+# routes between requests (set it to 0 to only share them within a request).
+route_memo = RouteMemo(int(os.getenv("ROUTE_CACHE_SIZE", "256")))
+# Contraction hierarchies are saved in cache/ch and ALT landmarks in cache/alt
+# (set CH_DIR= or ALT_DIR= to keep them in memory only)
+route_algorithms = RouteAlgorithms(locations, matrix, road_graph, route_memo,
+                                   os.getenv("CH_DIR", os.path.join("cache", "ch")) or None,
+                                   os.getenv("ALT_DIR", os.path.join("cache", "alt")) or None)
 
 print("Initializing ORS adapter...")
-ors_adapter = ORSAdapter(os.getenv("ORS_API_KEY", "5b3ce3597851110001cf624897760630eca14a6787b79ad182ad9267"))
+# ORS responses are cached in memory and in cache/ors (set ORS_CACHE_DIR= to keep them in memory only)
+ors_cache = ResponseCache(
+    max_size=int(os.getenv("ORS_CACHE_SIZE", "512")),
+    ttl=int(os.getenv("ORS_CACHE_TTL", str(24 * 60 * 60))),
+    directory=os.getenv("ORS_CACHE_DIR", os.path.join("cache", "ors")) or None
+)
+ors_adapter = ORSAdapter(os.getenv("ORS_API_KEY", "5b3ce3597851110001cf624897760630eca14a6787b79ad182ad9267"), ors_cache)
 
 print("Initializing route comparison...")
-route_comparison = RouteComparison(route_algorithms, ors_adapter)
+# One shared pool for outgoing ORS requests, so a comparison waits for the slowest
+# request instead of all of them one after another
+ors_executor = ThreadPoolExecutor(max_workers=int(os.getenv("ORS_WORKERS", "8")), thread_name_prefix="ors")
+route_comparison = RouteComparison(route_algorithms, ors_adapter, ors_executor,
+                                   float(os.getenv("ORS_TIMEOUT", "20")))
 
 # OpenWeatherMap API Key
 OPENWEATHER_API_KEY = os.getenv("OPENWEATHER_API_KEY", "6016bbd207ddafc4382930854acddbb6")
+OPENWEATHER_URL = os.getenv("OPENWEATHER_URL", "https://api.openweathermap.org")
+
+# Pooled keep-alive connections with timeouts and retries, shared by every outside API
+http_client = get_http_client()
+
+# Weather is cached per ~10 km tile and refreshed in the background, so routes never wait for it
+weather_service = WeatherService(
+    OPENWEATHER_API_KEY,
+    OPENWEATHER_URL,
+    ttl=int(os.getenv("WEATHER_TTL", "600")),
+    tile_degrees=float(os.getenv("WEATHER_TILE_DEGREES", "0.1")),
+    http_client=http_client
+)
+if os.getenv("WEATHER_PREFETCH", "1") == "1":
+    # Start fetching weather for all our locations so the first requests already have it
+    weather_service.prefetch([(loc["lat"], loc["lng"]) for loc in locations.values()])
 
 def get_weather_for_location(lat, lng):
     """
-    Fetch current weather for a given coordinate using OpenWeatherMap API.
+    Return the cached weather for a given coordinate (None until the first fetch finishes).
     """
-    try:
-        url = "https://api.openweathermap.org/data/2.5/weather"
-        params = {
-            "lat": lat,
-            "lon": lng,
-            "appid": OPENWEATHER_API_KEY,
-            "units": "metric"  # For Celsius
-        }
-        
-        response = requests.get(url, params=params)
-        response.raise_for_status()
-        
-        data = response.json()
-        
-        weather_summary = {
-            "temperature": f"{data['main']['temp']}°C",
-            "condition": data["weather"][0]["description"].capitalize(),
-            "humidity": f"{data['main']['humidity']}%",
-            "wind": f"{data['wind']['speed']} m/s"
-        }
-        return weather_summary
-    except Exception as e:
-        print(f"Weather API error: {str(e)}")
+    return weather_service.get(lat, lng)
+
+# Jamaica stays on UTC-5 all year (no daylight saving)
+JAMAICA_TIME = timezone(timedelta(hours=-5))
+
+def parse_departure_time(data):
+    """
+    Reads the optional "departure_time" of a route request.
+
+    It can be an ISO 8601 date and time (like "2025-08-04T08:00") or "now".
+    Times without a UTC offset are taken as Jamaica time, and times with one
+    (like "2025-08-04T13:00:00Z") are converted to it. Seconds are dropped, so
+    requests in the same minute share their routes.
+
+    Returns a datetime, or None to use the usual travel times without traffic.
+    Raises ValueError if the value can't be read.
+    """
+    value = data.get("departure_time")
+    if not value:
         return None
+    if value == "now":
+        moment = datetime.now(JAMAICA_TIME).replace(tzinfo=None)
+    else:
+        moment = datetime.fromisoformat(str(value))
+        if moment.tzinfo is not None:
+            # The traffic profiles are in local time, so convert before dropping the offset
+            moment = moment.astimezone(JAMAICA_TIME).replace(tzinfo=None)
+    return moment.replace(second=0, microsecond=0)
+
+@app.before_request
+def start_route_memo():
+    """Give every request its own route memo, so handlers can share searches."""
+    route_memo.begin_request()
+
+@app.teardown_request
+def end_route_memo(exception=None):
+    """Drop the request's route memo once the response has been sent."""
+    route_memo.end_request()
 
 @app.route('/')
 def index():
@@ -91,6 +152,16 @@ def index():
         "distance_matrix_size": len(matrix["distances"])
     })
 
+@app.route('/api/cache-stats', methods=['GET'])
+def get_cache_stats():
+    """Return hit/miss counts for the route, ORS and weather caches, plus HTTP pool usage."""
+    return jsonify({
+        "routes": route_memo.shared.stats() if route_memo.shared else None,
+        "ors": ors_cache.stats(),
+        "http": http_client.stats(),
+        "weather": weather_service.stats()
+    })
+
 @app.route('/api/available-locations', methods=['GET'])
 def get_locations_list():
     """Return all available locations that can be used for routing."""
@@ -101,14 +172,78 @@ def get_locations_list():
         "count": len(available_locations)
     })
 
+# Largest page of routes a client can ask for at once
+MAX_ROUTES_PAGE = 1000
+
 @app.route('/api/available-routes', methods=['GET'])
 def get_routes_list():
-    """Return all available routes that can be calculated."""
-    available_routes = get_available_routes("jamaica_locations.json")
+    """
+    Return the available routes that can be calculated.
+    
+    Optional query parameters:
+    - limit: routes per page (up to MAX_ROUTES_PAGE); without it every route is returned
+    - cursor: next_cursor from the previous page
+    - source: only routes from this location
+    - prefix: only routes from locations whose name starts with this text
+    
+    Routes are generated as they are written out, so the full list is never built.
+    """
+    source = request.args.get("source")
+    prefix = request.args.get("prefix")
+    
+    try:
+        cursor = int(request.args.get("cursor", 0))
+        limit = request.args.get("limit")
+        limit = int(limit) if limit is not None else None
+    except ValueError:
+        return jsonify({"error": "limit and cursor must be whole numbers"}), 400
+    if cursor < 0 or (limit is not None and not 0 < limit <= MAX_ROUTES_PAGE):
+        return jsonify({"error": f"cursor must be 0 or more and limit between 1 and {MAX_ROUTES_PAGE}"}), 400
+    
+    source_id = None
+    if source:
+        source_valid, source_id = is_valid_location(source)
+        if not source_valid:
+            return jsonify({
+                "error": f"Location '{source}' is not available",
+                "available_locations": get_available_locations()
+            }), 404
+    
+    total = count_available_routes("jamaica_locations.json", source_id, prefix)
+    routes = iter_available_routes("jamaica_locations.json", source_id, prefix, cursor)
     
+    tail = {"count": total}
+    if limit is not None:
+        routes = islice(routes, limit)
+        tail["next_cursor"] = str(cursor + limit) if cursor + limit < total else None
+    
+    def generate():
+        # Write the JSON a route at a time instead of building the whole response
+        yield '{"routes": ['
+        for position, route in enumerate(routes):
+            yield (", " if position else "") + json.dumps(route)
+        yield "], " + json.dumps(tail)[1:]
+    
+    return Response(stream_with_context(generate()), mimetype="application/json")
+
+@app.route('/api/location-search', methods=['GET'])
+def search_locations():
+    """
+    Return the locations that best match what the user has typed, for autocomplete.
+    
+    Query parameters: q (the text typed so far) and limit (1 to 20, default 5).
+    """
+    query = request.args.get("q", "")
+    try:
+        limit = min(max(int(request.args.get("limit", 5)), 1), 20)
+    except ValueError:
+        return jsonify({"error": "limit must be a whole number"}), 400
+    
+    results = get_location_search("jamaica_locations.json").search(query, limit)
     return jsonify({
-        "routes": available_routes,
-        "count": len(available_routes)
+        "query": query,
+        "results": results,
+        "count": len(results)
     })
 
 @app.route('/api/locations', methods=['GET'])
@@ -173,6 +308,10 @@ def compare_routes():
         destination = data.get("destination")
         preference = data.get("preference", "fastest")
         options = data.get("options", {})
+        try:
+            departure_time = parse_departure_time(data)
+        except ValueError:
+            return jsonify({"error": "departure_time must be an ISO 8601 date and time or \"now\""}), 400
         
         if not source or not destination:
             return jsonify({
@@ -198,11 +337,18 @@ def compare_routes():
                 "available_locations": get_available_locations()
             }), 404
         
+        # Run our algorithm once and share the route with the comparison and the road summary
+        if preference == "fastest":
+            best_route = route_algorithms.find_fastest_route(source_id, dest_id, options, departure_time)
+        else:
+            best_route = route_algorithms.find_shortest_route(source_id, dest_id, preference, options)
+        
         # Compare routes
-        comparison_result = route_comparison.compare_routes(source_id, dest_id, preference, options)
+        comparison_result = route_comparison.compare_routes(source_id, dest_id, preference, options,
+                                                            our_result=best_route)
         
         # Generate road summary
-        road_summary = generate_road_summary(source_id, dest_id, preference, options)
+        road_summary = generate_road_summary(source_id, dest_id, preference, options, best_route, departure_time)
         
         # Add road summary to the result
         comparison_result["our_algorithm"]["road_summary"] = road_summary
@@ -228,6 +374,9 @@ def compare_routes():
             "available_locations": get_available_locations()
         }), 500
 
+# Algorithms the analysis endpoint can run
+ANALYSIS_ALGORITHMS = ("default", "ch", "alt", "bidirectional_dijkstra", "bidirectional_a_star")
+
 @app.route('/api/algorithm-analysis', methods=['POST'])
 def algorithm_analysis():
     """Get detailed algorithm analysis for a route."""
@@ -237,6 +386,12 @@ def algorithm_analysis():
         destination = data.get("destination")
         preference = data.get("preference", "fastest")
         options = data.get("options", {})
+        try:
+            departure_time = parse_departure_time(data)
+        except ValueError:
+            return jsonify({"error": "departure_time must be an ISO 8601 date and time or \"now\""}), 400
+        # "default" runs A* for the fastest route and Dijkstra otherwise
+        algorithm = data.get("algorithm", "default")
         
         if not source or not destination:
             return jsonify({
@@ -244,6 +399,12 @@ def algorithm_analysis():
                 "available_locations": get_available_locations()
             }), 400
         
+        if algorithm not in ANALYSIS_ALGORITHMS:
+            return jsonify({
+                "error": f"Unknown algorithm '{algorithm}'",
+                "available_algorithms": list(ANALYSIS_ALGORITHMS)
+            }), 400
+        
         # Validate locations
         source_valid, source_id = is_valid_location(source)
         if not source_valid:
@@ -261,13 +422,35 @@ def algorithm_analysis():
                 "available_locations": get_available_locations()
             }), 404
         
+        # Same metric the default algorithms use for this preference
+        optimize_for = "time" if preference == "fastest" else preference
+        
+        if algorithm == "ch":
+            # Make sure the hierarchy is loaded, so only the query itself is timed
+            route_algorithms.contraction_hierarchy(optimize_for)
+        elif algorithm == "alt":
+            # Same for the landmark distances
+            route_algorithms.landmark_heuristic()
+        
         # Run our algorithm
         start_time = time.time()
         
-        if preference == "fastest":
-            result = route_algorithms.find_fastest_route(source_id, dest_id, options)
+        if algorithm == "ch":
+            result = route_algorithms.contraction_hierarchy_algorithm(source_id, dest_id, optimize_for, options)
+        elif algorithm == "alt":
+            result = route_algorithms.a_star_algorithm(source_id, dest_id, optimize_for, options, heuristic_mode="alt")
+        elif algorithm == "bidirectional_dijkstra":
+            result = route_algorithms.bidirectional_dijkstra_algorithm(source_id, dest_id, optimize_for, options)
+        elif algorithm == "bidirectional_a_star":
+            result = route_algorithms.bidirectional_a_star_algorithm(source_id, dest_id, optimize_for, options)
+        # The default algorithms are run directly rather than through find_*_route, so the
+        # route memo can't hand back an earlier result with the timings of a cache lookup
+        elif preference == "fastest" and departure_time is not None:
+            result = route_algorithms.time_dependent_algorithm(source_id, dest_id, departure_time, options)
+        elif preference == "fastest":
+            result = route_algorithms.a_star_algorithm(source_id, dest_id, "time", options)
         else:
-            result = route_algorithms.find_shortest_route(source_id, dest_id, preference, options)
+            result = route_algorithms.dijkstra_algorithm(source_id, dest_id, preference, options)
             
         execution_time = (time.time() - start_time) * 1000  # milliseconds
         
@@ -293,8 +476,30 @@ def algorithm_analysis():
             "operations": result.get("operations", 0)
         }
         
+        if algorithm != "default":
+            # Run the search each algorithm improves on over the same route to show what it saves:
+            # plain Dijkstra for the hierarchy and bidirectional Dijkstra, A* with straight-line
+            # bounds for the landmarks and bidirectional A*
+            start_time = time.time()
+            if algorithm in ("ch", "bidirectional_dijkstra"):
+                baseline_name = "Dijkstra's Algorithm"
+                baseline_result = route_algorithms.dijkstra_algorithm(source_id, dest_id, optimize_for, options)
+            else:
+                baseline_name = "A* Search Algorithm (straight-line heuristic)"
+                baseline_result = route_algorithms.a_star_algorithm(source_id, dest_id, optimize_for, options)
+            baseline_time = (time.time() - start_time) * 1000
+            baseline_visited = baseline_result.get("nodes_visited", 0)
+            response["comparison"] = {
+                "baseline": baseline_name,
+                "baseline_execution_time_ms": baseline_time,
+                "baseline_nodes_visited": baseline_visited,
+                "speedup": round(baseline_time / execution_time, 2) if execution_time > 0 else None,
+                "nodes_visited_reduction": (round(1 - response["nodes_visited"] / baseline_visited, 3)
+                                            if baseline_visited else None)
+            }
+        
         # Add road summary
-        response["road_summary"] = generate_road_summary(source_id, dest_id, preference, options)
+        response["road_summary"] = generate_road_summary(source_id, dest_id, preference, options, result, departure_time)
         
         return jsonify(response)
         
@@ -314,6 +519,10 @@ def get_our_algorithm_route():
         destination = data.get("destination")
         preference = data.get("preference", "fastest")
         options = data.get("options", {})
+        try:
+            departure_time = parse_departure_time(data)
+        except ValueError:
+            return jsonify({"error": "departure_time must be an ISO 8601 date and time or \"now\""}), 400
         
         if not source or not destination:
             return jsonify({
@@ -340,7 +549,7 @@ def get_our_algorithm_route():
         
         # Get primary route
         if preference == "fastest":
-            best_route = route_algorithms.find_fastest_route(source_id, dest_id, options)
+            best_route = route_algorithms.find_fastest_route(source_id, dest_id, options, departure_time)
         else:
             best_route = route_algorithms.find_shortest_route(source_id, dest_id, preference, options)
         
@@ -351,7 +560,7 @@ def get_our_algorithm_route():
         alt_preference = "shortest" if preference == "fastest" else "fastest"
         
         if alt_preference == "fastest":
-            alt_route = route_algorithms.find_fastest_route(source_id, dest_id, options)
+            alt_route = route_algorithms.find_fastest_route(source_id, dest_id, options, departure_time)
         else:
             alt_route = route_algorithms.find_shortest_route(source_id, dest_id, alt_preference, options)
         
@@ -389,9 +598,14 @@ def get_our_algorithm_route():
             },
             "used_highway_despite_avoidance": used_highway_despite_avoidance  # Add highway usage flag
         }
-        
-        # Generate road summary
-        road_summary = generate_road_summary(source_id, dest_id, preference, options)
+        if "departure_time" in best_route:
+            # Routes found for a departure time include the traffic on the way
+            best_route_response["departure_time"] = best_route["departure_time"]
+            best_route_response["arrival_time"] = best_route["arrival_time"]
+            best_route_response["free_flow_time"] = f"{best_route['free_flow_time']:.2f} minutes"
+
+        # Generate road summary from the route we already have
+        road_summary = generate_road_summary(source_id, dest_id, preference, options, best_route, departure_time)
         
         # Get weather for destination
         try:
@@ -462,15 +676,19 @@ def get_our_algorithm_route():
 
 
 
-def generate_road_summary(source, destination, preference, options):
+def generate_road_summary(source, destination, preference, options, route_result=None, departure_time=None):
     """
     Generate a realistic road summary based on route data.
+    
+    route_result: Route the endpoint already calculated, so we don't search again
+    departure_time: When the trip starts (None for now)
     """
     # Determine the route path
-    if preference == "fastest":
-        route_result = route_algorithms.find_fastest_route(source, destination, options)
-    else:
-        route_result = route_algorithms.find_shortest_route(source, destination, preference, options)
+    if route_result is None:
+        if preference == "fastest":
+            route_result = route_algorithms.find_fastest_route(source, destination, options, departure_time)
+        else:
+            route_result = route_algorithms.find_shortest_route(source, destination, preference, options)
 
     path = route_result.get("path", [])
 
@@ -580,23 +798,13 @@ def generate_road_summary(source, destination, preference, options):
         else:
             road_types = {"highway": 80, "primary": 15, "secondary": 5, "tertiary": 0}
 
-    # Traffic estimation
-    current_hour = time.localtime().tm_hour
-    day_of_week = time.strftime("%A")
-    is_weekday = day_of_week not in ["Saturday", "Sunday"]
-    is_morning_rush = is_weekday and 7 <= current_hour <= 9
-    is_evening_rush = is_weekday and 16 <= current_hour <= 18
-
-    if is_morning_rush or is_evening_rush:
-        traffic_level = "Heavy"
-        estimated_delay = "30.0%"
-    elif (is_weekday and (9 < current_hour < 16 or 18 < current_hour < 21)) or \
-         (not is_weekday and 10 <= current_hour <= 18):
-        traffic_level = "Moderate"
-        estimated_delay = "15.0%"
-    else:
-        traffic_level = "Light"
-        estimated_delay = "5.0%"
+    # Traffic estimation from the same weekly profiles the time-dependent searches use.
+    # A route found for a departure time knows its own delay; otherwise use the typical one.
+    delay = route_result.get("traffic_delay")
+    if delay is None:
+        delay = route_algorithms.traffic.typical_delay(week_minute(departure_time or datetime.now()))
+    traffic_level = describe_traffic(delay)
+    estimated_delay = f"{delay * 100:.1f}%"
 
     # Road conditions
     road_conditions = [
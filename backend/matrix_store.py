@@ -0,0 +1,263 @@
+"""
+Names: Shanaldo Carty,
+Completion Date: 08/7/2025
+"""
+
+"""
+Binary storage for the distance and time matrices.
+This file saves the matrices as one small header plus two blocks of float32 numbers,
+and opens them with numpy.memmap. Every server process that opens the same file shares
+the same pages in memory, and opening it takes the same time however many locations
+there are. The roads are also saved in the CSR form RoadGraph searches on, so the
+graph can use the file's pages directly instead of building private copies.
+
+File layout:
+    8 bytes   magic "JRFMTX01"
+    4 bytes   header length (little-endian unsigned int)
+    header    JSON with the list of location IDs
+    padding   zeros up to a multiple of 64 bytes
+    N x N     float32 distances (km), row = source, column = destination
+    N x N     float32 times (minutes)
+    padding   zeros up to a multiple of 64 bytes
+    N + 1     int64 CSR offsets (the roads leaving node i are offsets[i] up to offsets[i + 1])
+    E         int64 CSR targets
+    E         float64 CSR distances (the float32 values above, widened)
+    E         float64 CSR times
+Missing entries (like a location to itself) are stored as NaN and have no CSR edge.
+The header's "edges" gives E; files written before the CSR section was added don't
+have it, and RoadGraph builds its arrays from the matrices instead.
+"""
+
+import json
+import struct
+import sys
+from collections.abc import Mapping
+
+import numpy as np
+
+MATRIX_MAGIC = b"JRFMTX01"
+HEADER_ALIGNMENT = 64
+
+
+class MatrixRow(Mapping):
+    """
+    One row of a binary matrix, used like the {destination: value} dictionaries
+    of the JSON matrix.
+    """
+
+    def __init__(self, ids, index, values):
+        self.ids = ids
+        self.index = index
+        self.values = values
+
+    def __getitem__(self, destination):
+        value = self.values[self.index[destination]]
+        if np.isnan(value):
+            raise KeyError(destination)
+        return float(value)
+
+    def __iter__(self):
+        for position in np.flatnonzero(~np.isnan(self.values)):
+            yield self.ids[position]
+
+    def __len__(self):
+        return int(np.count_nonzero(~np.isnan(self.values)))
+
+
+class MatrixRows(Mapping):
+    """
+    A whole binary matrix, used like the {source: {destination: value}} dictionaries
+    of the JSON matrix.
+    """
+
+    def __init__(self, ids, index, values):
+        self.ids = ids
+        self.index = index
+        self.values = values
+
+    def __getitem__(self, source):
+        return MatrixRow(self.ids, self.index, self.values[self.index[source]])
+
+    def __iter__(self):
+        return iter(self.ids)
+
+    def __len__(self):
+        return len(self.ids)
+
+
+class BinaryDistanceMatrix(Mapping):
+    """
+    A memory-mapped distance/time matrix.
+
+    It can be used anywhere the JSON matrix dictionary is used:
+    matrix["distances"][source][destination] works the same way. The raw arrays
+    are also available as distance_array and time_array for vectorized code, and
+    csr holds memory-mapped (offsets, targets, distances, times) arrays (None for
+    files without them).
+    """
+
+    def __init__(self, filename):
+        """
+        Opens a binary matrix file without reading the matrices themselves.
+
+        filename: Path to the .bin file
+        """
+        with open(filename, 'rb') as f:
+            magic = f.read(len(MATRIX_MAGIC))
+            if magic != MATRIX_MAGIC:
+                raise ValueError(f"{filename} is not a binary distance matrix")
+            (header_length,) = struct.unpack("<I", f.read(4))
+            header = json.loads(f.read(header_length).decode("utf-8"))
+
+        self.filename = filename
+        self.ids = header["ids"]
+        self.index = {loc_id: i for i, loc_id in enumerate(self.ids)}
+
+        count = len(self.ids)
+        data_offset = aligned_data_offset(header_length)
+        self.distance_array = np.memmap(filename, dtype="<f4", mode="r",
+                                        offset=data_offset, shape=(count, count))
+        self.time_array = np.memmap(filename, dtype="<f4", mode="r",
+                                    offset=data_offset + count * count * 4, shape=(count, count))
+
+        self.sections = {
+            "distances": MatrixRows(self.ids, self.index, self.distance_array),
+            "times": MatrixRows(self.ids, self.index, self.time_array),
+        }
+
+        self.csr = None
+        edge_count = header.get("edges")
+        if edge_count is not None:
+            offset = csr_offset(data_offset, count)
+            sections = []
+            for dtype, length in (("<i8", count + 1), ("<i8", edge_count), ("<f8", edge_count), ("<f8", edge_count)):
+                # np.memmap can't map an empty array, which happens for a one-location matrix
+                sections.append(np.memmap(filename, dtype=dtype, mode="r", offset=offset, shape=(length,))
+                                if length else np.empty(0, dtype=dtype))
+                offset += length * 8
+            self.csr = tuple(sections)
+
+    def __getitem__(self, key):
+        return self.sections[key]
+
+    def __iter__(self):
+        return iter(self.sections)
+
+    def __len__(self):
+        return len(self.sections)
+
+
+def aligned_data_offset(header_length):
+    """
+    Works out where the matrix data starts, given the length of the JSON header.
+    """
+    offset = len(MATRIX_MAGIC) + 4 + header_length
+    return (offset + HEADER_ALIGNMENT - 1) // HEADER_ALIGNMENT * HEADER_ALIGNMENT
+
+
+def csr_offset(data_offset, count):
+    """
+    Works out where the CSR section starts, given where the matrices start and their size.
+    """
+    offset = data_offset + 2 * count * count * 4
+    return (offset + HEADER_ALIGNMENT - 1) // HEADER_ALIGNMENT * HEADER_ALIGNMENT
+
+
+def save_binary_matrix(ids, distance_array, time_array, filename):
+    """
+    Writes two N x N arrays and their location IDs to a binary matrix file.
+
+    ids: List of location IDs, in row/column order
+    distance_array: N x N distances in km (NaN where there is no entry)
+    time_array: N x N times in minutes (NaN where there is no entry)
+    filename: Path to write to
+    """
+    distance_array = np.ascontiguousarray(distance_array, dtype="<f4")
+    time_array = np.ascontiguousarray(time_array, dtype="<f4")
+
+    # The roads in CSR form, in row order, with the same (float32) values as the matrices
+    present = ~np.isnan(distance_array)
+    offsets = np.concatenate(([0], np.cumsum(present.sum(axis=1)))).astype("<i8")
+    targets = np.nonzero(present)[1].astype("<i8")
+    csr = (offsets, targets, distance_array[present].astype("<f8"), time_array[present].astype("<f8"))
+
+    header = json.dumps({"ids": list(ids), "dtype": "float32", "edges": len(targets)}).encode("utf-8")
+    data_offset = aligned_data_offset(len(header))
+
+    with open(filename, 'wb') as f:
+        f.write(MATRIX_MAGIC)
+        f.write(struct.pack("<I", len(header)))
+        f.write(header)
+        f.write(b"\0" * (data_offset - f.tell()))
+        f.write(distance_array.tobytes())
+        f.write(time_array.tobytes())
+        f.write(b"\0" * (csr_offset(data_offset, len(ids)) - f.tell()))
+        for values in csr:
+            f.write(values.tobytes())
+
+
+def matrix_to_arrays(matrix, ids=None):
+    """
+    Converts a nested-dictionary matrix into (ids, distance array, time array).
+    """
+    ids = list(ids or matrix["distances"])
+    index = {loc_id: i for i, loc_id in enumerate(ids)}
+    count = len(ids)
+
+    arrays = {}
+    for section in ("distances", "times"):
+        values = np.full((count, count), np.nan, dtype=np.float32)
+        for source, row in matrix[section].items():
+            for destination, value in row.items():
+                values[index[source], index[destination]] = value
+        arrays[section] = values
+
+    return ids, arrays["distances"], arrays["times"]
+
+
+def arrays_to_matrix(ids, distance_array, time_array):
+    """
+    Converts matrix arrays back into the nested dictionaries used by the JSON format.
+    Values are rounded to 2 decimal places like the generated JSON matrix.
+    """
+    matrix = {"distances": {}, "times": {}}
+    for section, values in (("distances", distance_array), ("times", time_array)):
+        for i, source in enumerate(ids):
+            matrix[section][source] = {
+                ids[j]: round(float(values[i, j]), 2)
+                for j in range(len(ids)) if not np.isnan(values[i, j])
+            }
+    return matrix
+
+
+def convert_json_to_binary(json_file="distance_matrix.json", binary_file="distance_matrix.bin"):
+    """
+    Converts the JSON distance matrix into the binary format.
+    """
+    with open(json_file, 'r') as f:
+        matrix = json.load(f)
+    ids, distance_array, time_array = matrix_to_arrays(matrix)
+    save_binary_matrix(ids, distance_array, time_array, binary_file)
+    print(f"Converted {json_file} ({len(ids)} locations) to {binary_file}")
+
+
+def convert_binary_to_json(binary_file="distance_matrix.bin", json_file="distance_matrix.json"):
+    """
+    Converts a binary distance matrix back into the JSON format.
+    """
+    binary = BinaryDistanceMatrix(binary_file)
+    matrix = arrays_to_matrix(binary.ids, binary.distance_array, binary.time_array)
+    with open(json_file, 'w') as f:
+        json.dump(matrix, f, indent=2)
+    print(f"Converted {binary_file} ({len(binary.ids)} locations) to {json_file}")
+
+
+if __name__ == "__main__":
+    # Usage: python matrix_store.py to-binary|to-json [input] [output]
+    if len(sys.argv) < 2 or sys.argv[1] not in ("to-binary", "to-json"):
+        print("Usage: python matrix_store.py to-binary|to-json [input] [output]")
+        sys.exit(1)
+    if sys.argv[1] == "to-binary":
+        convert_json_to_binary(*sys.argv[2:4])
+    else:
+        convert_binary_to_json(*sys.argv[2:4])
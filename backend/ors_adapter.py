@@ -9,13 +9,13 @@ This file helps us connect to the OpenRouteService API, which is a professional
 routing service that we use to validate our own routing algorithms.
 """
 
-import requests
 import polyline
 import json
 import time
 import os
 from geopy.distance import geodesic
 from route_waypoints import find_intermediate_locations
+from http_client import get_http_client
 
 class ORSAdapter:
     """
@@ -26,20 +26,47 @@ class ORSAdapter:
     and to compare our routes with a professional solution.
     """
     
-    def __init__(self, api_key=None):
+    def __init__(self, api_key=None, cache=None, http_client=None):
         """
         Sets up the adapter with an API key for OpenRouteService.
         
         The API key is required to access the ORS services. We can either provide
         one directly or use one from environment variables.
+        
+        cache: Optional ResponseCache, so repeated requests don't go back to ORS
+        http_client: HttpClient to send requests with (defaults to the shared pooled client)
         """
         # Use provided API key or get from environment variable
         self.api_key = api_key or os.getenv("ORS_API_KEY", "5b3ce3597851110001cf624897760630eca14a6787b79ad182ad9267")
-        self.base_url = "https://api.openrouteservice.org/v2/directions/driving-car"
+        # ORS_BASE_URL can point at a local server (for example a stub when testing)
+        self.base_url = os.getenv("ORS_BASE_URL", "https://api.openrouteservice.org") + "/v2/directions/driving-car"
         self.headers = {
             "Authorization": self.api_key,
             "Content-Type": "application/json"
         }
+        self.cache = cache
+        self.http = http_client or get_http_client()
+    
+    def post_directions(self, params):
+        """
+        Sends a directions request to ORS and returns the parsed JSON response.
+        
+        Responses with routes in them are cached by request body, so the same
+        comparison asked for twice only costs one API call.
+        """
+        if self.cache is not None:
+            cached = self.cache.get(self.base_url, params)
+            if cached is not None:
+                return cached
+        
+        response = self.http.post(self.base_url, json=params, headers=self.headers)
+        response.raise_for_status()  # Raise an exception for HTTP errors
+        route_data = response.json()
+        
+        # Only keep real answers, never errors or empty results
+        if self.cache is not None and route_data.get("routes"):
+            self.cache.put(self.base_url, params, route_data)
+        return route_data
     
     def format_coordinates_for_ors(self, coordinates):
         """
@@ -114,12 +141,8 @@ class ORSAdapter:
                 if avoid_features:
                     params["options"] = {"avoid_features": avoid_features}
             
-            # Make the API request
-            response = requests.post(self.base_url, json=params, headers=self.headers)
-            response.raise_for_status()  # Raise an exception for HTTP errors
-            
-            # Parse the response
-            route_data = response.json()
+            # Make the API request (or reuse the cached response)
+            route_data = self.post_directions(params)
             
             if "routes" in route_data and route_data["routes"]:
                 route = route_data["routes"][0]
@@ -179,12 +202,8 @@ class ORSAdapter:
                 if avoid_features:
                     params["options"] = {"avoid_features": avoid_features}
             
-            # Make the API request
-            response = requests.post(self.base_url, json=params, headers=self.headers)
-            response.raise_for_status()
-            
-            # Parse the response
-            route_data = response.json()
+            # Make the API request (or reuse the cached response)
+            route_data = self.post_directions(params)
             
             if "routes" in route_data and route_data["routes"]:
                 route = route_data["routes"][0]
@@ -0,0 +1,321 @@
+"""
+Names: Shanaldo Carty,
+Completion Date: 08/7/2025
+"""
+
+"""
+Road network builder for the Jamaica Route Finder project.
+This file reads the OpenStreetMap extracts saved in the cache folder and turns them
+into a RoadGraph of real roads, so our algorithms can route on actual streets
+instead of straight lines between the locations. Everything is read from disk,
+so no internet connection is needed.
+"""
+
+import glob
+import math
+import os
+from array import array
+
+from distance_matrix import ROAD_SPEEDS
+from overpass_stream import read_overpass_arrays
+from road_graph import RoadGraph, ROAD_TYPE_CODES
+
+# How OpenStreetMap "highway" tags map onto our road types.
+# Tags not listed here (footways, paths, steps, ...) can't be driven and are skipped.
+OSM_ROAD_TYPES = {
+    "motorway": "highway",
+    "motorway_link": "highway",
+    "trunk": "highway",
+    "trunk_link": "highway",
+    "primary": "primary",
+    "primary_link": "primary",
+    "secondary": "secondary",
+    "secondary_link": "secondary",
+    "tertiary": "tertiary",
+    "tertiary_link": "tertiary",
+    "unclassified": "other",
+    "residential": "other",
+    "living_street": "other",
+    "service": "other",
+    "road": "other",
+    "track": "other",
+}
+
+# Mean Earth radius used for road segment lengths (km)
+EARTH_RADIUS_KM = 6371.0088
+
+# Locations further than this from any road are left off the road network (km)
+DEFAULT_SNAP_RADIUS_KM = 2.0
+
+
+def segment_length_km(lat1, lng1, lat2, lng2):
+    """
+    Calculates the length of a short road segment with the haversine formula.
+
+    Returns: Distance in kilometers
+    """
+    lat1, lng1, lat2, lng2 = map(math.radians, (lat1, lng1, lat2, lng2))
+    a = (math.sin((lat2 - lat1) / 2) ** 2 +
+         math.cos(lat1) * math.cos(lat2) * math.sin((lng2 - lng1) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * math.asin(math.sqrt(min(a, 1.0)))
+
+
+def parse_maxspeed(value):
+    """
+    Reads an OSM maxspeed tag like "50" or "30 mph".
+
+    Returns the speed in km/h, or None if the tag can't be read
+    """
+    if not value:
+        return None
+    parts = value.strip().split()
+    try:
+        speed = float(parts[0])
+    except ValueError:
+        return None
+    if len(parts) > 1 and parts[1].lower() == "mph":
+        speed *= 1.609344
+    return speed if speed > 0 else None
+
+
+def way_direction(tags):
+    """
+    Works out which way traffic can drive along an OSM way.
+
+    Returns 1 for forward only, -1 for backward only and 0 for both directions
+    """
+    oneway = tags.get("oneway", "").lower()
+    if oneway in ("yes", "true", "1"):
+        return 1
+    if oneway == "-1" or oneway == "reverse":
+        return -1
+    if oneway == "no":
+        return 0
+    # Motorways and roundabouts are one-way unless tagged otherwise
+    if tags.get("highway") == "motorway" or tags.get("junction") in ("roundabout", "circular"):
+        return 1
+    return 0
+
+
+class RoadNetworkBuilder:
+    """
+    Collects nodes and ways from the OSM extracts and builds a RoadGraph.
+
+    Nodes are shared between files by their OSM ID, so roads that cross the edge of
+    one extract connect to the same road in the next one. Everything is kept in
+    flat arrays rather than one dictionary per node or way.
+    """
+
+    def __init__(self, road_speeds=None):
+        """
+        Sets up empty node and way arrays.
+
+        road_speeds: Speeds (km/h) for each of our road types, defaults to ROAD_SPEEDS
+        """
+        self.road_speeds = road_speeds or ROAD_SPEEDS
+        self.max_speed = max(self.road_speeds.values())
+
+        # OSM node ID -> position in the coordinate arrays
+        self.osm_index = {}
+        self.lats = array("d")
+        self.lngs = array("d")
+
+        # Drivable ways: node refs for way j are way_refs[way_offsets[j]:way_offsets[j + 1]]
+        self.way_refs = array("q")
+        self.way_offsets = array("l", [0])
+        self.way_codes = bytearray()
+        self.way_speeds = array("d")
+        self.way_directions = array("b")
+
+    def add_file(self, filename):
+        """
+        Streams one Overpass response file and keeps its nodes and drivable ways.
+        """
+        extract = read_overpass_arrays(filename)
+
+        for osm_id, lat, lng in zip(extract.node_ids, extract.lats, extract.lngs):
+            if osm_id not in self.osm_index:
+                self.osm_index[osm_id] = len(self.lats)
+                self.lats.append(lat)
+                self.lngs.append(lng)
+
+        for way in range(extract.way_count):
+            self.add_way(extract.way_nodes(way), extract.way_tags[way])
+
+    def add_way(self, node_refs, tags):
+        """
+        Keeps a way if it is a road we can drive on.
+
+        node_refs: List of OSM node IDs along the way
+        tags: Dictionary of OSM tags for the way
+        """
+        road_type = OSM_ROAD_TYPES.get(tags.get("highway"))
+        if road_type is None or len(node_refs) < 2:
+            return
+
+        # Use the signposted speed if there is one, but never more than our fastest road
+        speed = self.road_speeds.get(road_type, self.road_speeds["secondary"])
+        maxspeed = parse_maxspeed(tags.get("maxspeed"))
+        if maxspeed:
+            speed = min(maxspeed, self.max_speed)
+
+        self.way_refs.extend(node_refs)
+        self.way_offsets.append(len(self.way_refs))
+        self.way_codes.append(ROAD_TYPE_CODES[road_type])
+        self.way_speeds.append(speed)
+        self.way_directions.append(way_direction(tags))
+
+    def build(self, locations_data, snap_radius_km=DEFAULT_SNAP_RADIUS_KM):
+        """
+        Turns the collected ways into a RoadGraph and connects our locations to it.
+
+        Each location becomes its own node, joined in both directions to the closest
+        road node within snap_radius_km. Locations with no road close enough are
+        still added (so lookups work) but have no edges.
+
+        locations_data: Dictionary of locations with coordinates
+        snap_radius_km: Furthest a location can be from the road network
+
+        Returns (RoadGraph, dictionary of location ID -> snapped OSM node ID or None)
+        """
+        index = {}
+        node_ids = []
+        lats = array("d")
+        lngs = array("d")
+
+        def node_index(node_id, lat, lng):
+            if node_id not in index:
+                index[node_id] = len(node_ids)
+                node_ids.append(node_id)
+                lats.append(lat)
+                lngs.append(lng)
+            return index[node_id]
+
+        # Our locations come first so they keep the same numbers as the matrix graph
+        for loc_id, loc_data in locations_data.items():
+            node_index(loc_id, loc_data["lat"], loc_data["lng"])
+
+        edges = EdgeArrays()
+        for way in range(len(self.way_codes)):
+            code = self.way_codes[way]
+            speed = self.way_speeds[way]
+            direction = self.way_directions[way]
+            node_refs = self.way_refs[self.way_offsets[way]:self.way_offsets[way + 1]]
+
+            for start_ref, end_ref in zip(node_refs, node_refs[1:]):
+                if start_ref not in self.osm_index or end_ref not in self.osm_index:
+                    continue  # Way runs off the edge of the extract
+                start_position = self.osm_index[start_ref]
+                end_position = self.osm_index[end_ref]
+                start_lat, start_lng = self.lats[start_position], self.lngs[start_position]
+                end_lat, end_lng = self.lats[end_position], self.lngs[end_position]
+                start = node_index(start_ref, start_lat, start_lng)
+                end = node_index(end_ref, end_lat, end_lng)
+
+                length = segment_length_km(start_lat, start_lng, end_lat, end_lng)
+                minutes = length / speed * 60
+                if direction >= 0:
+                    edges.add(start, end, length, minutes, code)
+                if direction <= 0:
+                    edges.add(end, start, length, minutes, code)
+
+        # Join every location to its closest road node
+        snapped = {}
+        road_nodes = range(len(locations_data), len(node_ids))
+        connector_code = ROAD_TYPE_CODES["other"]
+        connector_speed = self.road_speeds.get("other", self.road_speeds["secondary"])
+        max_degrees = snap_radius_km / 110.0  # A degree of latitude is at least ~110 km
+        for loc_id, loc_data in locations_data.items():
+            best_node, best_distance = None, snap_radius_km
+            for node in road_nodes:
+                # Cheap box check before working out the real distance
+                if abs(lats[node] - loc_data["lat"]) > max_degrees:
+                    continue
+                distance = segment_length_km(loc_data["lat"], loc_data["lng"], lats[node], lngs[node])
+                if distance <= best_distance:
+                    best_node, best_distance = node, distance
+            snapped[loc_id] = node_ids[best_node] if best_node is not None else None
+            if best_node is not None:
+                location = index[loc_id]
+                minutes = best_distance / connector_speed * 60
+                edges.add(location, best_node, best_distance, minutes, connector_code)
+                edges.add(best_node, location, best_distance, minutes, connector_code)
+
+        return edges.to_road_graph(node_ids, lats, lngs), snapped
+
+
+class EdgeArrays:
+    """
+    A growing list of directed edges kept in parallel arrays.
+    """
+
+    def __init__(self):
+        self.sources = array("l")
+        self.targets = array("l")
+        self.distances = array("d")
+        self.times = array("d")
+        self.codes = bytearray()
+
+    def add(self, source, target, distance, time, code):
+        """Adds one directed edge."""
+        self.sources.append(source)
+        self.targets.append(target)
+        self.distances.append(distance)
+        self.times.append(time)
+        self.codes.append(code)
+
+    def to_road_graph(self, node_ids, lats, lngs):
+        """
+        Packs the edges into the CSR arrays used by RoadGraph.
+        Edges are grouped by source node with a counting sort.
+        """
+        node_count = len(node_ids)
+        edge_count = len(self.sources)
+
+        offsets = array("l", [0] * (node_count + 1))
+        for source in self.sources:
+            offsets[source + 1] += 1
+        for node in range(node_count):
+            offsets[node + 1] += offsets[node]
+
+        targets = array("l", [0] * edge_count)
+        distance_weights = array("d", [0.0] * edge_count)
+        time_weights = array("d", [0.0] * edge_count)
+        road_type_codes = bytearray(edge_count)
+
+        next_slot = array("l", offsets[:-1])
+        for edge, source in enumerate(self.sources):
+            slot = next_slot[source]
+            next_slot[source] += 1
+            targets[slot] = self.targets[edge]
+            distance_weights[slot] = self.distances[edge]
+            time_weights[slot] = self.times[edge]
+            road_type_codes[slot] = self.codes[edge]
+
+        return RoadGraph(node_ids, offsets, targets, distance_weights, time_weights,
+                         road_type_codes, lats, lngs)
+
+
+def build_road_network(locations_data, cache_dir="cache", snap_radius_km=DEFAULT_SNAP_RADIUS_KM):
+    """
+    Builds a routable RoadGraph from every Overpass extract in the cache folder.
+
+    locations_data: Dictionary of locations with coordinates
+    cache_dir: Folder containing the saved Overpass API responses
+    snap_radius_km: Furthest a location can be from the road network
+
+    Returns (RoadGraph, dictionary of location ID -> snapped OSM node ID or None)
+    """
+    builder = RoadNetworkBuilder()
+    # Each file is streamed element by element, so only one is being read at a time
+    for filename in sorted(glob.glob(os.path.join(cache_dir, "*.json"))):
+        builder.add_file(filename)
+
+    graph, snapped = builder.build(locations_data, snap_radius_km)
+
+    missing = [loc_id for loc_id, node in snapped.items() if node is None]
+    print(f"Built road network with {graph.node_count} nodes and {graph.edge_count} edges")
+    if missing:
+        print(f"No road within {snap_radius_km} km of: {', '.join(missing)}")
+
+    return graph, snapped
@@ -0,0 +1,191 @@
+"""
+Names: Shanaldo Carty,
+Completion Date: 08/7/2025
+"""
+
+"""
+Streaming reader for Overpass API responses.
+This file reads the "elements" list of a saved Overpass response one element at a
+time, so even very large extracts never have to be loaded into memory all at once.
+"""
+
+import json
+from array import array
+
+# Tags kept for ways and nodes by default. Everything else is dropped while reading.
+DEFAULT_WAY_TAGS = ("highway", "oneway", "maxspeed", "junction", "name")
+DEFAULT_NODE_TAGS = ("name", "place", "amenity")
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = " \t\r\n"
+_DELIMITERS = _WHITESPACE + ",:]}"
+
+
+class _ChunkReader:
+    """
+    Keeps a small window of the file in memory and decodes JSON values from it,
+    reading more of the file only when a value runs past the end of the window.
+    """
+
+    def __init__(self, f, chunk_size):
+        self.f = f
+        self.chunk_size = chunk_size
+        self.buffer = ""
+        self.position = 0
+        self.finished = False
+
+    def fill(self):
+        """Reads the next chunk, dropping the part of the buffer we've already used."""
+        chunk = self.f.read(self.chunk_size)
+        if not chunk:
+            self.finished = True
+        self.buffer = self.buffer[self.position:] + chunk
+        self.position = 0
+
+    def next_char(self):
+        """Skips whitespace and returns the next character without consuming it."""
+        while True:
+            while self.position < len(self.buffer) and self.buffer[self.position] in _WHITESPACE:
+                self.position += 1
+            if self.position < len(self.buffer):
+                return self.buffer[self.position]
+            if self.finished:
+                return ""
+            self.fill()
+
+    def expect(self, characters):
+        """Consumes the next character, which must be one of the given characters."""
+        char = self.next_char()
+        if not char or char not in characters:
+            raise ValueError(f"Expected one of {characters!r} but found {char!r}")
+        self.position += 1
+        return char
+
+    def value(self):
+        """Decodes and consumes the next complete JSON value."""
+        self.next_char()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.buffer, self.position)
+            except json.JSONDecodeError:
+                if self.finished:
+                    raise
+                self.fill()
+                continue
+            # A number cut off by the end of the window (like "0." of "0.6") decodes
+            # fine on its own, so only accept a value once we can see what follows it
+            if not self.finished and (end == len(self.buffer) or self.buffer[end] not in _DELIMITERS):
+                self.fill()
+                continue
+            self.position = end
+            return value
+
+
+def iter_elements(filename, chunk_size=65536):
+    """
+    Yields the items of the top-level "elements" list one at a time.
+
+    Other top-level keys (version, generator, ...) are read and thrown away.
+    Files that aren't Overpass responses (like saved Nominatim results) yield nothing.
+
+    filename: Path to the saved Overpass response
+    chunk_size: Number of characters to read from the file at a time
+    """
+    with open(filename, 'r') as f:
+        reader = _ChunkReader(f, chunk_size)
+        if reader.next_char() != "{":
+            return
+        reader.expect("{")
+
+        if reader.next_char() == "}":
+            return
+
+        while True:
+            key = reader.value()
+            reader.expect(":")
+
+            if key == "elements":
+                reader.expect("[")
+                if reader.next_char() == "]":
+                    reader.expect("]")
+                else:
+                    while True:
+                        yield reader.value()
+                        if reader.expect(",]") == "]":
+                            break
+            else:
+                reader.value()  # Small header value we don't need
+
+            if reader.expect(",}") == "}":
+                return
+
+
+class OverpassArrays:
+    """
+    The nodes and ways of an Overpass response packed into flat arrays.
+
+    Node i has ID node_ids[i] at (lats[i], lngs[i]). The nodes of way j are
+    way_node_refs[way_offsets[j]:way_offsets[j + 1]], and way_tags[j] holds only
+    the tags we asked to keep. node_tags maps the index of the few tagged nodes
+    (like named places) to their kept tags.
+    """
+
+    def __init__(self):
+        self.node_ids = array("q")
+        self.lats = array("d")
+        self.lngs = array("d")
+        self.node_tags = {}
+        self.way_ids = array("q")
+        self.way_offsets = array("l", [0])
+        self.way_node_refs = array("q")
+        self.way_tags = []
+
+    @property
+    def node_count(self):
+        """Number of nodes read."""
+        return len(self.node_ids)
+
+    @property
+    def way_count(self):
+        """Number of ways read."""
+        return len(self.way_ids)
+
+    def way_nodes(self, way):
+        """Returns the node IDs along way number way."""
+        return self.way_node_refs[self.way_offsets[way]:self.way_offsets[way + 1]]
+
+
+def read_overpass_arrays(filename, way_tags=DEFAULT_WAY_TAGS, node_tags=DEFAULT_NODE_TAGS,
+                         chunk_size=65536):
+    """
+    Streams an Overpass response into an OverpassArrays object.
+
+    Only one element is held as a Python dictionary at any time.
+
+    filename: Path to the saved Overpass response
+    way_tags: Way tags to keep
+    node_tags: Node tags to keep
+    chunk_size: Number of characters to read from the file at a time
+    """
+    result = OverpassArrays()
+
+    for element in iter_elements(filename, chunk_size):
+        element_type = element.get("type")
+        tags = element.get("tags")
+
+        if element_type == "node":
+            if tags:
+                kept = {key: tags[key] for key in node_tags if key in tags}
+                if kept:
+                    result.node_tags[len(result.node_ids)] = kept
+            result.node_ids.append(element["id"])
+            result.lats.append(element["lat"])
+            result.lngs.append(element["lon"])
+
+        elif element_type == "way":
+            result.way_ids.append(element["id"])
+            result.way_node_refs.extend(element.get("nodes", []))
+            result.way_offsets.append(len(result.way_node_refs))
+            result.way_tags.append({key: tags[key] for key in way_tags if key in tags} if tags else {})
+
+    return result
@@ -0,0 +1,229 @@
+"""
+Names: Shanaldo Carty,
+Completion Date: 08/7/2025
+"""
+
+"""
+Compact road graph used by the routing algorithms.
+This file turns our location IDs into numbered nodes and stores the roads between
+them in flat arrays, so searches don't have to build big dictionaries every time.
+"""
+
+from array import array
+from bisect import bisect_right
+
+# Road types we know about. The position of each type in this tuple is the
+# one-byte code stored for every edge in the graph.
+ROAD_TYPES = ("highway", "primary", "secondary", "tertiary", "other")
+ROAD_TYPE_CODES = {road_type: code for code, road_type in enumerate(ROAD_TYPES)}
+
+
+class RoadGraph:
+    """
+    A directed road graph stored in CSR (compressed sparse row) form.
+
+    Every location ID is mapped to a dense integer once. The roads leaving node i
+    are the edges offsets[i] up to offsets[i + 1], and each edge has a target node,
+    a distance (km), a travel time (minutes) and a road type code.
+    """
+
+    def __init__(self, node_ids, offsets, targets, distance_weights, time_weights,
+                 road_type_codes, lats=None, lngs=None):
+        """
+        Sets up the graph from already-built arrays.
+
+        node_ids: List of location IDs, where the position is the node number
+        offsets: array of length V + 1 with the first edge of every node
+                 (array module arrays, or memoryviews of memory-mapped ones)
+        targets: array with the target node of every edge
+        distance_weights: array with the length of every edge in kilometers
+        time_weights: array with the travel time of every edge in minutes
+        road_type_codes: bytes-like array with the road type code of every edge
+        lats, lngs: Optional arrays with the coordinates of every node
+        """
+        self.node_ids = list(node_ids)
+        self.index = {node_id: i for i, node_id in enumerate(self.node_ids)}
+        self.offsets = offsets
+        self.targets = targets
+        self.distance_weights = distance_weights
+        self.time_weights = time_weights
+        self.road_type_codes = road_type_codes
+        self.lats = lats if lats is not None else array("d", [0.0] * len(self.node_ids))
+        self.lngs = lngs if lngs is not None else array("d", [0.0] * len(self.node_ids))
+        # Roads coming into every node, built the first time a search goes backwards
+        self.incoming_arrays = None
+
+    @classmethod
+    def from_distance_matrix(cls, distance_matrix, locations_data, classify_road_type, road_type_table=None):
+        """
+        Builds a graph from our nested distance/time matrix.
+
+        distance_matrix: Dictionary with "distances" and "times" nested dictionaries
+        locations_data: Dictionary of locations with coordinates
+        classify_road_type: Function (source, destination) -> road type name
+        road_type_table: Optional RoadTypeTable that classify_road_type looks roads up in,
+                         so binary matrices can classify every road at once
+
+        Returns a RoadGraph with one edge for every entry in the matrix
+        """
+        if hasattr(distance_matrix, "distance_array"):
+            # Binary matrices already hold dense arrays, so skip the dictionary views
+            return cls.from_arrays(distance_matrix.ids, distance_matrix.distance_array,
+                                   distance_matrix.time_array, locations_data, classify_road_type,
+                                   road_type_table, getattr(distance_matrix, "csr", None))
+
+        distances = distance_matrix["distances"]
+        times = distance_matrix["times"]
+
+        # Number the nodes in the same order as the locations database
+        node_ids = list(locations_data)
+        for node_id in distances:
+            if node_id not in locations_data:
+                node_ids.append(node_id)
+        index = {node_id: i for i, node_id in enumerate(node_ids)}
+
+        offsets = array("l", [0])
+        targets = array("l")
+        distance_weights = array("d")
+        time_weights = array("d")
+        road_type_codes = bytearray()
+
+        for node_id in node_ids:
+            for neighbor, distance in distances.get(node_id, {}).items():
+                targets.append(index[neighbor])
+                distance_weights.append(distance)
+                time_weights.append(times[node_id][neighbor])
+                road_type = classify_road_type(node_id, neighbor)
+                road_type_codes.append(ROAD_TYPE_CODES.get(road_type, ROAD_TYPE_CODES["other"]))
+            offsets.append(len(targets))
+
+        lats = array("d", (locations_data.get(node_id, {}).get("lat", 0.0) for node_id in node_ids))
+        lngs = array("d", (locations_data.get(node_id, {}).get("lng", 0.0) for node_id in node_ids))
+
+        return cls(node_ids, offsets, targets, distance_weights, time_weights,
+                   road_type_codes, lats, lngs)
+
+    @classmethod
+    def from_arrays(cls, node_ids, distance_array, time_array, locations_data, classify_road_type,
+                    road_type_table=None, csr=None):
+        """
+        Builds a graph from dense N x N distance and time arrays.
+
+        Entries that are NaN (like a location to itself) are not turned into edges.
+
+        node_ids: List of location IDs in row/column order
+        distance_array, time_array: N x N NumPy arrays
+        locations_data: Dictionary of locations with coordinates
+        classify_road_type: Function (source, destination) -> road type name
+        road_type_table: Optional RoadTypeTable to classify every road with one code_matrix call
+        csr: Optional (offsets, targets, distances, times) arrays already in CSR form,
+             like the memory-mapped ones saved in a binary matrix file
+        """
+        import numpy as np
+
+        node_ids = list(node_ids)
+        present = ~np.isnan(distance_array)
+
+        if csr is not None:
+            # memoryviews index like the array module (plain Python ints and floats)
+            # but read straight from the memory-mapped file, so every server process
+            # shares the same pages and nothing is copied at startup
+            offsets, targets, distance_weights, time_weights = (memoryview(values) for values in csr)
+        else:
+            rows, columns = np.nonzero(present)
+            offsets = array("l", np.concatenate(([0], np.cumsum(present.sum(axis=1)))).tolist())
+            targets = array("l", columns.tolist())
+            distance_weights = array("d", np.asarray(distance_array[rows, columns], dtype=np.float64).tolist())
+            time_weights = array("d", np.asarray(time_array[rows, columns], dtype=np.float64).tolist())
+
+        if road_type_table is not None:
+            # One vectorized pass over the whole matrix, in the same row order as the edges
+            road_type_codes = bytearray(road_type_table.code_matrix(node_ids)[present].tobytes())
+        else:
+            rows, columns = np.nonzero(present)
+            road_type_codes = bytearray(
+                ROAD_TYPE_CODES.get(classify_road_type(node_ids[row], node_ids[column]), ROAD_TYPE_CODES["other"])
+                for row, column in zip(rows.tolist(), columns.tolist())
+            )
+
+        lats = array("d", (locations_data.get(node_id, {}).get("lat", 0.0) for node_id in node_ids))
+        lngs = array("d", (locations_data.get(node_id, {}).get("lng", 0.0) for node_id in node_ids))
+
+        return cls(node_ids, offsets, targets, distance_weights, time_weights,
+                   road_type_codes, lats, lngs)
+
+    @property
+    def node_count(self):
+        """Number of nodes in the graph."""
+        return len(self.node_ids)
+
+    @property
+    def edge_count(self):
+        """Number of directed edges in the graph."""
+        return len(self.targets)
+
+    def weights(self, optimize_for="distance"):
+        """
+        Returns the edge weight array for the chosen optimization.
+
+        optimize_for: "distance" for kilometers, anything else for minutes
+        """
+        return self.distance_weights if optimize_for == "distance" else self.time_weights
+
+    def edges(self, node):
+        """Returns the range of edge numbers leaving the given node number."""
+        return range(self.offsets[node], self.offsets[node + 1])
+
+    def edge_source(self, edge):
+        """Returns the node number an edge starts from (binary search over offsets)."""
+        return bisect_right(self.offsets, edge) - 1
+
+    def incoming(self):
+        """
+        Returns (offsets, edges, sources) describing the roads coming into every node.
+
+        The roads arriving at node i are edges[offsets[i]] up to edges[offsets[i + 1]]
+        (edge numbers in this graph), and sources[k] is the node edges[k] starts from.
+        """
+        if self.incoming_arrays is None:
+            node_count = self.node_count
+            # Counting sort of the edges by target node
+            offsets = array("l", [0] * (node_count + 1))
+            for target in self.targets:
+                offsets[target + 1] += 1
+            for node in range(node_count):
+                offsets[node + 1] += offsets[node]
+
+            edges = array("l", [0] * self.edge_count)
+            sources = array("l", [0] * self.edge_count)
+            position = array("l", offsets[:-1])
+            for source in range(node_count):
+                for edge in range(self.offsets[source], self.offsets[source + 1]):
+                    target = self.targets[edge]
+                    edges[position[target]] = edge
+                    sources[position[target]] = source
+                    position[target] += 1
+            self.incoming_arrays = (offsets, edges, sources)
+        return self.incoming_arrays
+
+    def neighbors(self, node_id):
+        """Returns the location IDs that can be reached directly from node_id."""
+        node = self.index[node_id]
+        return [self.node_ids[self.targets[edge]] for edge in self.edges(node)]
+
+    def road_type(self, edge):
+        """Returns the road type name of an edge."""
+        return ROAD_TYPES[self.road_type_codes[edge]]
+
+    def blocked_road_types(self, avoided_types):
+        """
+        Turns a list of road type names into a lookup table indexed by road type code.
+
+        The search loops can then check blocked[code] instead of comparing strings.
+        Names we don't store in the graph (like "toll") are ignored.
+        """
+        blocked = bytearray(len(ROAD_TYPES))
+        for road_type in avoided_types:
+            if road_type in ROAD_TYPE_CODES:
+                blocked[ROAD_TYPE_CODES[road_type]] = 1
+        return blocked
@@ -0,0 +1,116 @@
+"""
+Names: Shanaldo Carty,
+Completion Date: 08/7/2025
+"""
+
+"""
+Road type lookup tables for the Jamaica Route Finder project.
+This file loads the known roads from road_types.json once and turns them into
+a lookup table, so classifying a road is a single dictionary lookup.
+"""
+
+import json
+
+from road_graph import ROAD_TYPE_CODES
+
+# Tables we have already loaded, keyed by (filename, table name)
+_loaded_tables = {}
+
+
+class RoadTypeTable:
+    """
+    A compiled set of road classifications.
+
+    Roads are stored under a canonical (order-independent) pair of location IDs,
+    so A -> B and B -> A share one entry. Areas (like the university area) give a
+    road type to any road with both ends inside the area.
+    """
+
+    def __init__(self, roads, areas=None, default="primary", priority=None):
+        """
+        Compiles the road lists into lookup tables.
+
+        roads: Dictionary of road type -> list of [location, location] pairs
+        areas: Dictionary of road type -> list of location IDs in that area
+        default: Road type to use when nothing else matches
+        priority: Order to apply road types in when a pair is listed more than once
+        """
+        self.default = default
+        self.pairs = {}
+        for road_type in (priority or []) + [t for t in roads if t not in (priority or [])]:
+            for start, end in roads.get(road_type, []):
+                # The first (highest priority) road type listed for a pair wins
+                self.pairs.setdefault(frozenset((start, end)), road_type)
+
+        self.areas = [(road_type, frozenset(members)) for road_type, members in (areas or {}).items()]
+
+    @classmethod
+    def from_file(cls, table="routing", filename="road_types.json"):
+        """
+        Loads one table (for example "routing" or "matrix") from the data file.
+        """
+        with open(filename, 'r') as f:
+            data = json.load(f)[table]
+        return cls(data.get("roads", {}), data.get("areas"), data.get("default", "primary"),
+                   data.get("priority"))
+
+    def classify(self, source, destination):
+        """
+        Returns the road type between two locations.
+
+        source: Starting location ID
+        destination: Ending location ID
+        """
+        road_type = self.pairs.get(frozenset((source, destination)))
+        if road_type is not None:
+            return road_type
+
+        for area_type, members in self.areas:
+            if source in members and destination in members:
+                return area_type
+
+        return self.default
+
+    def code(self, source, destination):
+        """
+        Returns the one-byte road type code used by RoadGraph for this road.
+        """
+        return ROAD_TYPE_CODES.get(self.classify(source, destination), ROAD_TYPE_CODES["other"])
+
+    def code_matrix(self, location_ids):
+        """
+        Builds an N x N NumPy array of road type codes for a list of locations.
+
+        Area rules are applied with one boolean mask each, then the listed roads
+        are written on top, so no pair of locations is classified in a Python loop.
+        """
+        import numpy as np
+
+        ids = list(location_ids)
+        index = {loc_id: i for i, loc_id in enumerate(ids)}
+        default_code = ROAD_TYPE_CODES.get(self.default, ROAD_TYPE_CODES["other"])
+        codes = np.full((len(ids), len(ids)), default_code, dtype=np.uint8)
+
+        # Earlier areas win, so paint them last
+        for area_type, members in reversed(self.areas):
+            inside = np.array([loc_id in members for loc_id in ids], dtype=bool)
+            codes[np.outer(inside, inside)] = ROAD_TYPE_CODES.get(area_type, ROAD_TYPE_CODES["other"])
+
+        for pair, road_type in self.pairs.items():
+            if len(pair) == 2 and all(loc_id in index for loc_id in pair):
+                start, end = (index[loc_id] for loc_id in pair)
+                code = ROAD_TYPE_CODES.get(road_type, ROAD_TYPE_CODES["other"])
+                codes[start, end] = code
+                codes[end, start] = code
+
+        return codes
+
+
+def load_road_type_table(table="routing", filename="road_types.json"):
+    """
+    Returns the compiled road type table, loading the data file the first time only.
+    """
+    key = (filename, table)
+    if key not in _loaded_tables:
+        _loaded_tables[key] = RoadTypeTable.from_file(table, filename)
+    return _loaded_tables[key]
@@ -11,10 +11,12 @@ which is a professional routing service.
 
 import time
 import json
-import geopy.distance
+from concurrent.futures import wait
 import numpy as np
 from tabulate import tabulate
+from geometry import point_to_segment_distance
 from route_waypoints import find_intermediate_locations
+from waypoint_table import WaypointTable
 
 class RouteComparison:
     """
@@ -24,18 +26,54 @@ class RouteComparison:
     we can validate our approach and provide users with confidence in the routes.
     """
     
-    def __init__(self, algorithms, ors_adapter):
+    def __init__(self, algorithms, ors_adapter, executor=None, ors_timeout=20):
         """
         Sets up the comparison tool with our algorithms and an ORS adapter.
         
         algorithms: Instance of RouteAlgorithms with our custom algorithms
         ors_adapter: Instance of ORSAdapter to access OpenRouteService
+        executor: Optional shared thread pool, so the ORS requests can run at the same time
+        ors_timeout: Seconds to wait for the ORS requests before giving up on them
         """
         self.algorithms = algorithms
         self.ors_adapter = ors_adapter
         self.locations = algorithms.locations
+        self.executor = executor
+        self.ors_timeout = ors_timeout
+        # Ranked detour waypoints, worked out per source the first time they are needed
+        self.waypoint_table = WaypointTable(self.locations)
     
-    def compare_routes(self, source, destination, preference="fastest", avoid_options=None):
+    def run_ors_requests(self, requests):
+        """
+        Runs independent ORS requests, at the same time if we have a thread pool.
+        
+        Every request shares one deadline, so the whole batch takes about as long as
+        the slowest request. A request that fails or isn't finished in time gets an
+        error dictionary instead, and the other results are still returned.
+        
+        requests: Dictionary of name -> (function, list of arguments)
+        
+        Returns a dictionary of name -> result
+        """
+        if self.executor is None:
+            return {name: function(*args) for name, (function, args) in requests.items()}
+        
+        futures = {name: self.executor.submit(function, *args) for name, (function, args) in requests.items()}
+        wait(futures.values(), timeout=self.ors_timeout)
+        
+        results = {}
+        for name, future in futures.items():
+            if not future.done():
+                future.cancel()  # Only stops it if it hasn't started yet
+                results[name] = {"error": f"ORS API request timed out after {self.ors_timeout} seconds"}
+                continue
+            try:
+                results[name] = future.result()
+            except Exception as e:
+                results[name] = {"error": f"ORS API request failed: {str(e)}"}
+        return results
+    
+    def compare_routes(self, source, destination, preference="fastest", avoid_options=None, our_result=None):
         """
         Compares routes from our algorithm and OpenRouteService.
         
@@ -46,21 +84,25 @@ class RouteComparison:
         destination: Ending location ID
         preference: 'fastest' or 'shortest'
         avoid_options: Dictionary of options to avoid (like highways or tolls)
+        our_result: Best route if the caller already calculated it (saves running the search again)
         """
-        # Start timing for performance measurement
-        start_time = time.time()
-        
-        # Run our algorithm for the best route
-        if preference == "fastest":
-            our_result = self.algorithms.find_fastest_route(source, destination, avoid_options)
-        else:
-            our_result = self.algorithms.find_shortest_route(source, destination, preference, avoid_options)
+        if our_result is None:
+            # Start timing for performance measurement
+            start_time = time.time()
             
-        our_execution_time = (time.time() - start_time) * 1000  # in milliseconds
+            # Run our algorithm for the best route
+            if preference == "fastest":
+                our_result = self.algorithms.find_fastest_route(source, destination, avoid_options)
+            else:
+                our_result = self.algorithms.find_shortest_route(source, destination, preference, avoid_options)
+                
+            our_execution_time = (time.time() - start_time) * 1000  # in milliseconds
+        else:
+            our_execution_time = our_result.get("execution_time_ms", 0)
         
         # Get alternative route that's genuinely different
         # This gives users options if they don't like the primary route
-        alt_result = self.find_alternative_route(source, destination, preference, avoid_options)
+        alt_result = self.find_alternative_route(source, destination, preference, avoid_options, our_result)
         
         # Convert algorithm paths to coordinates for visualization
         best_route_points = []
@@ -103,30 +145,26 @@ class RouteComparison:
         source_name = self.locations[source]["display_name"]
         dest_name = self.locations[destination]["display_name"]
         
-        # 1. Get ORS visualization of our algorithm's path (for map display)
-        # This follows our exact path but uses ORS data for visualization
-        best_ors_visual = self.ors_adapter.get_route_for_visualization(best_route_points, preference, avoid_options)
-        alt_ors_visual = self.ors_adapter.get_route_for_visualization(alt_route_points, "shortest" if preference == "fastest" else "fastest", avoid_options)
-        
-        # 2. Get direct ORS routes using their native algorithm
-        # This is what a professional service would calculate
-        best_ors_direct = self.ors_adapter.get_direct_route(
-            source_coords, 
-            dest_coords,
-            source_name,
-            dest_name,
-            preference, 
-            avoid_options
-        )
-        
-        alt_ors_direct = self.ors_adapter.get_direct_route(
-            source_coords, 
-            dest_coords,
-            source_name,
-            dest_name,
-            "shortest" if preference == "fastest" else "fastest", 
-            avoid_options
-        )
+        # The four ORS requests don't depend on each other, so they are sent together
+        alt_preference = "shortest" if preference == "fastest" else "fastest"
+        ors_results = self.run_ors_requests({
+            # 1. Get ORS visualization of our algorithm's path (for map display)
+            # This follows our exact path but uses ORS data for visualization
+            "best_visual": (self.ors_adapter.get_route_for_visualization,
+                            [best_route_points, preference, avoid_options]),
+            "alt_visual": (self.ors_adapter.get_route_for_visualization,
+                           [alt_route_points, alt_preference, avoid_options]),
+            # 2. Get direct ORS routes using their native algorithm
+            # This is what a professional service would calculate
+            "best_direct": (self.ors_adapter.get_direct_route,
+                            [source_coords, dest_coords, source_name, dest_name, preference, avoid_options]),
+            "alt_direct": (self.ors_adapter.get_direct_route,
+                           [source_coords, dest_coords, source_name, dest_name, alt_preference, avoid_options]),
+        })
+        best_ors_visual = ors_results["best_visual"]
+        alt_ors_visual = ors_results["alt_visual"]
+        best_ors_direct = ors_results["best_direct"]
+        alt_ors_direct = ors_results["alt_direct"]
         
         # Add detailed routes to ORS results for visualization
         if "detailed_route" in our_result:
@@ -198,12 +236,15 @@ class RouteComparison:
         
         return comparison
     
-    def find_alternative_route(self, source, destination, original_preference, original_avoid_options=None):
+    def find_alternative_route(self, source, destination, original_preference, original_avoid_options=None,
+                               original_route=None):
         """
         Finds a genuinely different alternative route that's still reasonably efficient.
         
         Instead of just providing two similar routes, this tries to find a meaningfully
         different route that users might prefer for various reasons.
+        
+        original_route: The best route if it has already been calculated
         """
         # Handle special cases for routes involving Spanish Town
         if source == "spanish_town" or destination == "spanish_town":
@@ -225,11 +266,12 @@ class RouteComparison:
         
         # Regular algorithm for non-Spanish Town and non-Old Harbour routes
         
-        # Get the original route first
-        if original_preference == "fastest":
-            original_route = self.algorithms.find_fastest_route(source, destination, original_avoid_options)
-        else:
-            original_route = self.algorithms.find_shortest_route(source, destination, original_preference, original_avoid_options)
+        # Get the original route first (unless we were given it)
+        if original_route is None:
+            if original_preference == "fastest":
+                original_route = self.algorithms.find_fastest_route(source, destination, original_avoid_options)
+            else:
+                original_route = self.algorithms.find_shortest_route(source, destination, original_preference, original_avoid_options)
         
         # Get the original path nodes
         original_path = set(original_route["path"])
@@ -245,10 +287,14 @@ class RouteComparison:
             avoid_options["highways"] = True
         
         # Try the opposite preference with modified constraints
+        # Dijkstra searches from the source are kept as one shortest-path tree, so the
+        # waypoint segment below can be read from the same search
+        source_tree = None
         if alt_preference == "fastest":
             alt_result = self.algorithms.find_fastest_route(source, destination, avoid_options)
         else:
-            alt_result = self.algorithms.find_shortest_route(source, destination, alt_preference, avoid_options)
+            source_tree = self.algorithms.shortest_path_tree(source, alt_preference, avoid_options, targets=[destination])
+            alt_result = source_tree.route_to(destination)
         
         # Check if the paths are different enough
         alt_path = set(alt_result["path"])
@@ -260,20 +306,9 @@ class RouteComparison:
             waypoint = self.find_suitable_waypoint(source, destination, original_path)
             
             if waypoint:
-                # Make sure the waypoint is in a reasonable direction
-                source_coords = (self.locations[source]["lat"], self.locations[source]["lng"])
-                dest_coords = (self.locations[destination]["lat"], self.locations[destination]["lng"]) 
-                waypoint_coords = (self.locations[waypoint]["lat"], self.locations[waypoint]["lng"])
-                
-                # Check if waypoint is not taking us too far out of the way
-                direct_distance = geopy.distance.geodesic(source_coords, dest_coords).kilometers
-                via_waypoint_distance = (
-                    geopy.distance.geodesic(source_coords, waypoint_coords).kilometers +
-                    geopy.distance.geodesic(waypoint_coords, dest_coords).kilometers
-                )
-                
-                # Only use waypoint if the detour is not more than 50% longer than direct route
-                if via_waypoint_distance <= direct_distance * 1.5:
+                # Make sure the waypoint is in a reasonable direction:
+                # only use it if the detour is not more than 50% longer than the direct route
+                if self.waypoint_table.detour_factor(source, waypoint, destination) <= 1.5:
                     print(f"Using {waypoint} as intermediate waypoint")
                     # Route through this waypoint
                     # First segment: source to waypoint
@@ -281,7 +316,7 @@ class RouteComparison:
                     if alt_preference == "fastest":
                         first_segment = self.algorithms.find_fastest_route(source, waypoint, avoid_options)
                     else:
-                        first_segment = self.algorithms.find_shortest_route(source, waypoint, alt_preference, avoid_options)
+                        first_segment = source_tree.route_to(waypoint)
                     
                     # Second segment: waypoint to destination
                     second_segment = None
@@ -325,16 +360,22 @@ class RouteComparison:
         # Pick the first available intermediate point for this location
         waypoints = intermediate_points.get(other_end, ["cross_roads"])
         
+        # Every first segment starts at the same place, so one search from there covers
+        # all the waypoints we might try (it only runs as far as each waypoint we ask about)
+        start = other_end if spanish_town_end == "spanish_town" else "spanish_town"
+        first_segments = self.algorithms.shortest_path_tree(start, "distance", avoid_options, targets=[])
+        
         # Try each possible waypoint
         for waypoint in waypoints:
+            if waypoint not in self.locations:
+                continue  # Not one of our locations (the table above has a typo or two)
+            first_segment = first_segments.route_to(waypoint)
             # Determine direction based on which end is Spanish Town
             if spanish_town_end == "spanish_town":
                 # Route: other_end -> waypoint -> spanish_town
-                first_segment = self.algorithms.find_shortest_route(other_end, waypoint, "distance", avoid_options)
                 second_segment = self.algorithms.find_shortest_route(waypoint, "spanish_town", "distance", avoid_options)
             else:
                 # Route: spanish_town -> waypoint -> other_end
-                first_segment = self.algorithms.find_shortest_route("spanish_town", waypoint, "distance", avoid_options)
                 second_segment = self.algorithms.find_shortest_route(waypoint, other_end, "distance", avoid_options)
             
             # Combine the segments if both succeeded
@@ -383,16 +424,22 @@ class RouteComparison:
         # Pick the first available intermediate point for this location
         waypoints = intermediate_points.get(other_end, ["halfway_tree"])
         
+        # Every first segment starts at the same place, so one search from there covers
+        # all the waypoints we might try (it only runs as far as each waypoint we ask about)
+        start = other_end if old_harbour_end == "old_harbour" else "old_harbour"
+        first_segments = self.algorithms.shortest_path_tree(start, "distance", avoid_options, targets=[])
+        
         # Try each possible waypoint
         for waypoint in waypoints:
+            if waypoint not in self.locations:
+                continue  # Not one of our locations (the table above has a typo or two)
+            first_segment = first_segments.route_to(waypoint)
             # Determine direction based on which end is Old Harbour
             if old_harbour_end == "old_harbour":
                 # Route: other_end -> waypoint -> old_harbour
-                first_segment = self.algorithms.find_shortest_route(other_end, waypoint, "distance", avoid_options)
                 second_segment = self.algorithms.find_shortest_route(waypoint, "old_harbour", "distance", avoid_options)
             else:
                 # Route: old_harbour -> waypoint -> other_end
-                first_segment = self.algorithms.find_shortest_route("old_harbour", waypoint, "distance", avoid_options)
                 second_segment = self.algorithms.find_shortest_route(waypoint, other_end, "distance", avoid_options)
             
             # Combine the segments if both succeeded
@@ -420,127 +467,32 @@ class RouteComparison:
         This helps us create alternate routes that pass through different areas
         while still being reasonably efficient.
         """
-        # Convert to set for quicker lookups
-        original_path_set = set(original_path)
-        
-        # Get source and destination coordinates
-        source_coords = (self.locations[source]["lat"], self.locations[source]["lng"])
-        dest_coords = (self.locations[destination]["lat"], self.locations[destination]["lng"])
-        
-        # Calculate the direct distance from source to destination
-        direct_distance = geopy.distance.geodesic(source_coords, dest_coords).kilometers
-        
-        # Find a location that's not on the path but still a reasonable detour
-        candidates = []
-        
-        for loc_id, loc_data in self.locations.items():
-            # Skip if it's the source, destination, or on the original path
-            if loc_id == source or loc_id == destination or loc_id in original_path_set:
-                continue
-            
-            # Special case: for Halfway Tree to Spanish Town, let's blacklist New Kingston
-            if ((source == "halfway_tree" and destination == "spanish_town") or 
-                (source == "spanish_town" and destination == "halfway_tree")) and loc_id == "new_kingston":
-                continue
-                
-            # Get coordinates
-            loc_coords = (loc_data["lat"], loc_data["lng"])
-            
-            # Calculate distances
-            distance_from_source = geopy.distance.geodesic(source_coords, loc_coords).kilometers
-            distance_from_dest = geopy.distance.geodesic(loc_coords, dest_coords).kilometers
-            
-            # Skip if too close to source or destination
-            # (No point in having a waypoint right next to start or end)
-            if distance_from_source < 1.0 or distance_from_dest < 1.0:
-                continue
-            
-            # Calculate how far off the direct path this point is
-            detour_distance = distance_from_source + distance_from_dest
-            detour_factor = detour_distance / direct_distance if direct_distance > 0 else float('inf')
-            
-            # Distance from straight line between source and destination
-            perpendicular_distance = self.point_to_line_distance(
-                loc_coords, source_coords, dest_coords
-            )
-            
-            # Consider points that aren't too far off the direct path
-            # but are still different enough to create an alternative route
-            if detour_factor < 1.4 and perpendicular_distance < 10:
-                candidates.append((loc_id, perpendicular_distance, detour_factor))
-        
-        # Sort by a balance of perpendicular distance and detour factor
-        # We want points that are different enough but not creating huge detours
-        candidates.sort(key=lambda x: x[1] * 0.5 + x[2] * 5)
-        
-        # Return the best candidate, if any
-        if candidates:
-            return candidates[0][0]
+        candidates = self.find_all_suitable_waypoints(source, destination, original_path, max_count=1)
         
-        # If no suitable waypoint found, return None
-        return None
+        # Return the best candidate, if any (None if no suitable waypoint was found)
+        return candidates[0] if candidates else None
     
     def find_all_suitable_waypoints(self, source, destination, original_path, max_count=3):
         """
         Finds multiple locations that are not on the original path and make reasonable detours.
         Returns up to max_count waypoints sorted by suitability.
         
-        This extends find_suitable_waypoint to return multiple options.
+        Candidates are looked up in the waypoint table: locations at least 1 km from
+        both ends, less than 10 km off the straight line between them, and making a
+        detour of less than 1.4 times the direct distance, ranked by a balance of the two.
         """
-        # Convert to set for quicker lookups
-        original_path_set = set(original_path)
+        # Pick up any locations added since the table was built
+        self.waypoint_table.sync(self.locations)
         
-        # Get source and destination coordinates
-        source_coords = (self.locations[source]["lat"], self.locations[source]["lng"])
-        dest_coords = (self.locations[destination]["lat"], self.locations[destination]["lng"])
+        # Skip the source, destination and anything on the original path
+        excluded = set(original_path) | {source, destination}
         
-        # Calculate the direct heading from source to destination
-        direct_distance = geopy.distance.geodesic(source_coords, dest_coords).kilometers
-        
-        # Find locations that are not on the path but still reasonable detours
-        candidates = []
-        
-        for loc_id, loc_data in self.locations.items():
-            # Skip if it's the source, destination, or on the original path
-            if loc_id == source or loc_id == destination or loc_id in original_path_set:
-                continue
-            
-            # Special case: for Halfway Tree to Spanish Town, let's blacklist New Kingston
-            if (source == "halfway_tree" and destination == "spanish_town" or 
-                source == "spanish_town" and destination == "halfway_tree") and loc_id == "new_kingston":
-                continue
-                
-            # Get coordinates
-            loc_coords = (loc_data["lat"], loc_data["lng"])
-            
-            # Calculate distances
-            distance_from_source = geopy.distance.geodesic(source_coords, loc_coords).kilometers
-            distance_from_dest = geopy.distance.geodesic(loc_coords, dest_coords).kilometers
-            
-            # Skip if too close to source or destination
-            if distance_from_source < 1.0 or distance_from_dest < 1.0:
-                continue
-            
-            # Calculate how far off the direct path this point is
-            detour_distance = distance_from_source + distance_from_dest
-            detour_factor = detour_distance / direct_distance if direct_distance > 0 else float('inf')
-            
-            # Distance from straight line between source and destination
-            perpendicular_distance = self.point_to_line_distance(
-                loc_coords, source_coords, dest_coords
-            )
-            
-            # Consider points that aren't too far off the direct path
-            # but are still different enough to create an alternative route
-            if detour_factor < 1.4 and perpendicular_distance < 10:
-                candidates.append((loc_id, perpendicular_distance, detour_factor))
-        
-        # Sort by a balance of perpendicular distance and detour factor
-        # We want points that are different enough but not creating huge detours
-        candidates.sort(key=lambda x: x[1] * 0.5 + x[2] * 5)
+        # Special case: for Halfway Tree to Spanish Town, let's blacklist New Kingston
+        if {source, destination} == {"halfway_tree", "spanish_town"}:
+            excluded.add("new_kingston")
         
         # Return the top candidates
-        return [c[0] for c in candidates[:max_count]]
+        return self.waypoint_table.ranked_candidates(source, destination, excluded, limit=max_count)
     
     def combine_route_segments(self, first_segment, second_segment):
         """
@@ -590,38 +542,4 @@ class RouteComparison:
         This geometric calculation helps determine how far a location is from
         the straight-line path between source and destination.
         """
-        from numpy import array, sum, sqrt
-        
-        # Convert to arrays for vector calculations
-        point = array([point[0], point[1]])
-        line_start = array([line_start[0], line_start[1]])
-        line_end = array([line_end[0], line_end[1]])
-        
-        # Line vector (from start to end)
-        line_vec = line_end - line_start
-        
-        # Vector from line start to point
-        point_vec = point - line_start
-        
-        # Calculate projection
-        line_len = sum(line_vec * line_vec)
-        if line_len == 0:  # Line is actually a point
-            return geopy.distance.geodesic(point, line_start).kilometers
-        
-        # Calculate projection distance along line
-        # This is the position along the line closest to our point
-        proj = sum(point_vec * line_vec) / line_len
-        
-        # Clip projection to line segment
-        if proj < 0:
-            closest = line_start
-        elif proj > 1:
-            closest = line_end
-        else:
-            closest = line_start + proj * line_vec
-        
-        # Convert back to geographic coordinates and calculate distance
-        closest_coords = (closest[0], closest[1])
-        point_coords = (point[0], point[1])
-        
-        return geopy.distance.geodesic(point_coords, closest_coords).kilometers
\ No newline at end of file
+        return point_to_segment_distance(point, line_start, line_end)
\ No newline at end of file
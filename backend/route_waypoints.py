@@ -8,9 +8,40 @@ Route waypoints module for identifying intermediate locations along a route.
 This file helps identify which known locations a route passes through or near.
 """
 
-import geopy.distance
+import math
+import threading
+
 import numpy as np
 
+from geometry import closest_point_fraction, point_segment_distances, point_to_segment_distance, segment_lengths
+from heuristics import EARTH_MIN_RADIUS_KM
+from spatial_index import GridIndex
+
+# Grid indexes over the location dictionaries we've been given, keyed by id()
+_location_grids = {}
+_location_grids_lock = threading.Lock()
+
+# Most (location, segment) pairs measured at once, so long routes don't need huge arrays
+MAX_PAIRS_PER_BATCH = 250000
+
+def get_location_grid(all_locations):
+    """
+    Returns (list of location IDs, GridIndex over their coordinates) for a locations dictionary.
+
+    The grid is built once per dictionary and rebuilt if locations are added or removed.
+    Point i of the grid is location ids[i].
+    """
+    with _location_grids_lock:
+        entry = _location_grids.get(id(all_locations))
+        # Keeping the dictionary in the entry stops its id() being reused by another one
+        if entry is None or entry[0] is not all_locations or len(entry[1]) != len(all_locations):
+            ids = list(all_locations)
+            grid = GridIndex([all_locations[loc_id]["lat"] for loc_id in ids],
+                             [all_locations[loc_id]["lng"] for loc_id in ids])
+            entry = (all_locations, ids, grid)
+            _location_grids[id(all_locations)] = entry
+        return entry[1], entry[2]
+
 def find_intermediate_locations(route_coordinates, all_locations, source_id=None, destination_id=None, threshold_km=0.5):
     """
     Finds known locations that are along or near a route path.
@@ -20,6 +51,10 @@ def find_intermediate_locations(route_coordinates, all_locations, source_id=None
     through or near, so we can tell the user something like "Your route goes
     through Halfway Tree and Cross Roads."
     
+    Only locations in grid cells overlapping the route's bounding box (grown by
+    threshold_km) are looked at, and each batch of them is measured against every
+    segment of the route at once with NumPy.
+    
     Args:
         route_coordinates: List of [lat, lng] pairs that define the route
         all_locations: Dictionary of all known locations and their coordinates
@@ -44,53 +79,53 @@ def find_intermediate_locations(route_coordinates, all_locations, source_id=None
     if destination_id and destination_id in all_locations:
         destination_name = all_locations[destination_id].get("display_name", destination_id)
     
-    # Calculate the total route distance to track progress
-    total_route_distance = 0
-    for i in range(len(route_coordinates) - 1):
-        point1 = (route_coordinates[i][0], route_coordinates[i][1])
-        point2 = (route_coordinates[i+1][0], route_coordinates[i+1][1])
-        segment_distance = geopy.distance.geodesic(point1, point2).kilometers
-        total_route_distance += segment_distance
+    # Route segments as arrays: segment i runs from starts[i] to ends[i]
+    route = np.array([point[:2] for point in route_coordinates], dtype=np.float64)
+    starts, ends = route[:-1], route[1:]
+    # Every batch is measured on the same flat map, centred on the route
+    origin_lat = float(np.mean(route[:, 0]))
+    
+    # Length of each segment and the distance along the route where it starts, to track progress
+    segment_km = segment_lengths(starts, ends, origin_lat)
+    distance_before = np.concatenate(([0.0], np.cumsum(segment_km)[:-1]))
+    total_route_distance = float(np.sum(segment_km)) or 1.0
+    
+    # Only locations near the route's bounding box can be within threshold_km of it
+    location_ids, grid = get_location_grid(all_locations)
+    buffer_lat = math.degrees(threshold_km / EARTH_MIN_RADIUS_KM)
+    widest_lat = min(float(np.max(np.abs(route[:, 0]))) + buffer_lat, 89.0)
+    buffer_lng = buffer_lat / math.cos(math.radians(widest_lat))
+    candidates = np.sort(grid.query_box(
+        float(np.min(route[:, 0])) - buffer_lat, float(np.min(route[:, 1])) - buffer_lng,
+        float(np.max(route[:, 0])) + buffer_lat, float(np.max(route[:, 1])) + buffer_lng
+    ))  # Sorted back into the order of the locations dictionary
     
     # Find locations that are close to any part of the route
     waypoints = []
+    batch_size = max(1, MAX_PAIRS_PER_BATCH // len(starts))
     
-    # For each known location, check if it's near the route
-    for loc_id, loc_data in all_locations.items():
-        loc_lat = loc_data["lat"]
-        loc_lng = loc_data["lng"]
-        loc_point = (loc_lat, loc_lng)
+    for batch_start in range(0, len(candidates), batch_size):
+        batch = candidates[batch_start:batch_start + batch_size]
+        points = np.column_stack((grid.lats[batch], grid.lngs[batch]))
         
-        min_distance = float('inf')  # Start with infinity
-        progress = 0.0  # Track progress along the route (0 to 1)
-        current_distance = 0.0
+        # Distance from every location to every segment, and where along it the closest point is
+        distances, t = point_segment_distances(points, starts, ends, origin_lat)
         
-        # Check each segment of the route
-        for i in range(len(route_coordinates) - 1):
-            segment_start = (route_coordinates[i][0], route_coordinates[i][1])
-            segment_end = (route_coordinates[i+1][0], route_coordinates[i+1][1])
-            
-            # Calculate the length of this segment
-            segment_distance = geopy.distance.geodesic(segment_start, segment_end).kilometers
-            
-            # Calculate how far this location is from this segment
-            distance_to_segment = point_to_line_distance(loc_point, segment_start, segment_end)
-            
-            # Update the minimum distance if this is closer
-            if distance_to_segment < min_distance:
-                min_distance = distance_to_segment
-                # Calculate how far along the route this point is (as a percentage)
-                progress = (current_distance + find_closest_point_progress(loc_point, segment_start, segment_end) * segment_distance) / total_route_distance
-            
-            current_distance += segment_distance
+        # The closest segment for each location (the first one if there's a tie)
+        closest = np.argmin(distances, axis=1)
+        closest_distances = distances[np.arange(len(batch)), closest]
         
         # If the location is close enough to the route, add it as a waypoint
-        if min_distance <= threshold_km:
+        for row in np.flatnonzero(closest_distances <= threshold_km):
+            segment = closest[row]
+            loc_id = location_ids[batch[row]]
+            # How far along the route the closest point is (as a fraction)
+            progress = (distance_before[segment] + t[row, segment] * segment_km[segment]) / total_route_distance
             waypoints.append({
                 "id": loc_id,
-                "name": loc_data.get("display_name", loc_id),
-                "distance": min_distance,
-                "progress": progress  # How far along the route (0 = start, 1 = end)
+                "name": all_locations[loc_id].get("display_name", loc_id),
+                "distance": float(closest_distances[row]),
+                "progress": float(progress)  # How far along the route (0 = start, 1 = end)
             })
     
     # Sort waypoints by their position along the route (from start to finish)
@@ -138,26 +173,7 @@ def point_to_line_distance(point, line_start, line_end):
     
     Returns the distance in kilometers
     """
-    # Convert to numpy arrays for vector calculations
-    p = np.array([point[0], point[1]])
-    v = np.array([line_start[0], line_start[1]])
-    w = np.array([line_end[0], line_end[1]])
-    
-    # Calculate the line segment vector
-    segment = w - v
-    segment_length_squared = np.sum(segment * segment)
-    
-    # Handle zero-length segment (if start and end are the same)
-    if segment_length_squared == 0:
-        return geopy.distance.geodesic(point, line_start).kilometers
-    
-    # Project the point onto the line segment
-    # This gives us the closest point on the line
-    t = max(0, min(1, np.sum((p - v) * segment) / segment_length_squared))
-    projection = v + t * segment
-    
-    # Calculate the distance from the point to the projection
-    return geopy.distance.geodesic(point, (projection[0], projection[1])).kilometers
+    return point_to_segment_distance(point, line_start, line_end)
 
 def find_closest_point_progress(point, segment_start, segment_end):
     """
@@ -168,19 +184,4 @@ def find_closest_point_progress(point, segment_start, segment_end):
     - 1 means the closest point is at the end of the segment
     - 0.5 means the closest point is halfway along the segment
     """
-    # Convert to numpy arrays
-    p = np.array([point[0], point[1]])
-    v = np.array([segment_start[0], segment_start[1]])
-    w = np.array([segment_end[0], segment_end[1]])
-    
-    # Calculate the line segment vector
-    segment = w - v
-    segment_length_squared = np.sum(segment * segment)
-    
-    # Handle zero-length segment
-    if segment_length_squared == 0:
-        return 0
-    
-    # Calculate the projection value (t)
-    t = max(0, min(1, np.sum((p - v) * segment) / segment_length_squared))
-    return t
\ No newline at end of file
+    return closest_point_fraction(point, segment_start, segment_end)
@@ -0,0 +1,149 @@
+"""
+Names: Shanaldo Carty,
+Completion Date: 08/7/2025
+"""
+
+"""
+Grid spatial index for the Jamaica Route Finder project.
+Points are put into square cells of a fixed size (in degrees), so finding the points
+near a coordinate only means looking at a few cells instead of every point.
+"""
+
+import math
+
+import numpy as np
+
+from heuristics import EARTH_MIN_RADIUS_KM
+
+# Mean Earth radius used for distances between nearby points (km)
+EARTH_RADIUS_KM = 6371.0088
+
+# About 1.1 km of latitude per cell
+DEFAULT_CELL_DEGREES = 0.01
+
+
+def haversine_distances_km(lats, lngs, lat, lng):
+    """
+    Calculates haversine distances (km) from arrays of points, in degrees, to one point.
+
+    The point can also be arrays, as long as they broadcast against lats and lngs.
+    """
+    lats = np.radians(lats)
+    lngs = np.radians(lngs)
+    lat, lng = np.radians(lat), np.radians(lng)
+    a = (np.sin((lats - lat) / 2) ** 2 +
+         np.cos(lats) * np.cos(lat) * np.sin((lngs - lng) / 2) ** 2)
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+
+class GridIndex:
+    """
+    A uniform grid of cells over a set of points.
+
+    Point i is at (lats[i], lngs[i]). Each cell keeps a NumPy array of the points
+    inside it. Queries return point numbers, so callers can keep whatever data
+    they like about each point in their own lists.
+    """
+
+    def __init__(self, lats, lngs, cell_degrees=DEFAULT_CELL_DEGREES):
+        """
+        Puts every point into its cell.
+
+        lats, lngs: Coordinates of the points in degrees
+        cell_degrees: Width and height of each cell in degrees
+        """
+        self.lats = np.asarray(lats, dtype=np.float64)
+        self.lngs = np.asarray(lngs, dtype=np.float64)
+        self.cell_degrees = cell_degrees
+
+        rows = np.floor(self.lats / cell_degrees).astype(np.int64)
+        cols = np.floor(self.lngs / cell_degrees).astype(np.int64)
+
+        # Sort the points by cell, then cut the sorted list into one slice per cell
+        order = np.lexsort((cols, rows))
+        self.cells = {}
+        if len(order):
+            sorted_rows, sorted_cols = rows[order], cols[order]
+            starts = np.flatnonzero(np.r_[True, (np.diff(sorted_rows) != 0) | (np.diff(sorted_cols) != 0)])
+            ends = np.r_[starts[1:], len(order)]
+            for start, end in zip(starts, ends):
+                self.cells[(int(sorted_rows[start]), int(sorted_cols[start]))] = order[start:end]
+
+    def __len__(self):
+        return len(self.lats)
+
+    def cell(self, lat, lng):
+        """Returns the (row, column) of the cell a coordinate falls in."""
+        return (math.floor(lat / self.cell_degrees), math.floor(lng / self.cell_degrees))
+
+    def query_box(self, min_lat, min_lng, max_lat, max_lng):
+        """
+        Returns an array of the points in every cell that overlaps a box.
+
+        The edges of the box are rounded out to whole cells, so some points may be
+        slightly outside it. Use within() for an exact radius.
+        """
+        min_row, min_col = self.cell(min_lat, min_lng)
+        max_row, max_col = self.cell(max_lat, max_lng)
+
+        found = []
+        # Walk whichever is smaller: the cells in the box or the cells we actually have
+        if (max_row - min_row + 1) * (max_col - min_col + 1) <= len(self.cells):
+            for row in range(min_row, max_row + 1):
+                for col in range(min_col, max_col + 1):
+                    points = self.cells.get((row, col))
+                    if points is not None:
+                        found.append(points)
+        else:
+            for (row, col), points in self.cells.items():
+                if min_row <= row <= max_row and min_col <= col <= max_col:
+                    found.append(points)
+
+        return np.concatenate(found) if found else np.empty(0, dtype=np.int64)
+
+    def box_around(self, lat, lng, radius_km):
+        """
+        Returns (min_lat, min_lng, max_lat, max_lng) of a box that holds a whole circle.
+        """
+        lat_degrees = math.degrees(radius_km / EARTH_MIN_RADIUS_KM)
+        lng_degrees = lat_degrees / max(math.cos(math.radians(min(abs(lat) + lat_degrees, 89.0))), 1e-6)
+        return (lat - lat_degrees, lng - lng_degrees, lat + lat_degrees, lng + lng_degrees)
+
+    def within(self, lat, lng, radius_km):
+        """
+        Returns (point numbers, distances in km) for every point within radius_km, closest first.
+        """
+        candidates = self.query_box(*self.box_around(lat, lng, radius_km))
+        if not len(candidates):
+            return candidates, np.empty(0)
+        distances = haversine_distances_km(self.lats[candidates], self.lngs[candidates], lat, lng)
+        inside = distances <= radius_km
+        candidates, distances = candidates[inside], distances[inside]
+        order = np.argsort(distances, kind="stable")
+        return candidates[order], distances[order]
+
+    def nearest(self, lat, lng, max_km=None):
+        """
+        Returns (point number, distance in km) of the closest point, or (None, None).
+
+        The search starts with the cells right around the point and grows outwards,
+        so it only looks at far away cells when nothing is close by.
+
+        max_km: Don't look further than this (None searches everything)
+        """
+        if not len(self.lats):
+            return None, None
+
+        # Roughly one cell's width in km, used to grow the search radius
+        radius = self.cell_degrees * 111.0
+        # Half way round the world reaches every point
+        limit = max_km if max_km is not None else math.pi * EARTH_RADIUS_KM
+
+        while True:
+            radius = min(radius, limit)
+            points, distances = self.within(lat, lng, radius)
+            if len(points):
+                return int(points[0]), float(distances[0])
+            if radius >= limit:
+                return None, None
+            radius *= 2
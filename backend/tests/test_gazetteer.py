@@ -0,0 +1,60 @@
+"""
+Names: Shanaldo Carty,
+Completion Date: 08/7/2025
+"""
+
+"""
+Tests for forward lookups in the offline gazetteer.
+
+Run from the backend folder with "python -m unittest discover tests".
+"""
+
+import os
+import sys
+import unittest
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from gazetteer import Gazetteer, get_gazetteer
+
+
+def entry(name, lat, lng, kind, ref):
+    return {"name": name, "lat": lat, "lng": lng, "kind": kind, "ref": ref}
+
+
+class GazetteerGeocodeTests(unittest.TestCase):
+
+    def setUp(self):
+        self.gazetteer = Gazetteer([
+            entry("Spanish Town", 17.9911, -76.9574, "location", "spanish_town"),
+            entry("Mona", 18.0067, -76.7497, "location", "mona"),
+            entry("Mona Heights", 18.0180, -76.7560, "location", "mona_heights"),
+            entry("Old Hope Road", 18.0200, -76.7700, "street", "way/1"),
+        ])
+
+    def test_exact_name(self):
+        result = self.gazetteer.geocode("spanish  town")
+        self.assertEqual(result["place_id"], "location:spanish_town")
+
+    def test_exact_name_beats_longer_names(self):
+        self.assertEqual(self.gazetteer.geocode("Mona")["place_id"], "location:mona")
+
+    def test_whole_word_prefix(self):
+        self.assertEqual(self.gazetteer.geocode("Old Hope")["place_id"], "street:way/1")
+
+    def test_partial_match_is_not_found(self):
+        # Spanish Town Road is in Kingston, far from Spanish Town
+        self.assertIsNone(self.gazetteer.geocode("Spanish Town Road"))
+        self.assertIsNone(self.gazetteer.geocode("Hope Road"))
+        self.assertIsNone(self.gazetteer.geocode("Spanish Twn"))
+
+    def test_spanish_town_road_with_real_data(self):
+        gazetteer = get_gazetteer(os.path.join(BACKEND_DIR, "jamaica_locations.json"),
+                                  os.path.join(BACKEND_DIR, "cache"))
+        self.assertEqual(gazetteer.geocode("Spanish Town")["place_id"], "location:spanish_town")
+        self.assertIsNone(gazetteer.geocode("Spanish Town Road"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,429 @@
+"""
+Names: Shanaldo Carty,
+Completion Date: 08/7/2025
+"""
+
+"""
+Tests for the shared HTTP client and the services that use it.
+Every test talks to a local stub HTTP server on a free port instead of the real
+OpenRouteService, OpenWeatherMap and Nominatim APIs.
+
+Run from the backend folder with "python -m unittest discover tests".
+"""
+
+import json
+import os
+import socket
+import sys
+import threading
+import time
+import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import polyline
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from gazetteer import Gazetteer
+from geocoding_service import GeocodingService
+from http_client import HttpClient
+from ors_adapter import ORSAdapter
+from weather_service import WeatherService
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Answers every request with the next response the test queued for its path."""
+
+    # Keep-alive, so connection reuse can be checked
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        self.server.answer(self)
+
+    def do_POST(self):
+        self.server.answer(self)
+
+    def log_message(self, format, *args):
+        pass  # Keep the test output quiet
+
+
+class StubServer(ThreadingHTTPServer):
+    """
+    A local HTTP server that plays back queued responses.
+
+    Every request is recorded as (method, path, query, headers, body), so tests can
+    check what was sent. The last response queued for a path keeps being used.
+    """
+
+    daemon_threads = True
+
+    def __init__(self):
+        super().__init__(("127.0.0.1", 0), StubHandler)
+        self.lock = threading.Lock()
+        self.requests = []
+        self.responses = {}
+        self.thread = threading.Thread(target=self.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True)
+        self.thread.start()
+
+    @property
+    def url(self):
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def queue(self, path, status=200, body=None, headers=None, delay=0):
+        """
+        Adds a response for a path.
+
+        body: Dictionary sent back as JSON
+        headers: Extra response headers (like Retry-After)
+        delay: Seconds to wait before answering
+        """
+        with self.lock:
+            self.responses.setdefault(path, []).append((status, body or {}, headers or {}, delay))
+
+    def requests_to(self, path):
+        """Returns the recorded requests for a path."""
+        with self.lock:
+            return [entry for entry in self.requests if entry[1] == path]
+
+    def answer(self, handler):
+        url = urlsplit(handler.path)
+        length = int(handler.headers.get("Content-Length", 0))
+        body = handler.rfile.read(length) if length else b""
+        with self.lock:
+            self.requests.append((handler.command, url.path, parse_qs(url.query), dict(handler.headers), body))
+            queued = self.responses.get(url.path)
+            if queued:
+                status, payload, headers, delay = queued.pop(0) if len(queued) > 1 else queued[0]
+            else:
+                status, payload, headers, delay = 404, {"error": "not found"}, {}, 0
+
+        if delay:
+            time.sleep(delay)
+        data = json.dumps(payload).encode("utf-8")
+        try:
+            handler.send_response(status)
+            handler.send_header("Content-Type", "application/json")
+            handler.send_header("Content-Length", str(len(data)))
+            for name, value in headers.items():
+                handler.send_header(name, value)
+            handler.end_headers()
+            handler.wfile.write(data)
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # The client gave up waiting (timeout tests)
+
+
+class StubServerTestCase(unittest.TestCase):
+    """Starts a fresh stub server for every test."""
+
+    def setUp(self):
+        self.server = StubServer()
+
+    def tearDown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class HttpClientRetryTests(StubServerTestCase):
+
+    def check_retry_after(self, status):
+        self.server.queue("/busy", status, {"error": "busy"}, {"Retry-After": "1"})
+        self.server.queue("/busy", 200, {"ok": True})
+        client = HttpClient(retries=3, backoff_factor=0)
+
+        started = time.monotonic()
+        response = client.get(self.server.url + "/busy")
+        elapsed = time.monotonic() - started
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json(), {"ok": True})
+        self.assertEqual(len(self.server.requests_to("/busy")), 2)
+        # The only delay comes from the Retry-After header
+        self.assertGreaterEqual(elapsed, 0.9)
+        stats = client.stats()
+        self.assertEqual(stats["retries"], 1)
+        self.assertEqual(stats["errors"], 0)
+
+    def test_retries_429_after_retry_after(self):
+        self.check_retry_after(429)
+
+    def test_retries_503_after_retry_after(self):
+        self.check_retry_after(503)
+
+    def test_retries_post(self):
+        self.server.queue("/post", 503, {}, {"Retry-After": "0"})
+        self.server.queue("/post", 200, {"ok": True})
+        client = HttpClient(retries=2, backoff_factor=0)
+
+        response = client.post(self.server.url + "/post", json={"a": 1})
+
+        self.assertEqual(response.status_code, 200)
+        bodies = [entry[4] for entry in self.server.requests_to("/post")]
+        self.assertEqual([json.loads(body) for body in bodies], [{"a": 1}, {"a": 1}])
+
+    def test_gives_up_after_retries(self):
+        self.server.queue("/down", 503, {"error": "down"}, {"Retry-After": "0"})
+        client = HttpClient(retries=2, backoff_factor=0)
+
+        response = client.get(self.server.url + "/down")
+
+        # raise_on_status is off, so the last answer comes back to the caller
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(len(self.server.requests_to("/down")), 3)
+        stats = client.stats()
+        self.assertEqual(stats["retries"], 2)
+        self.assertEqual(stats["errors"], 1)
+
+    def test_client_errors_are_not_retried(self):
+        self.server.queue("/missing", 404, {"error": "not found"})
+        client = HttpClient(retries=3, backoff_factor=0)
+
+        response = client.get(self.server.url + "/missing")
+
+        self.assertEqual(response.status_code, 404)
+        self.assertEqual(len(self.server.requests_to("/missing")), 1)
+
+
+class HttpClientTimeoutTests(StubServerTestCase):
+
+    def test_read_timeout(self):
+        self.server.queue("/slow", 200, {"ok": True}, delay=1.0)
+        client = HttpClient(read_timeout=0.2, retries=0)
+
+        started = time.monotonic()
+        # urllib3 gives up with MaxRetryError, which requests turns into a ConnectionError
+        with self.assertRaisesRegex(requests.exceptions.ConnectionError, "Read timed out"):
+            client.get(self.server.url + "/slow")
+        self.assertLess(time.monotonic() - started, 0.9)
+        self.assertEqual(client.stats()["errors"], 1)
+
+    def test_default_timeout_can_be_overridden(self):
+        self.server.queue("/slow", 200, {"ok": True}, delay=0.5)
+        client = HttpClient(read_timeout=0.1, retries=0)
+
+        response = client.get(self.server.url + "/slow", timeout=(1, 2))
+
+        self.assertEqual(response.status_code, 200)
+
+    def test_connect_timeout(self):
+        # A listening socket that never accepts: once its backlog is full, new
+        # connections are left waiting for the handshake
+        listener = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+        listener.bind(("127.0.0.1", 0))
+        listener.listen(0)
+        port = listener.getsockname()[1]
+        waiting = []
+        try:
+            for _ in range(8):
+                filler = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+                filler.setblocking(False)
+                filler.connect_ex(("127.0.0.1", port))
+                waiting.append(filler)
+
+            client = HttpClient(connect_timeout=0.2, read_timeout=5, retries=0)
+            started = time.monotonic()
+            with self.assertRaises(requests.exceptions.ConnectTimeout):
+                client.get(f"http://127.0.0.1:{port}/")
+            self.assertLess(time.monotonic() - started, 2)
+        finally:
+            for filler in waiting:
+                filler.close()
+            listener.close()
+
+
+class HttpClientPoolTests(StubServerTestCase):
+
+    def test_connection_is_reused(self):
+        self.server.queue("/ping", 200, {"ok": True})
+        client = HttpClient(pool_size=4, retries=0)
+
+        for _ in range(5):
+            self.assertEqual(client.get(self.server.url + "/ping").status_code, 200)
+
+        pools = client.pool_stats()
+        self.assertEqual(len(pools), 1)
+        pool = pools[f"http://127.0.0.1:{self.server.server_address[1]}"]
+        self.assertEqual(pool["connections_opened"], 1)
+        self.assertEqual(pool["requests"], 5)
+        self.assertEqual(pool["idle_connections"], 1)
+        self.assertEqual(pool["max_size"], 4)
+        self.assertEqual(client.stats()["requests_by_host"], {f"127.0.0.1:{self.server.server_address[1]}": 5})
+
+    def test_concurrent_requests_stay_within_pool(self):
+        self.server.queue("/ping", 200, {"ok": True}, delay=0.1)
+        client = HttpClient(pool_size=2, retries=0)
+
+        threads = [threading.Thread(target=client.get, args=(self.server.url + "/ping",)) for _ in range(6)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        pool = next(iter(client.pool_stats().values()))
+        self.assertEqual(pool["requests"], 6)
+        self.assertLessEqual(pool["idle_connections"], 2)
+
+
+class ServiceTests(StubServerTestCase):
+    """The outside services, pointed at the stub server the same way main.py configures them."""
+
+    def setUp(self):
+        super().setUp()
+        self.client = HttpClient(retries=1, backoff_factor=0)
+        self.saved_environment = {name: os.environ.get(name) for name in ("ORS_BASE_URL", "NOMINATIM_URL")}
+        os.environ["ORS_BASE_URL"] = self.server.url
+        os.environ["NOMINATIM_URL"] = self.server.url
+
+    def tearDown(self):
+        for name, value in self.saved_environment.items():
+            if value is None:
+                os.environ.pop(name, None)
+            else:
+                os.environ[name] = value
+        super().tearDown()
+
+    def test_ors_direct_route(self):
+        geometry = polyline.encode([(18.0179, -76.8099), (17.9911, -76.9574)])
+        self.server.queue("/v2/directions/driving-car", 200, {"routes": [{
+            "geometry": geometry,
+            "segments": [{"distance": 21500, "duration": 1560,
+                          "steps": [{"name": "Spanish Town Road"}, {"name": ""}]}]
+        }]})
+        adapter = ORSAdapter("test-key", http_client=self.client)
+
+        result = adapter.get_direct_route([18.0179, -76.8099], [17.9911, -76.9574], "Half Way Tree",
+                                          "Spanish Town", "fastest", {"tolls": True})
+
+        self.assertNotIn("error", result)
+        self.assertEqual(result["distance"], "21.50 km")
+        self.assertEqual(result["time"], "26.00 minutes")
+        self.assertEqual(result["detailed_route"], ["Half Way Tree", "Spanish Town Road", "Spanish Town"])
+
+        (method, _, _, headers, body), = self.server.requests_to("/v2/directions/driving-car")
+        self.assertEqual(method, "POST")
+        self.assertEqual(headers["Authorization"], "test-key")
+        sent = json.loads(body)
+        self.assertEqual(sent["coordinates"], [[-76.8099, 18.0179], [-76.9574, 17.9911]])
+        self.assertEqual(sent["options"], {"avoid_features": ["toll"]})
+
+    def test_ors_retries_rate_limit(self):
+        self.server.queue("/v2/directions/driving-car", 429, {"error": "rate limited"}, {"Retry-After": "0"})
+        self.server.queue("/v2/directions/driving-car", 200, {"routes": [{
+            "geometry": polyline.encode([(18.0, -76.8), (18.1, -76.9)]),
+            "segments": [{"distance": 1000, "duration": 60, "steps": []}]
+        }]})
+        adapter = ORSAdapter("test-key", http_client=self.client)
+
+        result = adapter.get_direct_route([18.0, -76.8], [18.1, -76.9], "A", "B")
+
+        self.assertEqual(result["distance"], "1.00 km")
+        self.assertEqual(len(self.server.requests_to("/v2/directions/driving-car")), 2)
+
+    def test_ors_error_is_reported(self):
+        self.server.queue("/v2/directions/driving-car", 400, {"error": "bad request"})
+        adapter = ORSAdapter("test-key", http_client=self.client)
+
+        result = adapter.get_direct_route([18.0, -76.8], [18.1, -76.9], "A", "B")
+
+        self.assertIn("error", result)
+
+    def test_weather_fetch(self):
+        self.server.queue("/data/2.5/weather", 200, {
+            "main": {"temp": 31.2, "humidity": 66},
+            "weather": [{"description": "scattered clouds"}],
+            "wind": {"speed": 4.1}
+        })
+        service = WeatherService("weather-key", self.server.url, http_client=self.client, workers=1)
+        try:
+            weather = service.fetch(18.0, -76.8)
+        finally:
+            service.executor.shutdown()
+
+        self.assertEqual(weather, {"temperature": "31.2°C", "condition": "Scattered clouds",
+                                   "humidity": "66%", "wind": "4.1 m/s"})
+        (_, _, query, _, _), = self.server.requests_to("/data/2.5/weather")
+        self.assertEqual(query["appid"], ["weather-key"])
+        self.assertEqual(query["units"], ["metric"])
+
+    def test_weather_refresh_in_background(self):
+        self.server.queue("/data/2.5/weather", 200, {
+            "main": {"temp": 29, "humidity": 80},
+            "weather": [{"description": "light rain"}],
+            "wind": {"speed": 2}
+        })
+        service = WeatherService("weather-key", self.server.url, http_client=self.client, workers=1)
+        try:
+            # Nothing cached yet, so the first call starts a fetch and doesn't wait for it
+            self.assertIsNone(service.get(18.0, -76.8))
+            deadline = time.monotonic() + 5
+            weather = None
+            while weather is None and time.monotonic() < deadline:
+                time.sleep(0.02)
+                weather = service.get(18.0, -76.8)
+        finally:
+            service.executor.shutdown()
+
+        self.assertEqual(weather["condition"], "Light rain")
+        self.assertEqual(len(self.server.requests_to("/data/2.5/weather")), 1)
+
+    def test_geocode_with_nominatim(self):
+        self.server.queue("/search", 200, [{
+            "lat": "18.0123", "lon": "-76.7971", "display_name": "Devon House, Kingston, Jamaica",
+            "place_id": 42, "importance": 0.6, "address": {"city": "Kingston"}
+        }])
+        service = GeocodingService(http_client=self.client, gazetteer=Gazetteer([]), cache_dir=None)
+
+        result = service.geocode("Devon House")
+
+        self.assertEqual(result["lat"], 18.0123)
+        self.assertEqual(result["lng"], -76.7971)
+        self.assertEqual(result["place_id"], 42)
+        (_, _, query, headers, _), = self.server.requests_to("/search")
+        self.assertEqual(query["q"], ["Devon House"])
+        self.assertEqual(headers["User-Agent"], "JamaicaRouteFinder/1.0")
+
+        # A second lookup is answered from the cache
+        self.assertEqual(service.geocode("Devon House"), result)
+        self.assertEqual(len(self.server.requests_to("/search")), 1)
+
+    def test_reverse_geocode_with_nominatim(self):
+        self.server.queue("/reverse", 200, {"display_name": "Hope Road, Kingston", "place_id": 7,
+                                            "address": {"road": "Hope Road"}})
+        service = GeocodingService(http_client=self.client, gazetteer=Gazetteer([]), cache_dir=None)
+
+        result = service.reverse_geocode(18.02, -76.77)
+
+        self.assertEqual(result, {"display_name": "Hope Road, Kingston", "address": {"road": "Hope Road"},
+                                  "place_id": 7})
+
+    def test_partial_gazetteer_match_asks_nominatim(self):
+        self.server.queue("/search", 200, [{
+            "lat": "17.9833", "lon": "-76.8167", "display_name": "Spanish Town Road, Kingston, Jamaica",
+            "place_id": 99, "address": {"road": "Spanish Town Road"}
+        }])
+        gazetteer = Gazetteer([{"name": "Spanish Town", "lat": 17.9911, "lng": -76.9574,
+                                "kind": "location", "ref": "spanish_town"}])
+        service = GeocodingService(http_client=self.client, gazetteer=gazetteer, cache_dir=None)
+
+        # "Spanish Town" alone is answered offline
+        self.assertEqual(service.geocode("Spanish Town")["place_id"], "location:spanish_town")
+        self.assertEqual(self.server.requests_to("/search"), [])
+
+        # "Spanish Town Road" only looks like it, so Nominatim is asked
+        result = service.geocode("Spanish Town Road")
+        self.assertEqual(result["place_id"], 99)
+        self.assertEqual(result["lng"], -76.8167)
+        self.assertEqual(len(self.server.requests_to("/search")), 1)
+
+    def test_geocode_failure_returns_none(self):
+        self.server.queue("/search", 500, {"error": "broken"})
+        service = GeocodingService(http_client=self.client, gazetteer=Gazetteer([]), cache_dir=None)
+
+        self.assertIsNone(service.geocode("Nowhere"))
+        # One try and one retry
+        self.assertEqual(len(self.server.requests_to("/search")), 2)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,180 @@
+"""
+Names: Shanaldo Carty,
+Completion Date: 08/7/2025
+"""
+
+"""
+Weekly traffic profiles for the Jamaica Route Finder project.
+Every road type gets a speed for each 15 minutes of the week (672 of them), stored
+as a percentage of its free-flow speed in one small byte array. The time-dependent
+route searches use these to work out when we get to the end of a road, and the road
+summary uses them to describe the traffic.
+
+Run "python traffic_profiles.py" to print the profiles for one weekday.
+"""
+
+import json
+from bisect import bisect_right
+
+import numpy as np
+
+from road_graph import ROAD_TYPES
+
+# Length of one profile bucket and of the whole week, in minutes
+BUCKET_MINUTES = 15
+MINUTES_PER_DAY = 24 * 60
+MINUTES_PER_WEEK = 7 * MINUTES_PER_DAY
+BUCKETS_PER_WEEK = MINUTES_PER_WEEK // BUCKET_MINUTES
+
+# Delays (fraction of the free-flow time) at or above these count as heavy / moderate traffic
+HEAVY_DELAY = 0.25
+MODERATE_DELAY = 0.10
+
+# Profiles we have already loaded, keyed by filename
+_loaded_profiles = {}
+
+
+def week_minute(moment):
+    """
+    Returns the minutes since Monday 00:00 for a datetime (in its own local time).
+    """
+    return moment.weekday() * MINUTES_PER_DAY + moment.hour * 60 + moment.minute + moment.second / 60
+
+
+def traffic_level(delay):
+    """
+    Describes a delay (fraction of the free-flow time) as "Heavy", "Moderate" or "Light".
+    """
+    if delay >= HEAVY_DELAY:
+        return "Heavy"
+    if delay >= MODERATE_DELAY:
+        return "Moderate"
+    return "Light"
+
+
+def clock_minutes(text):
+    """Turns "HH:MM" into minutes since midnight ("24:00" is allowed for the end of the day)."""
+    hours, minutes = text.split(":")
+    return int(hours) * 60 + int(minutes)
+
+
+class TrafficProfiles:
+    """
+    Speeds through the week for every road type.
+
+    speed_percent[code, bucket] is the speed on roads of that type during that
+    15 minute bucket, as a percentage of free-flow speed. Traffic only ever slows
+    roads down, so it is at most 100 and free-flow lower bounds (like the A*
+    heuristics) stay valid.
+
+    For queries each road type also gets a running total of free-flow minutes
+    covered from the start of the week. Moving along a road is then a lookup in
+    that list: the speed changes smoothly at bucket boundaries instead of jumping
+    for whole roads, so leaving later never gets us there earlier (the FIFO
+    property that keeps Dijkstra and A* exact on time-dependent weights).
+    """
+
+    def __init__(self, speed_percent):
+        """
+        Precomputes the lookup lists from a (road types x BUCKETS_PER_WEEK) array of percentages.
+        """
+        self.speed_percent = np.clip(np.asarray(speed_percent), 1, 100).astype(np.uint8)
+        if self.speed_percent.shape != (len(ROAD_TYPES), BUCKETS_PER_WEEK):
+            raise ValueError(f"Traffic profiles must have shape {(len(ROAD_TYPES), BUCKETS_PER_WEEK)}")
+
+        factors = self.speed_percent.astype(np.float64) / 100
+        progress = np.zeros((len(ROAD_TYPES), BUCKETS_PER_WEEK + 1))
+        np.cumsum(factors * BUCKET_MINUTES, axis=1, out=progress[:, 1:])
+
+        # Python lists index faster than NumPy arrays one item at a time
+        self.factors = factors.tolist()
+        self.progress = progress.tolist()
+
+    @classmethod
+    def from_file(cls, filename="traffic_profiles.json"):
+        """
+        Builds the profiles from the traffic bands in the data file.
+
+        Each band gives a traffic level for part of the day on weekdays or weekends.
+        The level's delay is scaled by how sensitive each road type is to traffic,
+        and the speed is what that delay leaves of the free-flow speed.
+        """
+        with open(filename, 'r') as f:
+            data = json.load(f)
+        if data.get("bucket_minutes", BUCKET_MINUTES) != BUCKET_MINUTES:
+            raise ValueError(f"{filename} must use {BUCKET_MINUTES} minute buckets")
+
+        delays = data["delays"]
+        day_delays = {}
+        for day_type in ("weekday", "weekend"):
+            day = np.full(MINUTES_PER_DAY // BUCKET_MINUTES, delays[data.get("default_level", "light")])
+            for band in data.get(day_type, []):
+                day[clock_minutes(band["from"]) // BUCKET_MINUTES:
+                    clock_minutes(band["to"]) // BUCKET_MINUTES] = delays[band["level"]]
+            day_delays[day_type] = day
+
+        # Monday to Friday, then Saturday and Sunday
+        week = np.concatenate([day_delays["weekday"]] * 5 + [day_delays["weekend"]] * 2)
+        sensitivity = data.get("road_type_sensitivity", {})
+        scale = np.array([sensitivity.get(road_type, 1.0) for road_type in ROAD_TYPES])
+        return cls(np.rint(100 / (1 + scale[:, None] * week[None, :])))
+
+    def bucket(self, minute):
+        """Returns the profile bucket a minute of the week falls in."""
+        return int(minute % MINUTES_PER_WEEK) // BUCKET_MINUTES
+
+    def arrival(self, code, depart, free_flow_minutes):
+        """
+        Returns when we get to the end of a road.
+
+        code: Road type code of the road
+        depart: When we start along it, in minutes since Monday 00:00 (may run past the end of the week)
+        free_flow_minutes: How long the road takes with no traffic
+        """
+        factors = self.factors[code]
+        weeks, offset = divmod(depart, MINUTES_PER_WEEK)
+        bucket = int(offset // BUCKET_MINUTES)
+
+        # Most roads are finished within the bucket they start in
+        factor = factors[bucket]
+        finish = offset + free_flow_minutes / factor
+        if finish <= (bucket + 1) * BUCKET_MINUTES:
+            return weeks * MINUTES_PER_WEEK + finish
+
+        # Otherwise find the bucket where the running total passes the end of the road
+        progress = self.progress[code]
+        week_progress = progress[-1]
+        covered = progress[bucket] + (offset - bucket * BUCKET_MINUTES) * factor + free_flow_minutes
+        extra_weeks, covered = divmod(covered, week_progress)
+        bucket = min(bisect_right(progress, covered) - 1, BUCKETS_PER_WEEK - 1)
+        return ((weeks + extra_weeks) * MINUTES_PER_WEEK + bucket * BUCKET_MINUTES +
+                (covered - progress[bucket]) / factors[bucket])
+
+    def delay(self, code, minute):
+        """Returns the delay (fraction of the free-flow time) on a road type at a minute of the week."""
+        return 100 / float(self.speed_percent[code, self.bucket(minute)]) - 1
+
+    def typical_delay(self, minute):
+        """Returns the average delay over all road types at a minute of the week."""
+        return float(np.mean(100 / self.speed_percent[:, self.bucket(minute)].astype(np.float64) - 1))
+
+
+def load_traffic_profiles(filename="traffic_profiles.json"):
+    """
+    Returns the traffic profiles, loading the data file the first time only.
+    """
+    if filename not in _loaded_profiles:
+        _loaded_profiles[filename] = TrafficProfiles.from_file(filename)
+    return _loaded_profiles[filename]
+
+
+if __name__ == "__main__":
+    profiles = load_traffic_profiles()
+    print(f"{profiles.speed_percent.nbytes} bytes for {len(ROAD_TYPES)} road types x {BUCKETS_PER_WEEK} buckets")
+    print("Monday speeds (% of free flow), every hour:")
+    print("hour  " + " ".join(f"{road_type:>9}" for road_type in ROAD_TYPES))
+    for hour in range(24):
+        bucket = profiles.bucket(hour * 60)
+        print(f"{hour:02d}:00 " + " ".join(f"{profiles.speed_percent[code, bucket]:>9}"
+                                           for code in range(len(ROAD_TYPES))) +
+              f"  {traffic_level(profiles.typical_delay(hour * 60))}")
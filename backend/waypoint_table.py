@@ -0,0 +1,224 @@
+"""
+Names: Shanaldo Carty,
+Completion Date: 08/7/2025
+"""
+
+"""
+Waypoint candidate tables for the Jamaica Route Finder project.
+When an alternative route is too similar to the best one, we send it through a
+waypoint that makes a sensible detour. Which locations make sensible detours only
+depends on where the source and destination are, so this file works them out for
+all the trips from a source at once, and answers later requests with a lookup.
+"""
+
+import threading
+
+import numpy as np
+
+from caching import LRUCache
+from geometry import point_segment_distances
+from spatial_index import haversine_distances_km
+
+# A waypoint must be at least this far (km) from both ends of the trip
+MIN_END_DISTANCE_KM = 1.0
+
+# Going via the waypoint may be at most this many times the direct distance
+MAX_DETOUR_FACTOR = 1.4
+
+# And the waypoint may be at most this far (km) from the straight line between the ends
+MAX_PERPENDICULAR_KM = 10
+
+# Most sources whose ranked candidates are kept at once
+DEFAULT_CACHED_SOURCES = 64
+
+# Trips scored in one batch, so the K x P score arrays stay a few MB with many locations
+TRIP_BATCH = 256
+
+
+def candidate_score(perpendicular_distance, detour_factor):
+    """
+    Balances staying close to the direct line against the extra distance (lower is better).
+    """
+    return perpendicular_distance * 0.5 + detour_factor * 5
+
+
+def location_coordinates(locations, ids):
+    """Returns an (n, 2) array of [lat, lng] for the given location IDs."""
+    return np.array([[locations[loc_id]["lat"], locations[loc_id]["lng"]] for loc_id in ids],
+                    dtype=np.float64).reshape(-1, 2)
+
+
+class WaypointTable:
+    """
+    Ranked waypoint candidates for (source, destination) pairs of locations.
+
+    The distances between all locations come from one vectorized haversine over the
+    coordinate array. Candidates are ranked one source at a time, the first time a
+    trip from that source is asked about: the batched point-to-segment kernel scores
+    every location as a waypoint for the trips to every destination. rows[source]
+    then maps each destination to two lists: the numbers of the suitable locations,
+    best first, and their scores. Only the most recently used sources are kept, so
+    memory stays at a few N x N rows instead of growing with N^3.
+    """
+
+    def __init__(self, locations, cached_sources=DEFAULT_CACHED_SOURCES):
+        """
+        Sets up the table for a dictionary of location ID -> location data.
+
+        cached_sources: Most sources to keep ranked candidates for
+        """
+        self.lock = threading.Lock()
+        self.rows = LRUCache(cached_sources)
+        self.build(locations)
+
+    def build(self, locations):
+        """
+        Works out the distances between all locations from scratch and forgets any ranked rows.
+        """
+        self.ids = list(locations)
+        self.numbers = {loc_id: number for number, loc_id in enumerate(self.ids)}
+        self.coordinates = location_coordinates(locations, self.ids)
+        # Locations added later are measured on the same flat map as these ones
+        self.origin_lat = float(np.mean(self.coordinates[:, 0])) if len(self.ids) else 0.0
+        self.distances = self.distance_rows(np.arange(len(self.ids)))
+        self.rows.clear()
+
+    def distance_rows(self, rows):
+        """
+        Returns the distances (km) from the given locations to every location, one row each.
+        """
+        lats, lngs = self.coordinates[:, 0], self.coordinates[:, 1]
+        return haversine_distances_km(lats[None, :], lngs[None, :], lats[rows, None], lngs[rows, None])
+
+    def score_waypoints(self, waypoints, sources, destinations):
+        """
+        Scores locations as waypoints for a batch of trips.
+
+        waypoints: Numbers of the locations to try as waypoints (K of them)
+        sources, destinations: Numbers of the two ends of each trip (P trips)
+
+        Returns a K x P array of scores, infinity where the waypoint isn't suitable
+        """
+        # How far each waypoint is off the straight line between the ends of each trip
+        perpendicular, _ = point_segment_distances(self.coordinates[waypoints], self.coordinates[sources],
+                                                   self.coordinates[destinations], self.origin_lat)
+
+        direct = self.distances[sources, destinations]
+        from_source = self.distances[np.ix_(waypoints, sources)]
+        to_destination = self.distances[np.ix_(waypoints, destinations)]
+        with np.errstate(divide="ignore", invalid="ignore"):
+            detour = np.where(direct > 0, (from_source + to_destination) / direct, np.inf)
+
+        suitable = ((from_source >= MIN_END_DISTANCE_KM) & (to_destination >= MIN_END_DISTANCE_KM) &
+                    (detour < MAX_DETOUR_FACTOR) & (perpendicular < MAX_PERPENDICULAR_KM) &
+                    (waypoints[:, None] != sources) & (waypoints[:, None] != destinations))
+        return np.where(suitable, candidate_score(perpendicular, detour), np.inf)
+
+    def rank_source(self, source):
+        """
+        Ranks the candidates for the trips from one source to every other location.
+
+        Returns a dictionary of destination number -> (location numbers, scores)
+        """
+        row = {}
+        waypoints = np.arange(len(self.ids))
+        destinations = np.flatnonzero(waypoints != source)
+        for start in range(0, len(destinations), TRIP_BATCH):
+            batch = destinations[start:start + TRIP_BATCH]
+            scores = self.score_waypoints(waypoints, np.full(len(batch), source), batch)
+
+            # Sort every column at once: best score first, and locations earlier in the file
+            # first on a tie. Unsuitable locations score infinity, so they end up last.
+            order = np.argsort(scores, axis=0, kind="stable")
+            counts = np.count_nonzero(np.isfinite(scores), axis=0)
+            for column, destination in enumerate(batch.tolist()):
+                numbers = order[:counts[column], column]
+                row[destination] = (numbers.tolist(), scores[numbers, column].tolist())
+        return row
+
+    def candidates(self, source, destination):
+        """
+        Returns (location numbers, scores) for a trip, ranking its source first if needed.
+
+        source, destination: Location numbers (call with the lock held)
+        """
+        row = self.rows.get(source)
+        if row is None:
+            row = self.rank_source(source)
+            self.rows.put(source, row)
+        return row.get(destination, ([], []))
+
+    def add_location(self, loc_id, lat, lng):
+        """
+        Adds one location without working out every distance again.
+
+        The new location gets a row and column of distances. It could be a candidate
+        for any trip, so the ranked rows are dropped and ranked again when next used.
+        """
+        new = len(self.ids)
+        if new == 0:
+            self.origin_lat = lat
+        self.ids.append(loc_id)
+        self.numbers[loc_id] = new
+        self.coordinates = np.vstack((self.coordinates, [[lat, lng]]))
+
+        # Grow the distance matrix by one row and column
+        row = self.distance_rows(np.array([new]))[0]
+        distances = np.empty((new + 1, new + 1))
+        distances[:new, :new] = self.distances
+        distances[new, :] = row
+        distances[:, new] = row
+        self.distances = distances
+        self.rows.clear()
+
+    def sync(self, locations):
+        """
+        Brings the table up to date with a locations dictionary.
+
+        New locations are added one at a time. If any location has gone or moved,
+        the table is rebuilt.
+        """
+        with self.lock:
+            unchanged = (all(loc_id in locations for loc_id in self.ids) and
+                         np.array_equal(location_coordinates(locations, self.ids), self.coordinates))
+            if not unchanged:
+                self.build(locations)
+                return
+            if len(locations) == len(self.ids):
+                return
+            for loc_id, loc_data in locations.items():
+                if loc_id not in self.numbers:
+                    self.add_location(loc_id, loc_data["lat"], loc_data["lng"])
+
+    def ranked_candidates(self, source, destination, exclude=(), limit=None):
+        """
+        Returns the IDs of the waypoint candidates for a trip, best first.
+
+        source, destination: Location IDs
+        exclude: Location IDs that can't be used (like the ones already on the route)
+        limit: Most candidates to return (None for all of them)
+        """
+        found = []
+        with self.lock:
+            if source not in self.numbers or destination not in self.numbers:
+                return found
+            numbers, _ = self.candidates(self.numbers[source], self.numbers[destination])
+            for number in numbers:
+                loc_id = self.ids[number]
+                if loc_id in exclude:
+                    continue
+                found.append(loc_id)
+                if limit is not None and len(found) >= limit:
+                    break
+        return found
+
+    def detour_factor(self, source, waypoint, destination):
+        """
+        Returns how many times longer going via the waypoint is than going direct.
+        """
+        with self.lock:
+            s, w, d = self.numbers[source], self.numbers[waypoint], self.numbers[destination]
+            direct = self.distances[s, d]
+            if direct <= 0:
+                return float('inf')
+            return float((self.distances[s, w] + self.distances[w, d]) / direct)
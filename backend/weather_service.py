@@ -0,0 +1,171 @@
+"""
+Names: Shanaldo Carty,
+Completion Date: 08/7/2025
+"""
+
+"""
+Weather lookups for the Jamaica Route Finder project.
+Weather is cached per map tile (coordinates rounded to about 10 km), because it
+hardly changes at that scale over a few minutes. Route requests only ever read the
+cache: missing or old tiles are refreshed in the background, and if OpenWeatherMap
+is down we keep showing the last weather we got.
+"""
+
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from http_client import get_http_client
+
+# Size of a weather tile in degrees (0.1 degrees is about 11 km in Jamaica)
+DEFAULT_TILE_DEGREES = 0.1
+
+# Seconds before a tile's weather is refreshed
+DEFAULT_TTL = 10 * 60
+
+
+class WeatherService:
+    """
+    Cached, non-blocking access to current weather from OpenWeatherMap.
+
+    get() returns straight away with whatever we have for the tile:
+    - fresh weather is returned as it is
+    - stale weather is returned while a background refresh fetches new weather
+    - a tile we've never fetched returns None and starts a background fetch
+    """
+
+    def __init__(self, api_key, base_url="https://api.openweathermap.org", ttl=DEFAULT_TTL,
+                 tile_degrees=DEFAULT_TILE_DEGREES, http_client=None, workers=2, retry_after=60):
+        """
+        Sets up an empty weather cache.
+
+        api_key: OpenWeatherMap API key
+        base_url: OpenWeatherMap server (can point at a local server for testing)
+        ttl: Seconds before a tile's weather counts as stale
+        tile_degrees: Size of each weather tile in degrees
+        http_client: HttpClient to send requests with (defaults to the shared pooled client)
+        workers: Number of background threads fetching weather
+        retry_after: Seconds to wait before asking again for a tile whose last fetch failed
+        """
+        self.api_key = api_key
+        self.url = f"{base_url}/data/2.5/weather"
+        self.ttl = ttl
+        self.retry_after = retry_after
+        self.tile_degrees = tile_degrees
+        self.http = http_client or get_http_client()
+        self.executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="weather")
+
+        self.lock = threading.Lock()
+        self.tiles = {}           # tile -> (time fetched, weather summary)
+        self.refreshing = set()   # tiles with a fetch already queued or running
+        self.failed_at = {}       # tile -> time its last fetch failed
+
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.errors = 0
+
+    def tile(self, lat, lng):
+        """Returns the (row, column) of the weather tile a coordinate falls in."""
+        return (round(lat / self.tile_degrees), round(lng / self.tile_degrees))
+
+    def get(self, lat, lng):
+        """
+        Returns the cached weather summary for a coordinate, or None if we don't have any yet.
+        Never waits for OpenWeatherMap.
+        """
+        tile = self.tile(lat, lng)
+        with self.lock:
+            entry = self.tiles.get(tile)
+            if entry is None:
+                self.misses += 1
+            elif time.time() - entry[0] < self.ttl:
+                self.hits += 1
+                return entry[1]
+            else:
+                self.stale_hits += 1
+
+        # Missing or stale: fetch in the background and answer with what we have
+        self.refresh(tile)
+        return entry[1] if entry else None
+
+    def refresh(self, tile):
+        """
+        Queues a background fetch for a tile, unless one is already on the way
+        or the last one failed only a moment ago.
+        """
+        with self.lock:
+            if tile in self.refreshing:
+                return
+            if time.time() - self.failed_at.get(tile, 0) < self.retry_after:
+                return
+            self.refreshing.add(tile)
+        self.executor.submit(self.update_tile, tile)
+
+    def prefetch(self, coordinates):
+        """
+        Starts fetching weather for a list of (lat, lng) points, like all our locations at startup.
+        """
+        for tile in {self.tile(lat, lng) for lat, lng in coordinates}:
+            self.refresh(tile)
+
+    def update_tile(self, tile):
+        """
+        Fetches the weather for the centre of a tile and stores it.
+
+        If the request fails, whatever weather we already had for the tile is kept.
+        """
+        try:
+            lat = round(tile[0] * self.tile_degrees, 4)
+            lng = round(tile[1] * self.tile_degrees, 4)
+            weather = self.fetch(lat, lng)
+            with self.lock:
+                self.tiles[tile] = (time.time(), weather)
+                self.failed_at.pop(tile, None)
+        except Exception as e:
+            with self.lock:
+                self.errors += 1
+                self.failed_at[tile] = time.time()
+            print(f"Weather API error: {str(e)}")
+        finally:
+            with self.lock:
+                self.refreshing.discard(tile)
+
+    def fetch(self, lat, lng):
+        """
+        Fetch current weather for a given coordinate using OpenWeatherMap API.
+        """
+        params = {
+            "lat": lat,
+            "lon": lng,
+            "appid": self.api_key,
+            "units": "metric"  # For Celsius
+        }
+
+        response = self.http.get(self.url, params=params)
+        response.raise_for_status()
+
+        data = response.json()
+
+        return {
+            "temperature": f"{data['main']['temp']}°C",
+            "condition": data["weather"][0]["description"].capitalize(),
+            "humidity": f"{data['main']['humidity']}%",
+            "wind": f"{data['wind']['speed']} m/s"
+        }
+
+    def stats(self):
+        """
+        Returns cache size and hit/miss/error counts.
+        """
+        with self.lock:
+            return {
+                "tiles": len(self.tiles),
+                "ttl": self.ttl,
+                "tile_degrees": self.tile_degrees,
+                "hits": self.hits,
+                "stale_hits": self.stale_hits,
+                "misses": self.misses,
+                "errors": self.errors,
+                "refreshing": len(self.refreshing)
+            }
@@ -6,6 +6,37 @@ Completion Date: 5/7/2025
 import React, { useState, useEffect } from 'react';
 import AvailableRoutesModal from './AvailableRoutesModal';
 
+// Ask the backend for the best matching locations as the user types.
+// Requests wait until typing pauses briefly, and an older request is cancelled
+// when a newer one starts so suggestions never arrive out of order.
+const useLocationSuggestions = (text, setSuggestions) => {
+  useEffect(() => {
+    if (!text) {
+      setSuggestions([]);
+      return;
+    }
+
+    const controller = new AbortController();
+    const timer = setTimeout(() => {
+      fetch(`/api/location-search?q=${encodeURIComponent(text)}&limit=5`, { signal: controller.signal })
+        .then(response => response.json())
+        .then(data => {
+          setSuggestions(data.results || []); // Limited to 5 suggestions for clean UI
+        })
+        .catch(err => {
+          if (err.name !== 'AbortError') {
+            console.error('Failed to search locations', err);
+          }
+        });
+    }, 150);
+
+    return () => {
+      clearTimeout(timer);
+      controller.abort();
+    };
+  }, [text, setSuggestions]);
+};
+
 const RouteForm = ({ onSubmit, loading }) => {
   // Set up state variables to track form values and UI state
   const [source, setSource] = useState('');               // Starting location input
@@ -20,50 +51,16 @@ const RouteForm = ({ onSubmit, loading }) => {
   
   // UI state for showing available routes and autocomplete
   const [showAvailableRoutes, setShowAvailableRoutes] = useState(false);
-  const [availableLocations, setAvailableLocations] = useState([]);
   const [sourceOptions, setSourceOptions] = useState([]);      // Autocomplete options for source
   const [destOptions, setDestOptions] = useState([]);          // Autocomplete options for destination
   const [sourceInputFocused, setSourceInputFocused] = useState(false);
   const [destInputFocused, setDestInputFocused] = useState(false);
 
-  // When the component first loads, fetch the list of available locations
-  // This will be used for autocomplete suggestions
-  useEffect(() => {
-    fetch('/api/available-locations')
-      .then(response => response.json())
-      .then(data => {
-        setAvailableLocations(data.locations || []);
-      })
-      .catch(err => {
-        console.error('Failed to load available locations', err);
-      });
-  }, []);
-  
   // Update source location suggestions when user types in the source field
-  useEffect(() => {
-    if (source) {
-      // Filter locations that match what the user has typed
-      const filtered = availableLocations.filter(loc => 
-        loc.name.toLowerCase().includes(source.toLowerCase())
-      );
-      setSourceOptions(filtered.slice(0, 5)); // Limit to 5 suggestions for clean UI
-    } else {
-      setSourceOptions([]);
-    }
-  }, [source, availableLocations]);
-  
+  useLocationSuggestions(source, setSourceOptions);
+
   // Update destination location suggestions when user types in the destination field
-  useEffect(() => {
-    if (destination) {
-      // Filter locations that match what the user has typed
-      const filtered = availableLocations.filter(loc => 
-        loc.name.toLowerCase().includes(destination.toLowerCase())
-      );
-      setDestOptions(filtered.slice(0, 5)); // Limit to 5 suggestions
-    } else {
-      setDestOptions([]);
-    }
-  }, [destination, availableLocations]);
+  useLocationSuggestions(destination, setDestOptions);
 
   // Handle form submission
   const handleSubmit = (e) => {